@@ -9,6 +9,7 @@ GUARDIAN_API_KEY = os.getenv('GUARDIAN_API_KEY')
 NEWS_API_KEY = os.getenv('NEWS_API_KEY')
 MONGODB_URI = os.getenv('MONGODB_URI')
 ANTHROPIC_API_KEY = os.getenv('ANTHROPIC_API_KEY')
+ANTHROPIC_API_URL = os.getenv('ANTHROPIC_API_URL', 'https://api.anthropic.com')  # Override to use a local stand-in
 SECRET_KEY = os.getenv('SECRET_KEY')
 NEWSDATA_API_KEY = os.getenv('NEWSDATA_API_KEY')
 THENEWSAPI_KEY = os.getenv('THENEWSAPI_KEY')
@@ -21,6 +22,12 @@ COLLECTION_ARTICLES = 'articles'
 COLLECTION_EVENTS = 'events'
 COLLECTION_SUMMARIES = 'summaries'
 COLLECTION_USERS = 'users'
+COLLECTION_FEED_CACHE = 'feed_cache'
+COLLECTION_CLAUDE_CACHE = 'claude_cache'
+COLLECTION_EVENT_AGGREGATES = 'event_aggregates'
+COLLECTION_CATEGORY_STREAKS = 'category_streaks'
+COLLECTION_API_USAGE = 'api_usage'
+COLLECTION_URL_FILTER = 'url_filter'
 
 # News collection settings
 NEWS_SOURCES = [
@@ -36,6 +43,32 @@ NEWS_SOURCES = [
     'politico.com'
 ]
 
+# Shared HTTP client settings (keep-alive connection pools)
+HTTP_POOL_SIZES = {  # Connections kept open per host; hosts not listed get HTTP_DEFAULT_POOL_SIZE
+    "api.anthropic.com": 10  # At least CLAUDE_MAX_CONCURRENCY plus escalations
+}
+HTTP_DEFAULT_POOL_SIZE = 2
+HTTP_CONNECT_TIMEOUT_SECONDS = 5
+HTTP_READ_TIMEOUT_SECONDS = 30  # Default for requests that do not set their own timeout
+HTTP_USER_AGENT = 'Political Risk Monitor/1.0'
+
+# Concurrent collection settings
+COLLECTION_MAX_WORKERS = 8  # Sources fetched in parallel (1 = sequential)
+COLLECTION_HOST_INTERVAL_SECONDS = 2  # Minimum gap between requests to the same host
+
+# Story clustering settings (near-duplicate articles from several sources analyzed once)
+STORY_CLUSTERING_ENABLED = True
+STORY_MINHASH_PERMUTATIONS = 64  # MinHash signature length
+STORY_LSH_BANDS = 16  # Signature bands in the LSH index; more bands also match less similar articles
+STORY_SHINGLE_WORDS = 3  # Words per shingle (RSS items are often only a few sentences)
+STORY_SIMILARITY_THRESHOLD = 0.5  # Estimated Jaccard similarity at which two articles are the same story
+STORY_CLUSTER_WINDOW_HOURS = 72  # Stored articles collected within this window are matched against
+
+# Seen-URL filter settings (drops already collected articles before any database lookup)
+URL_FILTER_ENABLED = True
+URL_FILTER_CAPACITY = 1000000  # Canonical URLs held at the target error rate; rebuild with scripts/rebuild_url_filter.py to resize
+URL_FILTER_ERROR_RATE = 0.0001  # Chance a new article is wrongly dropped as already collected (~2.4 MB at 1M URLs)
+
 # Framework categories
 CATEGORIES = {
     "electoral_integrity": {
@@ -271,4 +304,76 @@ CATEGORIES = {
 }
 
 # Analysis settings
-ANALYSIS_INTERVAL_HOURS = 6  # Run analysis every 6 hours
\ No newline at end of file
+ANALYSIS_INTERVAL_HOURS = 6  # Run analysis every 6 hours
+
+# Claude request settings
+CLAUDE_MODEL = "claude-3-haiku-20240307"  # Fast tier: every article is analyzed with this model first
+CLAUDE_STRONG_MODEL = "claude-3-sonnet-20240229"  # Strong tier for escalated articles (None = never escalate)
+CLAUDE_ESCALATE_MAX_CONFIDENCE = 2  # Escalate when a category's confidence (1-5) is at or below this, or any is red
+CLAUDE_PROMPT_VERSION = 3  # Bump when the analysis prompt changes to invalidate cached results
+CLAUDE_CONTEXT_WINDOW_CHARS = 400  # Article text kept on each side of a keyword hit (None = send the whole article)
+CLAUDE_CONTEXT_MAX_CHARS = 10000  # Longest article text sent in a prompt
+CLAUDE_MAX_CONCURRENCY = 4  # Claude requests kept in flight (1 = sequential)
+CLAUDE_REQUESTS_PER_MINUTE = 50
+CLAUDE_TOKENS_PER_MINUTE = 40000  # Input tokens per minute
+CLAUDE_REQUEST_TIMEOUT_SECONDS = 90
+CLAUDE_MAX_RETRIES = 4  # Retries of a timed-out, throttled (429/529) or 5xx request
+CLAUDE_RETRY_BASE_SECONDS = 1  # Backoff ceiling of the first retry, doubled for each further one
+CLAUDE_RETRY_MAX_SECONDS = 60
+CLAUDE_MATCH_THRESHOLD = 1  # Keyword matches a yellow-only article needs to be sent to Claude (orange/red always are)
+CLAUDE_MAX_CALLS_PER_RUN = None  # Claude requests sent per run, highest keyword severity first; cache hits are free (None = unlimited)
+
+# Claude spend budget settings (None = no limit)
+CLAUDE_RUN_TOKEN_BUDGET = None  # Input + output tokens per analyzer run
+CLAUDE_RUN_COST_BUDGET_USD = None
+CLAUDE_DAILY_TOKEN_BUDGET = None  # Tokens per UTC day, across all processes
+CLAUDE_DAILY_COST_BUDGET_USD = None
+
+# USD per million tokens, used to price requests against the cost budgets
+CLAUDE_MODEL_PRICING = {
+    "claude-3-haiku-20240307": {"input": 0.25, "output": 1.25, "cache_write": 0.30, "cache_read": 0.03},
+    "claude-3-sonnet-20240229": {"input": 3.00, "output": 15.00, "cache_write": 3.75, "cache_read": 0.30}
+}
+
+# Multi-perspective analysis settings (ClaudeAPI)
+CLAUDE_PERSPECTIVE_ADAPTIVE = False  # Skip the neutral perspective when the other two agree
+CLAUDE_PERSPECTIVE_TOLERANCE = 10  # Largest category score difference (0-100) that counts as agreement
+
+# Local pre-classifier settings (skips Claude for yellow-only articles it would rate green)
+PRECLASSIFIER_ENABLED = True  # Only used once a model has been trained (scripts/train_preclassifier.py)
+PRECLASSIFIER_MODEL_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'models', 'preclassifier.npz')
+PRECLASSIFIER_TARGET_RECALL = 0.98  # Share of orange/red articles that must still reach Claude
+PRECLASSIFIER_EXPLORE_RATE = 0.05  # Share of skippable articles sent to Claude anyway, to keep training data unbiased
+
+# Claude result cache settings
+CLAUDE_CACHE_TTL_HOURS = 168  # Cached analyses expire after a week
+CLAUDE_CACHE_MEMORY_ENTRIES = 1000  # In-memory LRU size per analyzer
+
+# Message Batches settings (bulk/backfill analysis)
+CLAUDE_BATCH_MAX_REQUESTS = 10000  # Requests per batch job
+CLAUDE_BATCH_POLL_SECONDS = 60
+CLAUDE_BATCH_TIMEOUT_SECONDS = 86400  # Batches end within 24 hours
+CLAUDE_BATCH_PRICE_FACTOR = 0.5  # Batch requests are billed at half the standard rates
+
+# Prompt packing settings (several short articles per Claude request)
+CLAUDE_PACKING_ENABLED = False
+CLAUDE_PACK_TOKEN_BUDGET = 6000  # Estimated input tokens of article text per packed request
+CLAUDE_PACK_MAX_ARTICLES = 5
+CLAUDE_PACK_MAX_ARTICLE_TOKENS = 1000  # Longer articles get a request of their own
+CLAUDE_PACK_MAX_OUTPUT_TOKENS = 4096
+
+# Analyzer write buffer settings
+ANALYZER_WRITE_BATCH_SIZE = 500  # Buffered writes that trigger a bulk flush
+ANALYZER_WRITE_MAX_AGE_SECONDS = 5  # Flush once the oldest buffered write is this old
+
+# Analyzer work queue settings (several analyzer workers sharing the articles collection)
+ANALYZER_WORK_QUEUE_ENABLED = True
+ANALYZER_LEASE_SECONDS = 600  # Claimed articles return to the queue if not heartbeated within this time
+ANALYZER_HEARTBEAT_SECONDS = 120
+
+# Backlog drain settings (catching up on every unanalyzed article)
+DRAIN_TIME_BUDGET_SECONDS = 3600
+DRAIN_BATCH_SIZE = 50  # First batch; later batches adapt to the measured rate
+DRAIN_MIN_BATCH_SIZE = 10
+DRAIN_MAX_BATCH_SIZE = 500
+DRAIN_TARGET_BATCH_SECONDS = 120
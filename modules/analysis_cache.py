@@ -0,0 +1,146 @@
+"""
+Analysis cache module - Content-addressed cache for parsed Claude results
+"""
+
+import copy
+import json
+import hashlib
+import logging
+import datetime
+import threading
+from collections import OrderedDict
+
+try:
+    from modules.context import strip_markup
+except ImportError:
+    # Running a script from modules/ puts modules/ itself on the path
+    from context import strip_markup
+
+logger = logging.getLogger('analysis_cache')
+
+class AnalysisCache:
+    """
+    Caches parsed Claude analysis results by a hash of the normalized
+    article text, the flagged categories, the model and the prompt version.
+
+    Entries live in a bounded in-memory LRU and, when a collection is given,
+    in MongoDB, where a TTL index expires them. The same wire story arriving
+    from several outlets is then only sent to Claude once.
+    """
+
+    def __init__(self, collection=None, ttl_hours=168, max_memory_entries=1000):
+        """
+        Args:
+            collection: MongoDB collection for persistent entries, or None for memory only
+            ttl_hours (int): How long an entry stays valid
+            max_memory_entries (int): Size bound of the in-memory LRU
+        """
+        self.collection = collection
+        self.ttl = datetime.timedelta(hours=ttl_hours)
+        self.max_memory_entries = max_memory_entries
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+
+        # Counters for reporting
+        self.hits = 0
+        self.misses = 0
+        self.stores = 0
+        self.evictions = 0
+
+        if self.collection is not None:
+            try:
+                # TTL indexes only work on BSON dates, so created_at is stored as a datetime
+                self.collection.create_index('created_at', expireAfterSeconds=int(self.ttl.total_seconds()))
+            except Exception as e:
+                logger.warning(f"Could not create TTL index on analysis cache: {str(e)}")
+
+    @staticmethod
+    def normalize_text(text):
+        """
+        Normalize article text so copies differing only in markup, case or
+        spacing hash the same. Markup is stripped the same way as for the
+        text sent to Claude, so a cache key never covers different text.
+        """
+        return ' '.join(strip_markup(text).lower().split())
+
+    @classmethod
+    def make_key(cls, article, flagged_categories, model, prompt_version):
+        """Build the cache key for an article analysis request"""
+        text = cls.normalize_text(f"{article.get('title', '') or ''} {article.get('content', '') or ''}")
+        payload = json.dumps({
+            'text': text,
+            'categories': sorted(flagged_categories),
+            'model': model,
+            'prompt_version': prompt_version
+        }, sort_keys=True)
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+    @staticmethod
+    def make_cluster_key(cluster_id, prompt_version):
+        """Build the cache key of a story cluster's verdict, shared by all its articles"""
+        return f"cluster:{cluster_id}:v{prompt_version}"
+
+    def get(self, key):
+        """Get a cached result (a copy), or None on a miss"""
+        now = datetime.datetime.utcnow()
+
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                if now - entry['created_at'] < self.ttl:
+                    self._memory.move_to_end(key)
+                    self.hits += 1
+                    return copy.deepcopy(entry['result'])
+                del self._memory[key]
+
+        entry = None
+        if self.collection is not None:
+            try:
+                entry = self.collection.find_one({'_id': key})
+            except Exception as e:
+                logger.error(f"Error reading analysis cache: {str(e)}")
+
+        # The TTL monitor only runs periodically, so check expiry here as well
+        if entry is None or now - entry['created_at'] >= self.ttl:
+            with self._lock:
+                self.misses += 1
+            return None
+
+        with self._lock:
+            self.hits += 1
+            self._remember(key, entry)
+        return copy.deepcopy(entry['result'])
+
+    def put(self, key, result):
+        """Store a parsed result"""
+        entry = {'_id': key, 'result': copy.deepcopy(result), 'created_at': datetime.datetime.utcnow()}
+
+        with self._lock:
+            self.stores += 1
+            self._remember(key, entry)
+
+        if self.collection is not None:
+            try:
+                self.collection.replace_one({'_id': key}, entry, upsert=True)
+            except Exception as e:
+                logger.error(f"Error writing analysis cache: {str(e)}")
+
+    def _remember(self, key, entry):
+        """Add an entry to the in-memory LRU, evicting the oldest beyond the size bound. Hold the lock."""
+        self._memory[key] = entry
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_memory_entries:
+            self._memory.popitem(last=False)
+            self.evictions += 1
+
+    def stats(self):
+        """Get cache counters"""
+        lookups = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': round(self.hits / lookups, 3) if lookups else 0.0,
+            'stores': self.stores,
+            'memory_entries': len(self._memory),
+            'evictions': self.evictions
+        }
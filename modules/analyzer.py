@@ -1,11 +1,17 @@
+import atexit
 import datetime
 import logging
 import time
 import json
 import os
 import re
+import random
+import heapq
+import threading
 import requests
 import html # <--- IMPORT ADDED HERE
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, as_completed
 
 # --- Define Mock Classes First ---
 # These will always be defined, but only used if imports fail.
@@ -32,6 +38,8 @@ class MockCollection:
         date_filter = query.get('collected_at', {}).get('$gte')
         category_filter = query.get('category') # Added for event filtering
         detected_date_filter = query.get('detected_date', {}).get('$gte') # Added for event filtering
+        day_filter = query.get('day', {}).get('$gte') # Added for aggregate filtering
+        id_filter = query.get('_id', {}).get('$in') if isinstance(query.get('_id'), dict) else None # Added for backlog draining
 
         cutoff_dt = None
         if date_filter:
@@ -92,6 +100,15 @@ class MockCollection:
                 else:
                     match = False # No date, cannot match date filter
 
+            # Check _id list if filter exists
+            if match and id_filter is not None and doc_id not in id_filter:
+                match = False
+
+            # Check aggregate day if filter exists (YYYY-MM-DD strings compare in date order)
+            if match and day_filter:
+                if not doc.get('day') or doc['day'] < day_filter:
+                    match = False
+
 
             # If all filters passed
             if match:
@@ -126,16 +143,55 @@ class MockCollection:
         # Return list directly, mimicking list(cursor) or cursor iteration
         return results
 
-    def update_one(self, query, update):
-        """Mock update_one operation."""
+    def update_one(self, query, update, upsert=False):
+        """Mock update_one operation (supports $set, $inc, $max and $setOnInsert on dotted paths)."""
         doc_id = query.get('_id')
         logger.debug(f"Mock update_one in '{self.name}' for ID: {doc_id}")
-        if doc_id in self._data:
-            set_data = update.get('$set', {})
-            self._data[doc_id].update(set_data)
-            logger.debug(f"Mock Updated doc {doc_id}")
-        else:
-             logger.warning(f"Mock Update failed: Doc {doc_id} not found.")
+        inserted = False
+        if doc_id not in self._data:
+            if not upsert:
+                logger.warning(f"Mock Update failed: Doc {doc_id} not found.")
+                return
+            self._data[doc_id] = {'_id': doc_id}
+            inserted = True
+
+        doc = self._data[doc_id]
+        for path, value in update.get('$set', {}).items():
+            parent, key = self._resolve_path(doc, path)
+            parent[key] = value
+        for path, value in update.get('$inc', {}).items():
+            parent, key = self._resolve_path(doc, path)
+            parent[key] = parent.get(key, 0) + value
+        for path, value in update.get('$max', {}).items():
+            parent, key = self._resolve_path(doc, path)
+            if parent.get(key) is None or value > parent[key]:
+                parent[key] = value
+        if inserted:
+            for path, value in update.get('$setOnInsert', {}).items():
+                parent, key = self._resolve_path(doc, path)
+                parent[key] = value
+        logger.debug(f"Mock {'Upserted' if inserted else 'Updated'} doc {doc_id}")
+
+    @staticmethod
+    def _resolve_path(doc, path):
+        """Get the parent dict and final key of a dotted field path, creating parents as needed."""
+        parts = path.split('.')
+        for part in parts[:-1]:
+            doc = doc.setdefault(part, {})
+        return doc, parts[-1]
+
+    def find_one(self, query=None):
+        """Mock find_one operation (by _id only)."""
+        doc = self._data.get((query or {}).get('_id'))
+        return doc.copy() if doc is not None else None
+
+    def delete_many(self, query=None):
+        """Mock delete_many operation (equality matches only; an empty query deletes everything)."""
+        if not query:
+            self._data.clear()
+            return
+        for doc_id in [doc_id for doc_id, doc in self._data.items() if all(doc.get(key) == value for key, value in query.items())]:
+            del self._data[doc_id]
 
     def insert_one(self, document):
         """Mock insert_one operation."""
@@ -261,15 +317,65 @@ try:
     # Try importing real config
     from config import (
         ANTHROPIC_API_KEY,
+        ANTHROPIC_API_URL,
         CATEGORIES,
         COLLECTION_ARTICLES,
         COLLECTION_EVENTS,
-        COLLECTION_SUMMARIES
+        COLLECTION_SUMMARIES,
+        COLLECTION_CLAUDE_CACHE,
+        COLLECTION_EVENT_AGGREGATES,
+        COLLECTION_CATEGORY_STREAKS,
+        CLAUDE_MODEL,
+        CLAUDE_STRONG_MODEL,
+        CLAUDE_ESCALATE_MAX_CONFIDENCE,
+        CLAUDE_PROMPT_VERSION,
+        CLAUDE_CONTEXT_WINDOW_CHARS,
+        CLAUDE_CONTEXT_MAX_CHARS,
+        CLAUDE_CACHE_TTL_HOURS,
+        CLAUDE_CACHE_MEMORY_ENTRIES,
+        CLAUDE_MAX_CONCURRENCY,
+        CLAUDE_REQUESTS_PER_MINUTE,
+        CLAUDE_TOKENS_PER_MINUTE,
+        CLAUDE_REQUEST_TIMEOUT_SECONDS,
+        CLAUDE_MAX_RETRIES,
+        CLAUDE_RETRY_BASE_SECONDS,
+        CLAUDE_RETRY_MAX_SECONDS,
+        CLAUDE_BATCH_MAX_REQUESTS,
+        CLAUDE_BATCH_POLL_SECONDS,
+        CLAUDE_BATCH_TIMEOUT_SECONDS,
+        CLAUDE_BATCH_PRICE_FACTOR,
+        CLAUDE_PACKING_ENABLED,
+        CLAUDE_PACK_TOKEN_BUDGET,
+        CLAUDE_PACK_MAX_ARTICLES,
+        CLAUDE_PACK_MAX_ARTICLE_TOKENS,
+        CLAUDE_PACK_MAX_OUTPUT_TOKENS,
+        ANALYZER_WRITE_BATCH_SIZE,
+        ANALYZER_WRITE_MAX_AGE_SECONDS,
+        ANALYZER_WORK_QUEUE_ENABLED,
+        ANALYZER_LEASE_SECONDS,
+        ANALYZER_HEARTBEAT_SECONDS,
+        DRAIN_TIME_BUDGET_SECONDS,
+        DRAIN_BATCH_SIZE,
+        DRAIN_MIN_BATCH_SIZE,
+        DRAIN_MAX_BATCH_SIZE,
+        DRAIN_TARGET_BATCH_SECONDS,
+        CLAUDE_MATCH_THRESHOLD,
+        CLAUDE_MAX_CALLS_PER_RUN,
+        PRECLASSIFIER_ENABLED,
+        PRECLASSIFIER_MODEL_PATH,
+        PRECLASSIFIER_EXPLORE_RATE,
+        COLLECTION_API_USAGE,
+        CLAUDE_MODEL_PRICING,
+        CLAUDE_RUN_TOKEN_BUDGET,
+        CLAUDE_RUN_COST_BUDGET_USD,
+        CLAUDE_DAILY_TOKEN_BUDGET,
+        CLAUDE_DAILY_COST_BUDGET_USD
     )
     logger.info("Successfully imported configuration from config.py")
 except ImportError:
     logger.warning("config.py not found or incomplete. Using dummy configuration values.")
     ANTHROPIC_API_KEY = os.environ.get("ANTHROPIC_API_KEY", "dummy_key") # Allow override via env var
+    ANTHROPIC_API_URL = os.environ.get("ANTHROPIC_API_URL", "https://api.anthropic.com")
     CATEGORIES = {
         "example_cat": {"keywords": ["keyword1"], "orange_indicators": ["orange_indicator"], "red_indicators": ["red_indicator"]},
         "another_cat": {"keywords": ["test", "policy"], "orange_indicators": [], "red_indicators": []}
@@ -277,9 +383,88 @@ except ImportError:
     COLLECTION_ARTICLES = "articles_dummy"
     COLLECTION_EVENTS = "events_dummy"
     COLLECTION_SUMMARIES = "summaries_dummy"
+    COLLECTION_CLAUDE_CACHE = "claude_cache_dummy"
+    COLLECTION_EVENT_AGGREGATES = "event_aggregates_dummy"
+    COLLECTION_CATEGORY_STREAKS = "category_streaks_dummy"
+    CLAUDE_MODEL = "claude-3-haiku-20240307"
+    CLAUDE_STRONG_MODEL = None
+    CLAUDE_ESCALATE_MAX_CONFIDENCE = 2
+    CLAUDE_PROMPT_VERSION = 3
+    CLAUDE_CONTEXT_WINDOW_CHARS = 400
+    CLAUDE_CONTEXT_MAX_CHARS = 10000
+    CLAUDE_CACHE_TTL_HOURS = 168
+    CLAUDE_CACHE_MEMORY_ENTRIES = 1000
+    CLAUDE_MAX_CONCURRENCY = 1
+    CLAUDE_REQUESTS_PER_MINUTE = 50
+    CLAUDE_TOKENS_PER_MINUTE = 40000
+    CLAUDE_REQUEST_TIMEOUT_SECONDS = 90
+    CLAUDE_MAX_RETRIES = 4
+    CLAUDE_RETRY_BASE_SECONDS = 1
+    CLAUDE_RETRY_MAX_SECONDS = 60
+    CLAUDE_BATCH_MAX_REQUESTS = 10000
+    CLAUDE_BATCH_POLL_SECONDS = 60
+    CLAUDE_BATCH_TIMEOUT_SECONDS = 86400
+    CLAUDE_BATCH_PRICE_FACTOR = 0.5
+    CLAUDE_PACKING_ENABLED = False
+    CLAUDE_PACK_TOKEN_BUDGET = 6000
+    CLAUDE_PACK_MAX_ARTICLES = 5
+    CLAUDE_PACK_MAX_ARTICLE_TOKENS = 1000
+    CLAUDE_PACK_MAX_OUTPUT_TOKENS = 4096
+    ANALYZER_WRITE_BATCH_SIZE = 500
+    ANALYZER_WRITE_MAX_AGE_SECONDS = 5
+    ANALYZER_WORK_QUEUE_ENABLED = True
+    ANALYZER_LEASE_SECONDS = 600
+    ANALYZER_HEARTBEAT_SECONDS = 120
+    DRAIN_TIME_BUDGET_SECONDS = 3600
+    DRAIN_BATCH_SIZE = 50
+    DRAIN_MIN_BATCH_SIZE = 10
+    DRAIN_MAX_BATCH_SIZE = 500
+    DRAIN_TARGET_BATCH_SECONDS = 120
+    CLAUDE_MATCH_THRESHOLD = 1
+    CLAUDE_MAX_CALLS_PER_RUN = None
+    PRECLASSIFIER_ENABLED = False
+    PRECLASSIFIER_MODEL_PATH = "preclassifier_dummy.npz"
+    PRECLASSIFIER_EXPLORE_RATE = 0.05
+    COLLECTION_API_USAGE = "api_usage_dummy"
+    CLAUDE_MODEL_PRICING = {"claude-3-haiku-20240307": {"input": 0.25, "output": 1.25, "cache_write": 0.30, "cache_read": 0.03}}
+    CLAUDE_RUN_TOKEN_BUDGET = None
+    CLAUDE_RUN_COST_BUDGET_USD = None
+    CLAUDE_DAILY_TOKEN_BUDGET = None
+    CLAUDE_DAILY_COST_BUDGET_USD = None
     if ANTHROPIC_API_KEY == "dummy_key":
          logger.warning("ANTHROPIC_API_KEY not found in config.py or environment variables. Claude analysis will be disabled.")
 
+# Helpers below need nothing beyond what this module already imports, so no mock fallback is needed
+try:
+    from modules.matcher import get_category_index
+    from modules.ratelimit import RateLimiter
+    from modules.analysis_cache import AnalysisCache
+    from modules.batches import MessageBatchClient
+    from modules.anthropic_client import AnthropicClient, ClaudeUnavailable
+    from modules.bulk_writer import BulkWriter
+    from modules.work_queue import ArticleWorkQueue
+    from modules.budget import TokenBudget, BudgetExceeded, estimate_tokens
+    from modules.context import extract_context
+except ImportError:
+    # Running this file directly puts modules/ itself on the path
+    from matcher import get_category_index
+    from ratelimit import RateLimiter
+    from analysis_cache import AnalysisCache
+    from batches import MessageBatchClient
+    from anthropic_client import AnthropicClient, ClaudeUnavailable
+    from bulk_writer import BulkWriter
+    from work_queue import ArticleWorkQueue
+    from budget import TokenBudget, BudgetExceeded, estimate_tokens
+    from context import extract_context
+
+# The pre-classifier needs NumPy; without it every eligible article goes to Claude
+try:
+    from modules.preclassifier import PreClassifier
+except ImportError:
+    try:
+        from preclassifier import PreClassifier
+    except ImportError:
+        PreClassifier = None
 
 try:
     # Attempt to import the real implementations
@@ -305,6 +490,33 @@ except ImportError as e:
 
 # --- Main Analyzer Class ---
 
+# _id of the document in the event aggregates collection recording the last rebuild
+EVENT_AGGREGATES_META_ID = '_meta'
+
+# Newest events per category handed to the tracker's persistence check
+TRACKER_EVENT_LIMIT = 2
+
+# Events older than this do not continue a category's severity streak
+PERSISTENCE_LOOKBACK_DAYS = 180
+
+# Severity ranks, used to order articles for Claude analysis
+SEVERITY_RANK = {'green': 0, 'yellow': 1, 'orange': 2, 'red': 3}
+
+# Stands in for Claude results when the token/cost budget refused the request
+CLAUDE_BUDGET_EXCEEDED = object()
+
+# Stands in for Claude results when the API kept failing after every retry
+CLAUDE_UNAVAILABLE = object()
+
+# Stands in for Claude results when the run's Claude calls (CLAUDE_MAX_CALLS_PER_RUN) were used up
+CLAUDE_CALL_LIMIT = object()
+
+class ClaudeCallLimitReached(BudgetExceeded):
+    """Raised instead of sending a request once the run's Claude calls are used up"""
+
+# (story cluster, category) pairs remembered as already counted in the event aggregates
+COUNTED_CLUSTER_EVENTS_MEMORY = 10000
+
 class NewsAnalyzer:
     """
     Analyzes news articles and categorizes them according to the
@@ -331,6 +543,96 @@ class NewsAnalyzer:
         self.categories = CATEGORIES
         logger.info(f"Loaded {len(self.categories)} categories.")
 
+        # Compiled once per process and shared by every analyzer instance
+        self.category_index = get_category_index(self.categories)
+
+        # Article updates, events and aggregate counts are written behind in bulk;
+        # anything still buffered is written by close()
+        self.bulk_writer = BulkWriter(ANALYZER_WRITE_BATCH_SIZE, ANALYZER_WRITE_MAX_AGE_SECONDS)
+
+        # Articles are claimed under a lease so several analyzer workers can run
+        # side by side (the mock DB has no atomic updates, so it reads directly)
+        self.work_queue = None
+        if ANALYZER_WORK_QUEUE_ENABLED and not is_mock_db:
+            self.work_queue = ArticleWorkQueue(self.articles_collection, ANALYZER_LEASE_SECONDS, ANALYZER_HEARTBEAT_SECONDS)
+            logger.info(f"Claiming articles as worker {self.work_queue.worker_id}")
+        self._claimed_ids = set()
+        self._stored_ids = set()
+        self._events_replaced = False
+
+        # Local model that lets yellow-only articles Claude would rate green skip the call
+        self.preclassifier = self._load_preclassifier()
+        self.preclassifier_skipped = 0
+
+        # Articles of a story cluster reuse the Claude verdict of its representative,
+        # and only the cluster's first event per category is counted in summaries
+        self.cluster_propagated = 0
+        self._counted_cluster_events = OrderedDict()
+
+        # Claude requests left in the current run (None = unlimited), shared by worker threads
+        self._claude_calls_remaining = CLAUDE_MAX_CALLS_PER_RUN
+        self._claude_calls_lock = threading.Lock()
+        self.deferred_count = 0
+        self.unavailable_count = 0
+        self.downgraded_count = 0
+        self._token_budget_exhausted = False
+
+        # Per-day, per-category event counts that summaries are built from
+        self.event_aggregates_collection = get_collection(COLLECTION_EVENT_AGGREGATES)
+        self._ensure_event_indexes()
+        self._ensure_event_aggregates()
+
+        # Current severity streak of every category, loaded on first use in a run
+        self.category_streaks_collection = get_collection(COLLECTION_CATEGORY_STREAKS)
+        self._category_streaks = None
+        self._dirty_streaks = set()
+
+        # Shared by all Claude requests in flight, sequential or concurrent
+        self.rate_limiter = RateLimiter(CLAUDE_REQUESTS_PER_MINUTE, CLAUDE_TOKENS_PER_MINUTE)
+
+        # Every Claude request is priced before it is sent; daily spend is shared
+        # through the database (this process only with the mock DB)
+        self.token_budget = TokenBudget(
+            CLAUDE_MODEL_PRICING,
+            run_token_limit=CLAUDE_RUN_TOKEN_BUDGET,
+            run_cost_limit=CLAUDE_RUN_COST_BUDGET_USD,
+            daily_token_limit=CLAUDE_DAILY_TOKEN_BUDGET,
+            daily_cost_limit=CLAUDE_DAILY_COST_BUDGET_USD,
+            usage_collection=None if is_mock_db else get_collection(COLLECTION_API_USAGE)
+        )
+        self.claude_client = AnthropicClient(
+            ANTHROPIC_API_KEY,
+            base_url=ANTHROPIC_API_URL,
+            timeout=CLAUDE_REQUEST_TIMEOUT_SECONDS,
+            rate_limiter=self.rate_limiter,
+            budget=self.token_budget,
+            max_retries=CLAUDE_MAX_RETRIES,
+            backoff_base=CLAUDE_RETRY_BASE_SECONDS,
+            backoff_max=CLAUDE_RETRY_MAX_SECONDS
+        )
+
+        # Static part of every Claude prompt, sent as a cached system prompt prefix
+        self.framework_prompt = self._build_framework_prompt()
+
+        # Articles go to the fast model first and only some are escalated to the
+        # strong one, so cached results are keyed by the whole route
+        self.escalation_enabled = bool(CLAUDE_STRONG_MODEL) and CLAUDE_STRONG_MODEL != CLAUDE_MODEL
+        self.claude_route = f"{CLAUDE_MODEL}>{CLAUDE_STRONG_MODEL}" if self.escalation_enabled else CLAUDE_MODEL
+        self._routing_lock = threading.Lock()
+        self.routing_stats = {
+            'fast': {'requests': 0, 'seconds': 0.0},
+            'strong': {'requests': 0, 'seconds': 0.0},
+            'escalated': 0,
+            'escalation_failed': 0
+        }
+
+        # Parsed Claude results keyed by article content; memory only with the mock DB
+        self.analysis_cache = AnalysisCache(
+            None if is_mock_db else get_collection(COLLECTION_CLAUDE_CACHE),
+            ttl_hours=CLAUDE_CACHE_TTL_HOURS,
+            max_memory_entries=CLAUDE_CACHE_MEMORY_ENTRIES
+        )
+
 
         # --- Add mock data for testing ONLY if using mock collections ---
         # Check using the flag set during import fallback
@@ -352,8 +654,32 @@ class NewsAnalyzer:
         logger.info("NewsAnalyzer initialized.")
 
 
-    def analyze_recent_articles(self, days=1, limit=20):
-        """Analyze articles collected in the past specified days"""
+    def close(self):
+        """
+        Write everything still buffered and hand back claimed articles.
+
+        Call when done with the analyzer. Buffered writes go first, so no
+        lease is released before its article is marked as analyzed. Safe to
+        call more than once.
+        """
+        try:
+            self.bulk_writer.flush()
+            self._finish_claimed_articles()
+        finally:
+            if self.work_queue is not None:
+                self.work_queue.close()
+
+    def analyze_recent_articles(self, days=1, limit=20, concurrency=None, pack=None):
+        """
+        Analyze articles collected in the past specified days.
+
+        With a `limit`, the articles are chosen by keyword signal across the
+        whole window (see _select_by_priority), so a red article collected
+        late in the window is not held back by older routine coverage. Up to `concurrency` Claude requests are kept in flight (defaults to
+        CLAUDE_MAX_CONCURRENCY, 1 = sequential), all sharing the analyzer's
+        requests/tokens per minute limiter. With `pack` (defaults to
+        CLAUDE_PACKING_ENABLED) short articles share one request.
+        """
         logger.info(f"Starting analysis for articles from the last {days} day(s), limit {limit}.")
         # Set whether to use Claude API for analysis - can be toggled
         # Set to False if ANTHROPIC_API_KEY is dummy or missing
@@ -361,8 +687,7 @@ class NewsAnalyzer:
         if not self.USE_CLAUDE_ANALYSIS:
              logger.warning("Claude analysis is disabled (ANTHROPIC_API_KEY is 'dummy_key' or missing).")
 
-        # Set keyword match threshold for Claude analysis (currently not used, but kept for potential future use)
-        self.CLAUDE_MATCH_THRESHOLD = 1
+        self._start_claude_budget()
 
         cutoff_date = datetime.datetime.now() - datetime.timedelta(days=days)
         cutoff_date_str = cutoff_date.isoformat()
@@ -373,23 +698,12 @@ class NewsAnalyzer:
             'collected_at': {'$gte': cutoff_date_str},
             'analyzed': False
         }
+        if limit:
+            selected_ids = self._select_by_priority(query, limit)
+            if selected_ids is not None:
+                query['_id'] = {'$in': selected_ids}
 
-        try:
-            # Use sort argument for pymongo, mock handles it internally
-            sort_order = [('collected_at', pymongo.ASCENDING if not is_mock_db else 1)] # Process oldest first within the window
-            if is_mock_db:
-                 # Mock find directly accepts sort list
-                 articles_cursor_or_list = self.articles_collection.find(query, limit=limit, sort=sort_order)
-                 articles = articles_cursor_or_list # Mock returns a list
-            else:
-                 # Real pymongo uses cursor methods
-                 articles_cursor_or_list = self.articles_collection.find(query).sort(sort_order).limit(limit)
-                 articles = list(articles_cursor_or_list)
-
-
-        except Exception as e:
-             logger.exception(f"Error fetching articles from database: {e}")
-             articles = []
+        articles = self._fetch_articles(query, limit)
 
 
         logger.info(f"Found {len(articles)} unanalyzed recent articles matching criteria.")
@@ -400,94 +714,837 @@ class NewsAnalyzer:
             self._generate_summary()
             return 0
 
+        analyzed_count = self._analyze_articles(articles, concurrency, pack)
+
+
+        # Generate summary after analysis run completes
+        logger.info("Analysis loop finished.")
+        self._generate_summary()
+
+
+        logger.info(f"Completed analysis run. Processed {analyzed_count} articles.")
+        return analyzed_count
+
+    def drain_backlog(self, time_budget=None, batch_size=None, concurrency=None, pack=None):
+        """
+        Analyze every unanalyzed article, regardless of age, until none are
+        left or the time budget runs out.
+
+        Articles are taken oldest first in batches. Batch size adapts to the
+        measured drain rate so a batch takes about DRAIN_TARGET_BATCH_SECONDS
+        and the last one fits in the remaining budget. Each batch is fully
+        written (and its claims completed) before the next starts, and one
+        summary is generated at the end. Articles a batch leaves unanalyzed
+        are not retried in the same drain, and draining stops as soon as
+        Claude turns out to be unavailable.
+
+        Args:
+            time_budget (int, optional): Seconds to spend draining (default: DRAIN_TIME_BUDGET_SECONDS)
+            batch_size (int, optional): Size of the first batch (default: DRAIN_BATCH_SIZE)
+
+        Returns:
+            dict: Drain report with queue depth before and after, articles
+                  analyzed, elapsed seconds and drain rate
+        """
+        time_budget = time_budget or DRAIN_TIME_BUDGET_SECONDS
+        batch_size = batch_size or DRAIN_BATCH_SIZE
+        self.USE_CLAUDE_ANALYSIS = ANTHROPIC_API_KEY != "dummy_key"
+        if not self.USE_CLAUDE_ANALYSIS:
+             logger.warning("Claude analysis is disabled (ANTHROPIC_API_KEY is 'dummy_key' or missing).")
+        self._start_claude_budget()
+
+        start = time.monotonic()
+        deadline = start + time_budget
+        initial_depth = self._count_unanalyzed()
+        logger.info(f"Draining backlog of {initial_depth} unanalyzed articles (time budget {time_budget}s).")
+
         analyzed_count = 0
-        processed_ids = set() # Keep track of processed articles in this run
+        batches = 0
+        rate = None # Articles per second, measured
+        backlog_ids = None if self.work_queue is not None else self._iter_backlog_ids()
+        # Claimed articles a batch left unanalyzed (deferred or failed) are not claimed again in this drain
+        skipped_ids = set()
+
+        while time.monotonic() < deadline:
+            remaining = deadline - time.monotonic()
+            if rate:
+                # Aim for the target batch duration, but never plan past the budget
+                batch_size = int(rate * min(DRAIN_TARGET_BATCH_SECONDS, remaining))
+                batch_size = max(DRAIN_MIN_BATCH_SIZE, min(DRAIN_MAX_BATCH_SIZE, batch_size))
+
+            if backlog_ids is None:
+                # Claimed under a lease, so other workers drain alongside
+                query = {'analyzed': False}
+                if skipped_ids:
+                    query['_id'] = {'$nin': list(skipped_ids)}
+                articles = self._fetch_articles(query, batch_size)
+            else:
+                articles = self._next_backlog_batch(backlog_ids, batch_size)
+            if not articles:
+                break
+
+            batch_start = time.monotonic()
+            unavailable_before = self.unavailable_count
+            count = self._analyze_articles(articles, concurrency, pack)
+            batch_seconds = max(time.monotonic() - batch_start, 0.001)
+            analyzed_count += count
+            batches += 1
+
+            batch_rate = len(articles) / batch_seconds
+            rate = batch_rate if rate is None else 0.5 * rate + 0.5 * batch_rate
+            logger.info(f"Drain batch {batches}: {count}/{len(articles)} articles in {batch_seconds:.1f}s ({batch_rate * 60:.1f}/min), {analyzed_count} total.")
+
+            if self._claude_calls_remaining == 0 or self._token_budget_exhausted:
+                # Further batches would only defer their Claude articles again
+                logger.info("Claude budget for this run is used up. The rest of the backlog waits for the next run.")
+                break
+            if self.unavailable_count > unavailable_before:
+                # The API kept failing after retries; further batches would fail the same way
+                logger.warning("Claude is unavailable. The rest of the backlog waits for the next run.")
+                break
+            if backlog_ids is None and count < len(articles):
+                skipped_ids.update(self._unanalyzed_ids([article['_id'] for article in articles]))
+
+        elapsed = time.monotonic() - start
+        final_depth = self._count_unanalyzed()
+        drain_rate = analyzed_count / elapsed * 60 if elapsed > 0 else 0.0
+        report = {
+            'initial_queue_depth': initial_depth,
+            'final_queue_depth': final_depth,
+            'analyzed': analyzed_count,
+            'batches': batches,
+            'elapsed_seconds': round(elapsed, 1),
+            'drain_rate_per_minute': round(drain_rate, 1),
+            'budget_exhausted': time.monotonic() >= deadline,
+            'deferred': self.deferred_count,
+            'claude_unavailable': self.unavailable_count,
+            'downgraded': self.downgraded_count,
+            'claude_spend': self.token_budget.stats(),
+            'estimated_minutes_to_empty': round(final_depth / drain_rate, 1) if drain_rate and final_depth else 0.0
+        }
+        logger.info(f"Backlog drain finished: {report}")
 
-        for article in articles:
-            try:
-                # Ensure article has an _id
-                article_id = article.get('_id')
-                if not article_id:
-                     logger.error(f"Article missing _id: {article.get('title', 'No title')}")
-                     continue # Skip this article
+        self._generate_summary()
+        return report
+
+    def _select_by_priority(self, query, limit):
+        """
+        Get the _ids of the `limit` articles matching query with the strongest
+        keyword signal, oldest collected first among equals.
 
-                # Avoid reprocessing if somehow fetched twice (shouldn't happen with correct query)
-                if article_id in processed_ids:
-                     logger.warning(f"Attempted to reprocess article ID {article_id}. Skipping.")
-                     continue
-                processed_ids.add(article_id)
+        Every matching article is keyword-scanned (title and content only), so
+        keep the query to a bounded window. Articles another worker has
+        claimed are left out.
 
+        Returns:
+            list: Article _ids, highest priority first, or None if the
+                  articles could not be ranked (they are taken oldest first then)
+        """
+        try:
+            if is_mock_db:
+                candidates = self.articles_collection.find(query, sort=[('collected_at', 1)])
+            else:
+                if self.work_queue is not None:
+                    query = self.work_queue.claimable(query)
+                candidates = self.articles_collection.find(query, {'title': 1, 'content': 1}).sort([('collected_at', pymongo.ASCENDING)])
+            # nlargest() keeps the first of equal items, so ties stay oldest first
+            selected = heapq.nlargest(
+                limit, candidates,
+                key=lambda article: self._keyword_priority(self._keyword_analysis(article))
+            )
+        except Exception as e:
+            logger.exception(f"Error ranking articles by keyword signal: {e}")
+            return None
+        logger.debug(f"Selected {len(selected)} articles by keyword signal")
+        return [article['_id'] for article in selected]
 
+    def _count_unanalyzed(self):
+        """Get the number of articles waiting for analysis."""
+        try:
+            if is_mock_db:
+                return len(self.articles_collection.find({'analyzed': False}))
+            return self.articles_collection.count_documents({'analyzed': False})
+        except Exception as e:
+            logger.exception(f"Error counting unanalyzed articles: {e}")
+            return None
+
+    def _unanalyzed_ids(self, article_ids):
+        """Get the ids among article_ids whose articles are still unanalyzed."""
+        query = {'_id': {'$in': list(article_ids)}, 'analyzed': False}
+        try:
+            if is_mock_db:
+                return {article['_id'] for article in self.articles_collection.find(query)}
+            return {article['_id'] for article in self.articles_collection.find(query, {'_id': 1})}
+        except Exception as e:
+            logger.exception(f"Error checking unanalyzed articles: {e}")
+            return set(article_ids)
+
+    def _iter_backlog_ids(self):
+        """
+        Stream the _ids of unanalyzed articles, oldest first, through a
+        server-side cursor. A cursor that times out while a batch is being
+        analyzed is reopened, skipping ids already returned.
+        """
+        query = {'analyzed': False}
+        if is_mock_db:
+            for article in self.articles_collection.find(query, sort=[('collected_at', 1)]):
+                yield article['_id']
+            return
+
+        seen = set()
+        while True:
+            cursor = self.articles_collection.find(query, {'_id': 1}).sort([('collected_at', pymongo.ASCENDING)]).batch_size(DRAIN_MAX_BATCH_SIZE)
+            try:
+                for doc in cursor:
+                    if doc['_id'] not in seen:
+                        seen.add(doc['_id'])
+                        yield doc['_id']
+                return
+            except pymongo.errors.CursorNotFound:
+                logger.warning("Backlog cursor timed out. Reopening it.")
+            finally:
+                cursor.close()
+
+    def _next_backlog_batch(self, backlog_ids, batch_size):
+        """Get the next batch of still-unanalyzed articles from the backlog id stream."""
+        ids = []
+        for article_id in backlog_ids:
+            ids.append(article_id)
+            if len(ids) >= batch_size:
+                break
+        if not ids:
+            return []
+
+        articles = self._fetch_articles({'_id': {'$in': ids}, 'analyzed': False})
+        # Keep the cursor's order
+        position = {article_id: i for i, article_id in enumerate(ids)}
+        articles.sort(key=lambda article: position.get(article['_id'], len(ids)))
+        return articles
+
+    def _analyze_articles(self, articles, concurrency=None, pack=None):
+        """
+        Analyze a list of articles, returning how many were processed.
+
+        Keyword analysis runs first for every article. Articles that need
+        Claude are grouped into jobs (one article each, or several short
+        articles per request when `pack` is enabled) that run on a pool of
+        `concurrency` worker threads. Database updates and event creation
+        happen on the calling thread, one article at a time, as results
+        come back.
+        """
+        concurrency = concurrency or CLAUDE_MAX_CONCURRENCY
+        pack = CLAUDE_PACKING_ENABLED if pack is None else pack
+        analyzed_count = 0
+        processed_ids = set() # Keep track of processed articles in this run
+        claude_items = []
+
+        for article in articles:
+            # Ensure article has an _id
+            article_id = article.get('_id')
+            if not article_id:
+                 logger.error(f"Article missing _id: {article.get('title', 'No title')}")
+                 continue # Skip this article
+
+            # Avoid reprocessing if somehow fetched twice (shouldn't happen with correct query)
+            if article_id in processed_ids:
+                 logger.warning(f"Attempted to reprocess article ID {article_id}. Skipping.")
+                 continue
+            processed_ids.add(article_id)
+
+            try:
                 logger.info(f"Analyzing article: {article.get('title', 'No title')} (ID: {article_id})")
 
                 # First stage: keyword-based analysis
                 keyword_results = self._keyword_analysis(article)
                 logger.debug(f"Keyword analysis result for {article_id}: {keyword_results}")
 
+                # Second stage: Claude analysis for articles that matched keywords,
+                # unless another article of the same story already has a verdict
+                if self._should_use_claude(article, keyword_results):
+                    cluster_results = self._cluster_verdict(article, keyword_results)
+                    if cluster_results is not None:
+                        if self._store_article_analysis(article, keyword_results, cluster_results):
+                            analyzed_count += 1
+                    else:
+                        claude_items.append((article, keyword_results))
+                else:
+                    if self._store_article_analysis(article, keyword_results, None):
+                        analyzed_count += 1
+            except Exception as e:
+                # Log the full traceback for better debugging
+                logger.exception(f"Error analyzing article {article.get('_id', 'Unknown ID')}: {str(e)}")
 
-                # Second stage: Claude analysis for articles that matched keywords
-                claude_results = None
-                should_try_claude = keyword_results['categorized'] and self.USE_CLAUDE_ANALYSIS and keyword_results.get('should_use_claude', False)
+        claude_items, cluster_members = self._hold_cluster_members(claude_items)
+        claude_items = self._prioritize_claude_items(claude_items)
 
-                if should_try_claude:
-                    logger.info(f"Attempting Claude analysis for article ID: {article_id}")
-                    claude_results = self._claude_analysis(article, keyword_results)
-                    if claude_results:
-                         logger.debug(f"Claude analysis result for {article_id}: {claude_results}")
-                    else:
-                         logger.warning(f"Claude analysis failed or returned no result for article ID: {article_id}")
-                elif not self.USE_CLAUDE_ANALYSIS and keyword_results.get('should_use_claude', False):
-                    logger.info(f"Skipping Claude analysis (globally disabled) for article ID: {article_id}")
-                elif not keyword_results['categorized']:
-                     logger.debug(f"Skipping Claude analysis (not categorized by keywords) for article ID: {article_id}")
-
-
-                # Combine results
-                analysis_results = self._combine_analysis_results(keyword_results, claude_results)
-                logger.debug(f"Combined analysis result for {article_id}: {analysis_results}")
-
-
-                # Update article with analysis results in the database
-                self.articles_collection.update_one(
-                    {'_id': article_id},
-                    {'$set': {
-                        'analyzed': True,
-                        'analysis_date': datetime.datetime.now().isoformat(),
-                        'analysis_results': analysis_results
-                    }}
-                )
-                logger.info(f"Marked article {article_id} as analyzed.")
+        jobs = self._pack_claude_items(claude_items) if pack else [[item] for item in claude_items]
+        if pack:
+            logger.info(f"Packed {len(claude_items)} articles into {len(jobs)} Claude requests.")
+
+        if concurrency <= 1 or len(jobs) <= 1:
+            completed = (self._run_claude_job(job) for job in jobs)
+            for job_results in completed:
+                analyzed_count += self._store_job_results(job_results)
+        else:
+            logger.info(f"Running {len(jobs)} Claude jobs with up to {concurrency} concurrent requests.")
+            with ThreadPoolExecutor(max_workers=concurrency) as executor:
+                futures = [executor.submit(self._run_claude_job, job) for job in jobs]
+                for future in as_completed(futures):
+                    try:
+                        analyzed_count += self._store_job_results(future.result())
+                    except Exception as e:
+                        logger.exception(f"Error in Claude analysis job: {str(e)}")
+
+        analyzed_count += self._store_cluster_members(cluster_members)
+
+        self.bulk_writer.flush()
+        self._finish_claimed_articles()
+        self._save_category_streaks()
+
+        logger.info(f"Analyzer writes: {self.bulk_writer.stats()}")
+        logger.info(f"Claude rate limiter: {self.rate_limiter.stats()}")
+        logger.info(f"Claude usage: {self.claude_client.stats()}")
+        logger.info(f"Claude HTTP connections: {self.claude_client.http.stats()}")
+        logger.info(f"Claude spend: {self.token_budget.stats()}")
+        logger.info(f"Claude routing: {self._routing_summary()}")
+        if self.preclassifier is not None:
+            logger.info(f"Pre-classifier skipped {self.preclassifier_skipped} articles so far")
+        logger.info(f"Story clusters: {self.cluster_propagated} articles reused their cluster's Claude verdict so far")
+        logger.info(f"Claude analysis cache: {self.analysis_cache.stats()}")
+        return analyzed_count
 
+    def _should_use_claude(self, article, keyword_results):
+        """Decide whether an article goes on to Claude analysis, logging why not."""
+        article_id = article.get('_id')
+        should_try_claude = keyword_results['categorized'] and self.USE_CLAUDE_ANALYSIS and keyword_results.get('should_use_claude', False)
+
+        # Yellow-only articles with few keyword matches are not worth a Claude call;
+        # orange and red indicators always are
+        below_threshold = (
+            self._keyword_priority(keyword_results)[0] <= SEVERITY_RANK['yellow']
+            and keyword_results.get('match_count', 0) < CLAUDE_MATCH_THRESHOLD
+        )
+
+        if should_try_claude and below_threshold:
+            logger.info(f"Skipping Claude analysis (yellow-only, {keyword_results.get('match_count', 0)} matches < threshold {CLAUDE_MATCH_THRESHOLD}) for article ID: {article_id}")
+            should_try_claude = False
+        elif should_try_claude and self._preclassifier_skips(article, keyword_results):
+            should_try_claude = False
+        elif should_try_claude:
+            logger.info(f"Queueing Claude analysis for article ID: {article_id}")
+        elif not self.USE_CLAUDE_ANALYSIS and keyword_results.get('should_use_claude', False):
+            logger.info(f"Skipping Claude analysis (globally disabled) for article ID: {article_id}")
+        elif not keyword_results['categorized']:
+             logger.debug(f"Skipping Claude analysis (not categorized by keywords) for article ID: {article_id}")
+
+        return should_try_claude
+
+    def _load_preclassifier(self):
+        """Load the trained pre-classifier, or None if it is disabled, untrained or NumPy is missing."""
+        if not PRECLASSIFIER_ENABLED:
+            return None
+        if PreClassifier is None:
+            logger.warning("Pre-classifier enabled but NumPy is not installed. Sending every eligible article to Claude.")
+            return None
+        if not os.path.exists(PRECLASSIFIER_MODEL_PATH):
+            logger.info(f"No pre-classifier model at {PRECLASSIFIER_MODEL_PATH}. Train one with scripts/train_preclassifier.py.")
+            return None
+        try:
+            model = PreClassifier.load(PRECLASSIFIER_MODEL_PATH)
+            logger.info(f"Loaded pre-classifier (threshold {model.threshold:.3f}, trained {model.metadata.get('trained_at')})")
+            return model
+        except Exception as e:
+            logger.error(f"Error loading pre-classifier from {PRECLASSIFIER_MODEL_PATH}: {str(e)}")
+            return None
 
-                # For categorized articles, create events
-                if analysis_results.get('categorized', False):
-                    self._create_events(article, analysis_results)
-                else:
-                     logger.debug(f"Article {article_id} not categorized, no event created.")
+    def _preclassifier_skips(self, article, keyword_results):
+        """
+        Check whether the pre-classifier lets a yellow-only article skip Claude.
+
+        Orange and red keyword hits always go to Claude. A small random share
+        of skippable articles goes anyway (PRECLASSIFIER_EXPLORE_RATE), so
+        later training data still covers the articles the model would skip.
+        """
+        if self.preclassifier is None or self._keyword_priority(keyword_results)[0] > SEVERITY_RANK['yellow']:
+            return False
+
+        skip, probability = self.preclassifier.should_skip(article)
+        if not skip:
+            return False
+        if random.random() < PRECLASSIFIER_EXPLORE_RATE:
+            logger.info(f"Sending article {article.get('_id')} to Claude despite low pre-classifier probability ({probability:.3f}) to keep training data unbiased")
+            return False
 
+        self.preclassifier_skipped += 1
+        logger.info(f"Skipping Claude analysis (pre-classifier probability {probability:.3f} < {self.preclassifier.threshold:.3f}) for article ID: {article.get('_id')}")
+        return True
 
-                analyzed_count += 1
+    def _cluster_verdict(self, article, keyword_results):
+        """
+        Get the Claude verdict of an article's story cluster, or None.
+
+        Only articles that joined an existing cluster reuse a verdict, and
+        only when Claude judged every category the article's keywords flagged.
+        """
+        cluster_id = article.get('cluster_id')
+        if not cluster_id or article.get('cluster_primary'):
+            return None
+
+        verdict = self.analysis_cache.get(self.analysis_cache.make_cluster_key(cluster_id, CLAUDE_PROMPT_VERSION))
+        if verdict is None or not set(self._flagged_categories(keyword_results)) <= set(verdict['categories']):
+            return None
+
+        self.cluster_propagated += 1
+        logger.info(f"Using Claude verdict of article {verdict.get('cluster_representative')} for article {article.get('_id')} (story cluster {cluster_id})")
+        return verdict
+
+    def _hold_cluster_members(self, claude_items):
+        """
+        Keep one article per story cluster for Claude and hold back the rest.
+
+        A cluster's primary article (its first collected) is its
+        representative when it is in the run, otherwise its oldest article
+        is. Other members are held only if the representative's keywords
+        flagged every category theirs did, so its verdict covers them.
+
+        Returns:
+            tuple: (items to send to Claude, {cluster id: [held items]})
+        """
+        representatives = {}
+        for article, keyword_results in claude_items:
+            cluster_id = article.get('cluster_id')
+            if cluster_id and (cluster_id not in representatives or article.get('cluster_primary')):
+                representatives[cluster_id] = (article, keyword_results)
+
+        selected = []
+        held = {}
+        for article, keyword_results in claude_items:
+            cluster_id = article.get('cluster_id')
+            representative = representatives.get(cluster_id)
+            if (
+                representative is None or representative[0] is article
+                or not set(self._flagged_categories(keyword_results)) <= set(self._flagged_categories(representative[1]))
+            ):
+                selected.append((article, keyword_results))
+            else:
+                held.setdefault(cluster_id, []).append((article, keyword_results))
+
+        if held:
+            logger.info(f"Holding {sum(len(items) for items in held.values())} articles for the Claude verdict of their story cluster representative.")
+        return selected, held
 
-                # Slight delay to avoid overwhelming Claude API if it was used
-                if claude_results:
-                    time.sleep(1) # Consider making delay configurable
+    def _store_cluster_members(self, cluster_members):
+        """
+        Store held cluster members with their representative's verdict,
+        returning how many were stored.
 
+        Members whose representative got no verdict (deferred, refused or
+        failed) are deferred as well; a later run analyzes them on their own.
+        """
+        stored = 0
+        for cluster_id, items in cluster_members.items():
+            for article, keyword_results in items:
+                try:
+                    cluster_results = self._cluster_verdict(article, keyword_results)
+                    if cluster_results is None:
+                        self.deferred_count += 1
+                        logger.info(f"Deferring article {article.get('_id')}: story cluster {cluster_id} has no Claude verdict yet.")
+                        continue
+                    if self._store_article_analysis(article, keyword_results, cluster_results):
+                        stored += 1
+                except Exception as e:
+                    logger.exception(f"Error analyzing article {article.get('_id', 'Unknown ID')}: {str(e)}")
+        return stored
+
+    def _keyword_priority(self, keyword_results):
+        """Priority of an article for Claude analysis: (highest keyword severity rank, match count)."""
+        highest = max((SEVERITY_RANK.get(severity, 0) for severity in keyword_results.get('categories', {}).values()), default=0)
+        return highest, keyword_results.get('match_count', 0)
+
+    def _start_claude_budget(self):
+        """Reset the per-run Claude call budget (CLAUDE_MAX_CALLS_PER_RUN) and token/cost budget."""
+        self._claude_calls_remaining = CLAUDE_MAX_CALLS_PER_RUN
+        self.deferred_count = 0
+        self.unavailable_count = 0
+        self.downgraded_count = 0
+        self._token_budget_exhausted = False
+        self.token_budget.start_run()
+
+    def _prioritize_claude_items(self, claude_items):
+        """
+        Order (article, keyword_results) items for Claude, strongest keyword
+        signal first.
+
+        Red and orange keyword hits go before yellow ones, more matches before
+        fewer, and otherwise the original (oldest collected first) order is
+        kept. Jobs run in this order, so once the run's Claude calls are used
+        up it is the lower-priority articles that are deferred to a later run.
+
+        Returns:
+            list: The items in the order to send them to Claude
+        """
+        # sorted() is stable, so ties keep their collected_at order
+        return sorted(claude_items, key=lambda item: self._keyword_priority(item[1]), reverse=True)
+
+    def _take_claude_call(self):
+        """Count a request against the run's Claude calls, returning False if none are left."""
+        with self._claude_calls_lock:
+            if self._claude_calls_remaining is None:
+                return True
+            if self._claude_calls_remaining <= 0:
+                return False
+            self._claude_calls_remaining -= 1
+            return True
+
+    def _return_claude_call(self):
+        """Give back a Claude call that was taken but not sent."""
+        with self._claude_calls_lock:
+            if self._claude_calls_remaining is not None:
+                self._claude_calls_remaining += 1
+
+    def _run_claude_job(self, job):
+        """
+        Run Claude analysis for one job of (article, keyword_results) items.
+        Safe to call from worker threads.
+
+        Returns:
+            list: (article, keyword_results, claude_results) tuples, with
+                  claude_results CLAUDE_BUDGET_EXCEEDED for articles the
+                  token/cost budget had no room for, CLAUDE_CALL_LIMIT for
+                  articles left once the run's Claude calls were used up and
+                  CLAUDE_UNAVAILABLE for articles the API kept failing on
+        """
+        if len(job) == 1:
+            article, keyword_results = job[0]
+            try:
+                claude_results = self._claude_analysis(article, keyword_results)
+            except ClaudeCallLimitReached:
+                claude_results = CLAUDE_CALL_LIMIT
+            except BudgetExceeded as e:
+                self._token_budget_exhausted = True
+                logger.warning(f"Claude budget refused article {article.get('_id')}: {str(e)}")
+                claude_results = CLAUDE_BUDGET_EXCEEDED
+            except ClaudeUnavailable as e:
+                logger.error(f"Claude unavailable for article {article.get('_id')}: {str(e)}")
+                claude_results = CLAUDE_UNAVAILABLE
+            if not claude_results:
+                 logger.warning(f"Claude analysis failed or returned no result for article ID: {article.get('_id')}")
+            return [(article, keyword_results, claude_results)]
+        return self._claude_packed_analysis(job)
+
+    def _store_job_results(self, job_results):
+        """
+        Store the results of a Claude job, returning how many articles were stored.
+
+        Articles the budget refused are downgraded to keyword-only analysis if
+        keywords flagged them yellow at most, and deferred otherwise: orange
+        and red hits stay unanalyzed until a run with budget left can send
+        them to Claude. Articles left over once the run's Claude calls were
+        used up, and articles the API kept failing on, are always deferred
+        rather than stored without their Claude analysis.
+        """
+        stored = 0
+        for article, keyword_results, claude_results in job_results:
+            try:
+                if claude_results is CLAUDE_CALL_LIMIT:
+                    self.deferred_count += 1
+                    logger.info(f"Deferring article {article.get('_id')} to a later run: this run's Claude calls are used up.")
+                    continue
+                if claude_results is CLAUDE_UNAVAILABLE:
+                    self.deferred_count += 1
+                    self.unavailable_count += 1
+                    logger.info(f"Deferring article {article.get('_id')} until Claude is reachable again.")
+                    continue
+                if claude_results is CLAUDE_BUDGET_EXCEEDED:
+                    if self._keyword_priority(keyword_results)[0] >= SEVERITY_RANK['orange']:
+                        self.deferred_count += 1
+                        logger.info(f"Deferring article {article.get('_id')} until Claude budget is available.")
+                        continue
+                    self.downgraded_count += 1
+                    logger.info(f"Storing keyword-only analysis for yellow-only article {article.get('_id')} (Claude budget reached).")
+                    claude_results = None
+                elif claude_results:
+                     logger.debug(f"Claude analysis result for {article.get('_id')}: {claude_results}")
+                if self._store_article_analysis(article, keyword_results, claude_results):
+                    stored += 1
             except Exception as e:
-                # Log the full traceback for better debugging
                 logger.exception(f"Error analyzing article {article.get('_id', 'Unknown ID')}: {str(e)}")
-                # Optionally, mark article as failed analysis?
-                # try:
-                #     self.articles_collection.update_one({'_id': article_id}, {'$set': {'analyzed': True, 'analysis_failed': True, 'error': str(e)}})
-                # except Exception as update_err:
-                #      logger.error(f"Failed to mark article {article_id} as failed: {update_err}")
+        return stored
 
+    def _store_article_analysis(self, article, keyword_results, claude_results):
+        """
+        Combine results, mark the article as analyzed and create its events (buffered). Call from one thread only.
 
-        # Generate summary after analysis run completes
-        logger.info("Analysis loop finished.")
-        self._generate_summary()
+        A claimed article is only written while this worker's claim on it
+        still holds; otherwise nothing is written, not even its events.
 
+        Returns:
+            bool: True if the analysis was stored
+        """
+        article_id = article.get('_id')
 
-        logger.info(f"Completed analysis run. Processed {analyzed_count} articles.")
+        # Checked before any side effect: another worker that took over the article writes its own events
+        if article.get('lease_token') and self.work_queue is not None and not self.work_queue.confirm(article):
+            logger.warning(f"Not storing analysis of article {article_id}: its lease was lost to another worker.")
+            return False
+
+        # A re-analyzed article replaces its earlier events instead of adding to them
+        if article.get('analyzed'):
+            self._drop_article_events(article_id)
+
+        # Combine results
+        analysis_results = self._combine_analysis_results(keyword_results, claude_results)
+        logger.debug(f"Combined analysis result for {article_id}: {analysis_results}")
+
+        # The first Claude verdict in a story cluster stands for its other articles
+        if (
+            article.get('cluster_id') and self._claude_result_ok(claude_results)
+            and not claude_results.get('cluster_representative')
+        ):
+            self.analysis_cache.put(
+                self.analysis_cache.make_cluster_key(article['cluster_id'], CLAUDE_PROMPT_VERSION),
+                dict(claude_results, cluster_representative=str(article_id))
+            )
+
+
+        # Update article with analysis results in the database (buffered ahead of its events);
+        # a claimed article is only updated while this worker's claim on it still holds
+        article_filter = {'_id': article_id}
+        if article.get('lease_token'):
+            article_filter['lease_token'] = article['lease_token']
+        self.bulk_writer.update_one(
+            self.articles_collection,
+            article_filter,
+            {'$set': {
+                'analyzed': True,
+                'analysis_date': datetime.datetime.now().isoformat(),
+                'analysis_results': analysis_results
+            }}
+        )
+        self._stored_ids.add(article_id)
+        logger.info(f"Marked article {article_id} as analyzed.")
+
+
+        # For categorized articles, create events
+        if analysis_results.get('categorized', False):
+            self._create_events(article, analysis_results)
+        else:
+             logger.debug(f"Article {article_id} not categorized, no event created.")
+        return True
+
+    def _drop_article_events(self, article_id):
+        """Delete the events of an earlier analysis of the article (aggregates are rebuilt after the run)."""
+        try:
+            self.events_collection.delete_many({'article_id': article_id})
+            self._events_replaced = True
+            logger.debug(f"Dropped earlier events of re-analyzed article {article_id}")
+        except Exception as e:
+            logger.exception(f"Error dropping earlier events of article {article_id}: {e}")
+
+    def _fetch_articles(self, query, limit=None):
+        """
+        Fetch articles matching query, oldest collected first.
+
+        With the work queue enabled the articles are claimed for this worker
+        and must be handed back with _finish_claimed_articles.
+        """
+        try:
+            # Use sort argument for pymongo, mock handles it internally
+            sort_order = [('collected_at', pymongo.ASCENDING if not is_mock_db else 1)] # Process oldest first within the window
+            if self.work_queue is not None:
+                 articles = self.work_queue.claim(query, limit, sort=sort_order)
+                 self._claimed_ids.update(article['_id'] for article in articles)
+            elif is_mock_db:
+                 # Mock find directly accepts sort list
+                 articles_cursor_or_list = self.articles_collection.find(query, limit=limit, sort=sort_order)
+                 articles = articles_cursor_or_list # Mock returns a list
+            else:
+                 # Real pymongo uses cursor methods
+                 articles_cursor_or_list = self.articles_collection.find(query).sort(sort_order)
+                 if limit:
+                      articles_cursor_or_list = articles_cursor_or_list.limit(limit)
+                 articles = list(articles_cursor_or_list)
+
+
+        except Exception as e:
+             logger.exception(f"Error fetching articles from database: {e}")
+             articles = []
+
+        return articles
+
+    def _finish_claimed_articles(self):
+        """
+        Complete the claimed articles that were stored and release the rest.
+
+        Call after the bulk writer has been flushed, so no lease is dropped
+        before the article is marked as analyzed.
+        """
+        if self.work_queue is None:
+            return
+        completed = self._claimed_ids & self._stored_ids
+        self.work_queue.complete(completed)
+        self.work_queue.release(self._claimed_ids - completed)
+        logger.info(f"Work queue: {self.work_queue.stats()}")
+        self._claimed_ids.clear()
+        self._stored_ids.clear()
+
+    def analyze_pending_batch(self, days=None, limit=None, poll_interval=None, timeout=None, reanalyze=False):
+        """
+        Analyze articles through the Message Batches API.
+
+        Meant for backlogs and overnight re-analysis, where throughput and
+        batch pricing matter more than latency. Prompts are built exactly as
+        for the synchronous path, sent as batch jobs, and the results are
+        parsed, combined and turned into events the same way. Requests go out
+        strongest keyword signal first and count against the run's Claude
+        calls (CLAUDE_MAX_CALLS_PER_RUN); articles over the limit are deferred.
+        Each batch job is priced at batch rates against the run and daily
+        Claude budgets before it is submitted, and only the requests the
+        budgets allow are sent; the usage of every succeeded request is recorded.
+
+        Re-analyzed articles replace their earlier events, and the event
+        aggregates are rebuilt once the run is done. Verdicts cached for the
+        current model and prompt version are reused, so re-analysis only sends
+        articles to Claude after either changes.
+
+        Args:
+            days (int, optional): Only articles collected in the last N days (default: all)
+            limit (int, optional): Maximum number of articles to process
+            poll_interval (int, optional): Seconds between batch status polls
+            timeout (int, optional): Seconds to wait for each batch to end
+            reanalyze (bool): Also select articles that were already analyzed
+
+        Returns:
+            int: Number of articles analyzed
+        """
+        poll_interval = poll_interval or CLAUDE_BATCH_POLL_SECONDS
+        timeout = timeout or CLAUDE_BATCH_TIMEOUT_SECONDS
+        self.USE_CLAUDE_ANALYSIS = ANTHROPIC_API_KEY != "dummy_key"
+        if not self.USE_CLAUDE_ANALYSIS:
+             logger.warning("Claude analysis is disabled (ANTHROPIC_API_KEY is 'dummy_key' or missing). Use analyze_recent_articles instead.")
+             return 0
+        self._start_claude_budget()
+
+        query = {} if reanalyze else {'analyzed': False}
+        if days:
+            query['collected_at'] = {'$gte': (datetime.datetime.now() - datetime.timedelta(days=days)).isoformat()}
+        articles = self._fetch_articles(query, limit)
+        logger.info(f"Found {len(articles)} {'articles to re-analyze' if reanalyze else 'unanalyzed articles'} for batch analysis.")
+        self._events_replaced = False
+
+        analyzed_count = 0
+        claude_items = [] # (article, keyword_results, flagged_categories, cache_key)
+
+        for article in articles:
+            article_id = article.get('_id')
+            if not article_id:
+                 logger.error(f"Article missing _id: {article.get('title', 'No title')}")
+                 continue
+            try:
+                keyword_results = self._keyword_analysis(article)
+                flagged_categories = self._flagged_categories(keyword_results)
+
+                if not (self._should_use_claude(article, keyword_results) and flagged_categories):
+                    if self._store_article_analysis(article, keyword_results, None):
+                        analyzed_count += 1
+                    continue
+
+                cache_key = self.analysis_cache.make_key(article, flagged_categories, CLAUDE_MODEL, CLAUDE_PROMPT_VERSION)
+                cached_results = self._cluster_verdict(article, keyword_results) or self.analysis_cache.get(cache_key)
+                if cached_results is not None:
+                    if self._store_article_analysis(article, keyword_results, cached_results):
+                        analyzed_count += 1
+                    continue
+
+                claude_items.append((article, keyword_results, flagged_categories, cache_key))
+            except Exception as e:
+                logger.exception(f"Error preparing article {article_id} for batch analysis: {str(e)}")
+
+        pending = {} # custom_id -> (article, keyword_results, flagged_categories, cache_key)
+        batch_requests = []
+        for item in self._prioritize_claude_items(claude_items):
+            article = item[0]
+            if not self._take_claude_call():
+                self.deferred_count += 1
+                logger.info(f"Deferring article {article['_id']} to a later run: this run's Claude calls are used up.")
+                continue
+            try:
+                custom_id = str(article['_id'])
+                prompt = self._construct_claude_prompt(article, item[2])
+                batch_requests.append({'custom_id': custom_id, 'params': self._build_claude_request(prompt)})
+                pending[custom_id] = item
+            except Exception as e:
+                self._return_claude_call()
+                logger.exception(f"Error building batch request for article {article['_id']}: {str(e)}")
+
+        client = MessageBatchClient(ANTHROPIC_API_KEY, base_url=ANTHROPIC_API_URL)
+
+        for start in range(0, len(batch_requests), CLAUDE_BATCH_MAX_REQUESTS):
+            chunk = batch_requests[start:start + CLAUDE_BATCH_MAX_REQUESTS]
+
+            # Priced at batch rates before submitting, so batch spend counts against the run and daily budgets
+            reservations = self.token_budget.reserve_many([request['params'] for request in chunk], CLAUDE_BATCH_PRICE_FACTOR)
+            if len(reservations) < len(chunk):
+                self._token_budget_exhausted = True
+                logger.info(f"Claude budget allows {len(reservations)} of the next {len(chunk)} batch requests. The rest wait for a later run.")
+                chunk = chunk[:len(reservations)]
+                if not chunk:
+                    break
+            reserved = {
+                request['custom_id']: (reservation, request['params']['model'])
+                for request, reservation in zip(chunk, reservations)
+            }
+
+            try:
+                batch = client.create_batch(chunk)
+                batch = client.wait_for_batch(batch['id'], poll_interval=poll_interval, timeout=timeout)
+                if batch is None:
+                    # Articles stay unanalyzed and are picked up by a later run. The batch is
+                    # still billed when it ends, so its estimate stays held for the rest of this run.
+                    reserved.clear()
+                    continue
+
+                for custom_id, response_text, result_type, usage in client.iter_results(batch):
+                    if custom_id not in pending or custom_id not in reserved:
+                        logger.warning(f"Batch result for unknown request {custom_id}")
+                        continue
+                    reservation, model = reserved.pop(custom_id)
+                    if result_type != 'succeeded':
+                        # Errored, expired and canceled requests are not billed and stay unanalyzed for a later run
+                        self.token_budget.release(reservation)
+                        continue
+                    self.token_budget.record(reservation, model, usage, CLAUDE_BATCH_PRICE_FACTOR)
+                    article, keyword_results, flagged_categories, cache_key = pending.pop(custom_id)
+                    try:
+                        claude_results = None
+                        if response_text is not None:
+                            claude_results = self._handle_claude_response(article, response_text, flagged_categories, cache_key)
+                        if self._store_article_analysis(article, keyword_results, claude_results):
+                            analyzed_count += 1
+                    except Exception as e:
+                        logger.exception(f"Error storing batch analysis for article {custom_id}: {str(e)}")
+            except Exception as e:
+                logger.exception(f"Error running message batch: {str(e)}")
+            finally:
+                # Requests that got no result were not billed
+                for reservation, _ in reserved.values():
+                    self.token_budget.release(reservation)
+
+            if self._token_budget_exhausted:
+                break
+
+        if pending:
+            logger.warning(f"{len(pending)} articles left unanalyzed after batch processing.")
+        logger.info(f"Claude spend: {self.token_budget.stats()}")
+
+        self.bulk_writer.flush()
+        self._finish_claimed_articles()
+        self._save_category_streaks()
+        if self._events_replaced:
+            # Dropped events were counted in the aggregates
+            self.rebuild_event_aggregates()
+        self._generate_summary()
+        logger.info(f"Completed batch analysis run. Processed {analyzed_count} articles.")
         return analyzed_count
 
     # --- Analysis Helper Methods ---
@@ -497,89 +1554,60 @@ class NewsAnalyzer:
         # Combine title and content for analysis, handle None values
         title = article.get('title', '') or ''
         content = article.get('content', '') or ''
-        text = f"{title} {content}".lower()
+        text = f"{title} {content}"
+
+        # Single pass over the text for every category and tier
+        hits = self.category_index.find_hits(text)
+        severities, match_count = self.category_index.classify(hits)
 
         results = {
             'categorized': False,
             'categories': {},
             'method': 'keyword',
             'should_use_claude': False,
-            'match_count': 0
+            'match_count': match_count,
+            'hits': hits
         }
 
         # Initialize all categories to green first
         for category_id in self.categories.keys():
-             results['categories'][category_id] = 'green'
+             results['categories'][category_id] = severities.get(category_id, 'green')
 
 
-        # Check each category for keyword matches
-        for category_id, category_data in self.categories.items():
-            if not isinstance(category_data, dict):
-                 logger.warning(f"Skipping category '{category_id}': Invalid data format in CATEGORIES config.")
-                 continue
-
-            severity = 'green' # Start at green for this category
-            category_match_count = 0
-
-            # Ensure keywords/indicators are lists and handle potential None values inside lists
-            base_keywords = [kw.lower() for kw in category_data.get('keywords', []) if kw]
-            orange_indicators = [ind.lower() for ind in category_data.get('orange_indicators', []) if ind]
-            red_indicators = [ind.lower() for ind in category_data.get('red_indicators', []) if ind]
-
-
-            # Check base keywords -> Yellow
-            for keyword in base_keywords:
-                if keyword in text:
-                    severity = 'yellow'
-                    category_match_count += 1
-                    break # Found yellow, move to check orange
-
-            # Check orange indicators -> Orange (only if already yellow or higher)
-            if severity != 'green':
-                for indicator in orange_indicators:
-                    if indicator in text:
-                        severity = 'orange'
-                        category_match_count += 2
-                        break # Found orange, move to check red
-
-            # Check red indicators -> Red (only if already orange or higher)
-            # Corrected logic: Check only if orange was reached
-            if severity == 'orange': # Check specifically if orange was reached
-                 for indicator in red_indicators:
-                     if indicator in text:
-                         severity = 'red'
-                         category_match_count += 3
-                         break # Found red, stop checking for this category
-
-
-            # Update results for this category
-            results['categories'][category_id] = severity
-            results['match_count'] += category_match_count
-
-
-            # If this category triggered a non-green status, mark for potential Claude use
-            if severity != 'green':
-                results['categorized'] = True # Mark overall as categorized
-                results['should_use_claude'] = True # Mark that Claude might be useful
+        # If any category triggered a non-green status, mark for potential Claude use
+        if any(severity != 'green' for severity in results['categories'].values()):
+            results['categorized'] = True # Mark overall as categorized
+            results['should_use_claude'] = True # Mark that Claude might be useful
 
 
         return results
 
+    def _flagged_categories(self, keyword_results):
+        """Get categories that were flagged yellow or higher by keywords."""
+        return [
+            cat_id for cat_id, severity in keyword_results.get('categories', {}).items()
+            if severity != 'green'
+        ]
+
     def _claude_analysis(self, article, keyword_results):
         """Perform second-stage Claude-based analysis."""
         article_id = article.get('_id', 'Unknown ID')
         try:
             # Get categories that were flagged yellow or higher by keywords
-            flagged_categories = [
-                cat_id for cat_id, severity in keyword_results.get('categories', {}).items()
-                if severity != 'green'
-            ]
+            flagged_categories = self._flagged_categories(keyword_results)
 
             if not flagged_categories:
                  logger.debug(f"Skipping Claude analysis for {article_id}: No categories flagged >= yellow by keywords.")
                  return None # No categories need Claude's review
 
 
+            # Identical text for the same categories, model and prompt needs no new request
+            cache_key = self.analysis_cache.make_key(article, flagged_categories, self.claude_route, CLAUDE_PROMPT_VERSION)
+            cached_results = self.analysis_cache.get(cache_key)
+            if cached_results is not None:
+                 logger.info(f"Using cached Claude analysis for article {article_id}")
+                 return cached_results
+
             logger.info(f"Requesting Claude analysis for categories: {flagged_categories} in article {article_id}")
             # Construct the prompt for Claude
             prompt = self._construct_claude_prompt(article, flagged_categories)
@@ -592,58 +1620,273 @@ class NewsAnalyzer:
                  logger.error(f"Claude API call failed or returned None for article {article_id}")
                  return None # Indicate failure
 
-
-            # Parse Claude's response
-            # logger.debug(f"Raw Claude response for {article_id}: {response_text}") # Be careful logging full responses
-            claude_results = self._parse_claude_response(response_text, flagged_categories)
-
-            # Add method indicator if parsing was successful (check for key keys)
-            if claude_results and 'categories' in claude_results:
-                 claude_results['method'] = 'claude'
-                 # Log success only if parsing didn't return the error structure
-                 if 'Parsing failed' not in claude_results.get('explanation', ''):
-                      logger.info(f"Claude analysis and parsing successful for article {article_id}")
-                 else:
-                      logger.warning(f"Claude analysis successful but parsing failed for article {article_id}")
-                 return claude_results
-            else:
-                 # This case might occur if _parse_claude_response returned None directly
-                 logger.error(f"Failed to parse Claude response or parser returned None for article {article_id}")
-                 return None
+            claude_results = self._handle_claude_response(article, response_text, flagged_categories)
+            return self._route_claude_result(article, flagged_categories, claude_results, cache_key)
 
 
+        except (BudgetExceeded, ClaudeUnavailable):
+            raise
         except Exception as e:
             logger.exception(f"Error during Claude analysis pipeline for article {article_id}: {str(e)}")
             return None # Indicate failure
 
-    def _construct_claude_prompt(self, article, flagged_categories):
-        """Construct a prompt for Claude to analyze the article."""
-        # Ensure content is not excessively long - consider truncation if necessary
-        max_content_length = 10000 # Example limit (adjust based on model context window and cost)
-        content = article.get('content', 'No content') or 'No content'
-        if len(content) > max_content_length:
-             logger.warning(f"Article content truncated for Claude prompt (ID: {article.get('_id')})")
-             content = content[:max_content_length] + "... (truncated)"
+    def _handle_claude_response(self, article, response_text, flagged_categories, cache_key=None, model=None):
+        """Parse a Claude response for an article and cache it (if cache_key is given) if parsing succeeded."""
+        article_id = article.get('_id', 'Unknown ID')
 
+        # Parse Claude's response
+        # logger.debug(f"Raw Claude response for {article_id}: {response_text}") # Be careful logging full responses
+        claude_results = self._parse_claude_response(response_text, flagged_categories)
+
+        # Add method indicator if parsing was successful (check for key keys)
+        if claude_results and 'categories' in claude_results:
+             claude_results['method'] = 'claude'
+             claude_results['model'] = model or CLAUDE_MODEL
+             # Log success only if parsing didn't return the error structure
+             if 'Parsing failed' not in claude_results.get('explanation', ''):
+                  logger.info(f"Claude analysis and parsing successful for article {article_id}")
+                  if cache_key is not None:
+                       self.analysis_cache.put(cache_key, claude_results)
+             else:
+                  logger.warning(f"Claude analysis successful but parsing failed for article {article_id}")
+             return claude_results
+        else:
+             # This case might occur if _parse_claude_response returned None directly
+             logger.error(f"Failed to parse Claude response or parser returned None for article {article_id}")
+             return None
 
-        # Improved prompt clarity and structure
-        prompt = f"""
-        Analyze the news article provided below according to the "Despotism Readiness Framework".
-        Focus *only* on the following categories: {', '.join(flagged_categories)}.
+    def _claude_result_ok(self, claude_results):
+        """Check that Claude results were parsed successfully."""
+        return bool(
+            claude_results and 'categories' in claude_results
+            and 'Parsing failed' not in claude_results.get('explanation', '')
+        )
 
-        **Article Details:**
-        Title: {article.get('title', 'No title')}
-        Source: {article.get('source', 'Unknown')}
-        Date: {article.get('published_date', 'Unknown')}
+    def _escalation_reason(self, claude_results):
+        """Get why a fast-tier result should be redone with the strong model, or None."""
+        if not self.escalation_enabled or not self._claude_result_ok(claude_results):
+            return None
 
-        **Article Content:**
-        --- START ARTICLE ---
-        {content}
-        --- END ARTICLE ---
+        red = [cat_id for cat_id, severity in claude_results['categories'].items() if severity == 'red']
+        if red:
+            return f"red severity for {', '.join(red)}"
+
+        low = [
+            cat_id for cat_id, confidence in (claude_results.get('confidence') or {}).items()
+            if confidence <= CLAUDE_ESCALATE_MAX_CONFIDENCE
+        ]
+        if low:
+            return f"confidence <= {CLAUDE_ESCALATE_MAX_CONFIDENCE} for {', '.join(low)}"
+        return None
+
+    def _route_claude_result(self, article, flagged_categories, claude_results, cache_key):
+        """
+        Escalate a fast-tier result to the strong model when it reports low
+        confidence or a red severity, then cache whichever result is kept.
+
+        If the strong model fails (or the budget refuses it) the fast-tier
+        result is kept.
+        """
+        article_id = article.get('_id', 'Unknown ID')
+        reason = self._escalation_reason(claude_results)
+
+        if reason:
+            logger.info(f"Routing article {article_id} to {CLAUDE_STRONG_MODEL}: {reason}")
+            with self._routing_lock:
+                self.routing_stats['escalated'] += 1
+
+            try:
+                prompt = self._construct_claude_prompt(article, flagged_categories)
+                response_text = self._call_claude_api(prompt, model=CLAUDE_STRONG_MODEL)
+            except BudgetExceeded as e:
+                logger.warning(f"Claude budget refused escalation of article {article_id}: {str(e)}")
+                response_text = None
+            except ClaudeUnavailable as e:
+                logger.warning(f"Claude unavailable for escalation of article {article_id}: {str(e)}")
+                response_text = None
+
+            strong_results = None
+            if response_text is not None:
+                strong_results = self._handle_claude_response(article, response_text, flagged_categories, model=CLAUDE_STRONG_MODEL)
+
+            if self._claude_result_ok(strong_results):
+                claude_results = strong_results
+            else:
+                logger.warning(f"Escalation failed for article {article_id}. Keeping the {CLAUDE_MODEL} result.")
+                with self._routing_lock:
+                    self.routing_stats['escalation_failed'] += 1
+        elif self._claude_result_ok(claude_results):
+            logger.debug(f"Keeping {CLAUDE_MODEL} result for article {article_id}")
+
+        if self._claude_result_ok(claude_results):
+            self.analysis_cache.put(cache_key, claude_results)
+        return claude_results
+
+    def _record_tier_latency(self, model, seconds):
+        """Count a completed Claude request and its latency under its routing tier."""
+        tier = 'strong' if self.escalation_enabled and model == CLAUDE_STRONG_MODEL else 'fast'
+        with self._routing_lock:
+            self.routing_stats[tier]['requests'] += 1
+            self.routing_stats[tier]['seconds'] += seconds
+
+    def _routing_summary(self):
+        """Get routing counters with the average latency per tier."""
+        with self._routing_lock:
+            summary = {'escalated': self.routing_stats['escalated'], 'escalation_failed': self.routing_stats['escalation_failed']}
+            for tier, model in (('fast', CLAUDE_MODEL), ('strong', CLAUDE_STRONG_MODEL)):
+                stats = self.routing_stats[tier]
+                summary[tier] = {
+                    'model': model,
+                    'requests': stats['requests'],
+                    'avg_latency_seconds': round(stats['seconds'] / stats['requests'], 3) if stats['requests'] else 0.0
+                }
+        return summary
+
+    def _pack_claude_items(self, items):
+        """
+        Group (article, keyword_results) items into Claude jobs.
+
+        Articles longer than CLAUDE_PACK_MAX_ARTICLE_TOKENS get a request of
+        their own. Shorter ones are packed in order into jobs of at most
+        CLAUDE_PACK_MAX_ARTICLES articles whose combined estimated size stays
+        within CLAUDE_PACK_TOKEN_BUDGET, so many short summaries share one
+        copy of the instructions.
+        """
+        jobs = []
+        current = []
+        current_tokens = 0
+
+        for article, keyword_results in items:
+            item = (article, keyword_results)
+            content = self._article_context(article, self._flagged_categories(keyword_results))
+            tokens = estimate_tokens(f"{article.get('title', '') or ''} {content}")
+
+            if tokens > CLAUDE_PACK_MAX_ARTICLE_TOKENS:
+                jobs.append([item])
+                continue
+
+            if current and (len(current) >= CLAUDE_PACK_MAX_ARTICLES or current_tokens + tokens > CLAUDE_PACK_TOKEN_BUDGET):
+                jobs.append(current)
+                current = []
+                current_tokens = 0
+
+            current.append(item)
+            current_tokens += tokens
+
+        if current:
+            jobs.append(current)
+
+        return jobs
+
+    def _claude_packed_analysis(self, items):
+        """
+        Analyze several articles in one Claude request.
+
+        Returns:
+            list: (article, keyword_results, claude_results) tuples, with
+                  claude_results None for articles that could not be analyzed
+        """
+        results = []
+        entries = {} # packed key -> (article, keyword_results, flagged_categories, cache_key)
+
+        for article, keyword_results in items:
+            flagged_categories = self._flagged_categories(keyword_results)
+            if not flagged_categories:
+                results.append((article, keyword_results, None))
+                continue
+
+            cache_key = self.analysis_cache.make_key(article, flagged_categories, self.claude_route, CLAUDE_PROMPT_VERSION)
+            cached_results = self.analysis_cache.get(cache_key)
+            if cached_results is not None:
+                logger.info(f"Using cached Claude analysis for article {article.get('_id')}")
+                results.append((article, keyword_results, cached_results))
+                continue
+
+            entries[f"article_{len(entries) + 1}"] = (article, keyword_results, flagged_categories, cache_key)
+
+        if not entries:
+            return results
+
+        try:
+            if len(entries) == 1:
+                # Nothing left to share the request with
+                article, keyword_results, _, _ = next(iter(entries.values()))
+                results.append((article, keyword_results, self._claude_analysis(article, keyword_results)))
+                return results
+
+            logger.info(f"Requesting packed Claude analysis for {len(entries)} articles")
+            prompt = self._construct_packed_claude_prompt(
+                {key: (article, flagged_categories) for key, (article, _, flagged_categories, _) in entries.items()}
+            )
+            max_tokens = min(CLAUDE_PACK_MAX_OUTPUT_TOKENS, 500 + 700 * len(entries))
+            response_text = self._call_claude_api(prompt, max_tokens=max_tokens, packed=True)
+        except ClaudeCallLimitReached:
+            results.extend((article, keyword_results, CLAUDE_CALL_LIMIT) for article, keyword_results, _, _ in entries.values())
+            return results
+        except BudgetExceeded as e:
+            self._token_budget_exhausted = True
+            logger.warning(f"Claude budget refused packed request of {len(entries)} articles: {str(e)}")
+            results.extend((article, keyword_results, CLAUDE_BUDGET_EXCEEDED) for article, keyword_results, _, _ in entries.values())
+            return results
+        except ClaudeUnavailable as e:
+            logger.error(f"Claude unavailable for packed request of {len(entries)} articles: {str(e)}")
+            results.extend((article, keyword_results, CLAUDE_UNAVAILABLE) for article, keyword_results, _, _ in entries.values())
+            return results
+
+        parsed = {}
+        if response_text is None:
+            logger.error(f"Claude API call failed or returned None for packed request of {len(entries)} articles")
+        else:
+            parsed = self._parse_packed_claude_response(
+                response_text,
+                {key: flagged_categories for key, (_, _, flagged_categories, _) in entries.items()}
+            )
+
+        for key, (article, keyword_results, flagged_categories, cache_key) in entries.items():
+            claude_results = parsed.get(key)
+            if claude_results and 'categories' in claude_results:
+                claude_results['method'] = 'claude'
+                claude_results['model'] = CLAUDE_MODEL
+                if self._claude_result_ok(claude_results):
+                    claude_results = self._route_claude_result(article, flagged_categories, claude_results, cache_key)
+                else:
+                    logger.warning(f"Packed Claude response could not be parsed for article {article.get('_id')}")
+            else:
+                logger.warning(f"Claude analysis failed or returned no result for article ID: {article.get('_id')}")
+                claude_results = None
+            results.append((article, keyword_results, claude_results))
+
+        return results
+
+    def _build_framework_prompt(self):
+        """
+        Build the static framework instructions and category definitions.
+
+        This text is identical for every request, so it forms the cached
+        prefix of the system prompt.
+        """
+        category_lines = []
+        for category_id, category_data in self.categories.items():
+            if not isinstance(category_data, dict):
+                continue
+            category_lines.append(f"""
+        - `{category_id}`: {category_data.get('name', category_id)}
+          {category_data.get('description', '')}
+          Warning signs: {', '.join(category_data.get('keywords', []) or [])}
+          Significant concerns: {', '.join(category_data.get('orange_indicators', []) or [])}
+          Critical threats: {', '.join(category_data.get('red_indicators', []) or [])}""")
+
+        return f"""
+        You analyze news articles according to the "Despotism Readiness Framework", which tracks indicators of democratic backsliding in the United States.
+
+        **Framework Categories:**
+        {''.join(category_lines)}
+
+        Long articles are sent as excerpts around the passages of interest, with omitted text marked `[...]`. Judge only the text you are given.
 
         **Analysis Instructions:**
         1.  **US Focus:** Determine if the article's primary subject matter concerns events, policies, or political discourse within the United States. Respond with `true` or `false`.
-        2.  **Category Assessment:** For EACH category listed [{', '.join(flagged_categories)}]:
+        2.  **Category Assessment:** For EACH category you are asked to focus on:
             a.  **Severity:** Assign **one** severity level: `GREEN`, `YELLOW`, `ORANGE`, or `RED`. Use these definitions:
                 - `GREEN`: No concerning indicators relevant to this category found in the text.
                 - `YELLOW`: Potential early warning signs, minor issues, or ambiguous indicators relevant to this category.
@@ -653,64 +1896,173 @@ class NewsAnalyzer:
             c.  **Confidence:** Provide a confidence score as an **integer** from 1 (low) to 5 (high) reflecting your certainty in the severity assessment for this category based *only* on the provided text.
         3.  **Relevance Summary:** Write a brief (1-3 sentences) overall summary explaining *why* the article is relevant (or not relevant) to the specified framework categories, based on your analysis.
         4.  **Reasoning:** Briefly explain your step-by-step reasoning for assigning the severity levels to each category, referencing the evidence found.
+        """
+
+    def _build_output_format_prompt(self, packed=False):
+        """Build the static output schema for single or packed requests."""
+        if packed:
+            return """
+        **Output Format (several articles):**
+        The message contains several articles, each with an ID and its own focus categories. Analyze each article independently and focus *only* on its listed categories.
+        Respond **only** with a single, valid JSON object keyed by article ID, containing one entry for EVERY article in the message. Do not include any text before or after the JSON object. Ensure all strings are properly escaped. Follow this exact structure:
+
+        ```json
+        {
+          "articles": {
+            "<article_id>": {
+              "is_us_based": <true_or_false>,
+              "categories": {
+                "category_id": {
+                  "severity": "GREEN | YELLOW | ORANGE | RED",
+                  "evidence": ["quote1", ...],
+                  "confidence": <integer_1_to_5>
+                }
+              },
+              "summary": "Brief relevance summary text...",
+              "reasoning": "Reasoning text..."
+            }
+            // ... one entry per article ID ...
+          }
+        }
+        ```
+        """
 
+        return """
         **Output Format:**
         Respond **only** with a single, valid JSON object. Do not include any text before or after the JSON object. Ensure all strings within the JSON are properly escaped (e.g., quotes within evidence strings). Follow this exact structure:
 
         ```json
-        {{
+        {
           "is_us_based": <true_or_false>,
-          "categories": {{
-            "category_id_1": {{
+          "categories": {
+            "category_id_1": {
               "severity": "GREEN | YELLOW | ORANGE | RED",
               "evidence": ["quote1", "quote2", ...],
               "confidence": <integer_1_to_5>
-            }},
-            "category_id_2": {{
+            },
+            "category_id_2": {
               "severity": "GREEN | YELLOW | ORANGE | RED",
               "evidence": ["quote1", ...],
               "confidence": <integer_1_to_5>
-            }}
+            }
             // ... include ALL requested categories ...
-          }},
+          },
           "summary": "Brief relevance summary text...",
           "reasoning": "Step-by-step reasoning text..."
-        }}
+        }
         ```
         """
+
+    def _claude_system_blocks(self, packed=False):
+        """
+        Get the system prompt blocks for a request.
+
+        The framework block is shared by single and packed requests and the
+        output format block differs between them, so each ends in a cache
+        breakpoint: every request reuses the cached framework prefix, and
+        requests of the same kind reuse the whole system prompt.
+        """
+        return [
+            AnthropicClient.text_block(self.framework_prompt, cache=True),
+            AnthropicClient.text_block(self._build_output_format_prompt(packed), cache=True)
+        ]
+
+    def _article_context(self, article, flagged_categories):
+        """
+        Get the article text to send to Claude: plain text cut down to the
+        windows around keyword hits for the flagged categories, or the whole
+        plain text if there are none (at most CLAUDE_CONTEXT_MAX_CHARS).
+        """
+        content = article.get('content', '') or ''
+        context, trimmed = extract_context(
+            content,
+            self.category_index,
+            categories=flagged_categories,
+            window_chars=CLAUDE_CONTEXT_WINDOW_CHARS,
+            max_chars=CLAUDE_CONTEXT_MAX_CHARS
+        )
+        if trimmed:
+             logger.debug(f"Trimmed article {article.get('_id')} from {len(content)} to {len(context)} characters around keyword hits")
+        return context or 'No content'
+
+    def _construct_claude_prompt(self, article, flagged_categories):
+        """Construct the per-article part of the prompt for Claude (the framework is in the system prompt)."""
+        # Only the text around keyword hits is sent; gaps are marked with [...]
+        content = self._article_context(article, flagged_categories)
+
+
+        prompt = f"""
+        Analyze the news article provided below.
+        Focus *only* on the following categories: {', '.join(flagged_categories)}.
+
+        **Article Details:**
+        Title: {article.get('title', 'No title')}
+        Source: {article.get('source', 'Unknown')}
+        Date: {article.get('published_date', 'Unknown')}
+
+        **Article Content:**
+        --- START ARTICLE ---
+        {content}
+        --- END ARTICLE ---
+        """
         return prompt
 
-    def _call_claude_api(self, prompt):
-        """Call Claude API with the given prompt."""
-        # API Key check moved to analyze_recent_articles to avoid repeated checks
-        headers = {
-            "x-api-key": ANTHROPIC_API_KEY,
-            "content-type": "application/json",
-            "anthropic-version": "2023-06-01"
-        }
-        data = {
-            "model": "claude-3-haiku-20240307", # Fast and capable model
-            "max_tokens": 2500, # Increased slightly more, maybe helps with truncation?
-            "messages": [{"role": "user", "content": prompt}],
+    def _construct_packed_claude_prompt(self, packed_articles):
+        """
+        Construct the per-request part of a prompt asking Claude to analyze several articles.
+
+        Args:
+            packed_articles (dict): Packed key -> (article, flagged_categories)
+        """
+        article_blocks = []
+        for key, (article, flagged_categories) in packed_articles.items():
+            content = self._article_context(article, flagged_categories)
+            article_blocks.append(f"""
+        --- START ARTICLE {key} ---
+        Focus categories: {', '.join(flagged_categories)}
+        Title: {article.get('title', 'No title')}
+        Source: {article.get('source', 'Unknown')}
+        Date: {article.get('published_date', 'Unknown')}
+        Content:
+        {content}
+        --- END ARTICLE {key} ---
+        """)
+
+        prompt = f"""
+        Analyze EACH of the {len(packed_articles)} news articles provided below.
+
+        {''.join(article_blocks)}
+        """
+        return prompt
+
+    def _build_claude_request(self, prompt, max_tokens=None, packed=False, model=None):
+        """Build the Messages API request body for a prompt (shared by the sync and batch paths)."""
+        return {
+            "model": model or CLAUDE_MODEL, # Fast tier unless escalated
+            "max_tokens": max_tokens or 2500, # Increased slightly more, maybe helps with truncation?
+            "system": self._claude_system_blocks(packed), # Static, cached prefix
+            "messages": [{"role": "user", "content": prompt}], # Variable suffix
             "temperature": 0.1 # Very low temp for consistent JSON
         }
 
-        try:
-            logger.debug("Sending request to Claude API...")
-            response = requests.post(
-                "https://api.anthropic.com/v1/messages",
-                headers=headers,
-                json=data,
-                timeout=90 # Increased timeout for potentially longer analysis
-            )
-            logger.debug(f"Claude API response status code: {response.status_code}")
-            response.raise_for_status() # Raise HTTPError for bad responses (4xx or 5xx)
+    def _call_claude_api(self, prompt, max_tokens=None, packed=False, model=None):
+        """Call Claude API with the given prompt (fast-tier model unless `model` is given)."""
+        # API Key check moved to analyze_recent_articles to avoid repeated checks
+        data = self._build_claude_request(prompt, max_tokens, packed, model)
+        if not self._take_claude_call():
+            raise ClaudeCallLimitReached(f"All {CLAUDE_MAX_CALLS_PER_RUN} Claude calls of this run were sent")
 
-            result = response.json()
+        try:
+            logger.debug(f"Sending request to Claude API ({data['model']})...")
+            # Cached system prompt reads do not count against the input tokens per
+            # minute limit, so only the variable part is reserved on the limiter
+            start = time.monotonic()
+            result = self.claude_client.create_message(data, estimated_tokens=estimate_tokens(prompt))
+            self._record_tier_latency(data['model'], time.monotonic() - start)
 
             # Extract text content safely
-            if result.get('content') and isinstance(result['content'], list) and result['content'][0].get('text'):
-                 response_text = result['content'][0]['text']
+            response_text = AnthropicClient.response_text(result)
+            if response_text:
                  logger.debug("Successfully received text content from Claude API.")
                  return response_text
             else:
@@ -718,6 +2070,13 @@ class NewsAnalyzer:
                  logger.error(f"Unexpected Claude API response structure - missing text: {result}")
                  return None
 
+        except BudgetExceeded:
+            # Nothing was sent; the caller decides whether to defer or downgrade
+            self._return_claude_call()
+            raise
+        except ClaudeUnavailable:
+            # Retries are used up; the caller defers the article instead of storing it without Claude
+            raise
         except requests.exceptions.Timeout:
              logger.error("Claude API request timed out.")
              return None
@@ -734,140 +2093,195 @@ class NewsAnalyzer:
             logger.exception(f"Unexpected error during Claude API call: {str(e)}")
             return None
 
-    def _parse_claude_response(self, response_text, flagged_categories):
-        """Parse Claude's JSON response robustly."""
-        if not response_text:
-            logger.warning("Cannot parse empty response from Claude.")
-            return None # Indicate parsing failure
-
-        # Default structure for error cases, helps in combining results later
-        error_result = {
+    def _extract_json_str(self, response_text):
+        """Extract the JSON object from a Claude response, handling markdown fences."""
+        json_str = None
+        # Handle potential leading/trailing whitespace and markdown fences
+        response_text_cleaned = response_text.strip()
+        if response_text_cleaned.startswith('```json') and response_text_cleaned.endswith('```'):
+             json_str = response_text_cleaned[7:-3].strip() # Extract content within ```json ... ```
+        elif response_text_cleaned.startswith('{') and response_text_cleaned.endswith('}'):
+             json_str = response_text_cleaned # Assume it's just the JSON object
+        else:
+             # Fallback: find first '{' and last '}' as a last resort
+             json_start = response_text.find('{')
+             json_end = response_text.rfind('}') + 1
+             if json_start != -1 and json_end > json_start: # Ensure valid range
+                 json_str = response_text[json_start:json_end]
+        return json_str
+
+    def _error_result(self, flagged_categories, message='Parsing failed'):
+        """Default structure for parse failures, helps in combining results later."""
+        return {
             'categorized': False, 'is_us_based': None,
             'categories': {cat_id: 'green' for cat_id in flagged_categories},
             'evidence': {cat_id: [] for cat_id in flagged_categories},
             'confidence': {cat_id: 0 for cat_id in flagged_categories},
-            'explanation': 'Parsing failed', 'reasoning': 'Parsing failed'
+            'explanation': message, 'reasoning': message
         }
 
+    def _parse_claude_response(self, response_text, flagged_categories):
+        """Parse Claude's JSON response robustly."""
+        if not response_text:
+            logger.warning("Cannot parse empty response from Claude.")
+            return None # Indicate parsing failure
+
+        json_str = None
         try:
             logger.debug("Attempting to parse Claude JSON response.")
             # Attempt to find JSON block, handling potential markdown fences ```json ... ```
-            json_str = None
-            # Handle potential leading/trailing whitespace and markdown fences
-            response_text_cleaned = response_text.strip()
-            if response_text_cleaned.startswith('```json') and response_text_cleaned.endswith('```'):
-                 json_str = response_text_cleaned[7:-3].strip() # Extract content within ```json ... ```
-            elif response_text_cleaned.startswith('{') and response_text_cleaned.endswith('}'):
-                 json_str = response_text_cleaned # Assume it's just the JSON object
-            else:
-                 # Fallback: find first '{' and last '}' as a last resort
-                 json_start = response_text.find('{')
-                 json_end = response_text.rfind('}') + 1
-                 if json_start != -1 and json_end > json_start: # Ensure valid range
-                     json_str = response_text[json_start:json_end]
+            json_str = self._extract_json_str(response_text)
 
             if not json_str:
                  logger.warning(f"Could not extract JSON object from Claude response. Response start: {response_text[:200]}...")
-                 error_result['explanation'] = 'Parsing failed: No JSON object found.'
-                 error_result['reasoning'] = 'Parsing failed: No JSON object found.'
-                 return error_result # Return error structure
+                 return self._error_result(flagged_categories, 'Parsing failed: No JSON object found.')
 
             # Attempt to decode the extracted JSON string
             result = json.loads(json_str)
             logger.debug("Successfully decoded JSON from Claude response.")
 
+            return self._normalize_claude_result(result, flagged_categories)
 
-            # --- Data Validation and Normalization ---
-            is_us_based = result.get('is_us_based')
-            if not isinstance(is_us_based, bool):
-                 logger.warning(f"Invalid 'is_us_based' value: {is_us_based}. Defaulting to True.")
-                 is_us_based = True
-
-            categories_data = result.get('categories', {})
-            if not isinstance(categories_data, dict):
-                 logger.warning(f"Invalid 'categories' format: Expected dict, got {type(categories_data)}. Defaulting to empty.")
-                 categories_data = {}
-
-            summary = result.get('summary', 'No summary provided by Claude.')
-            reasoning = result.get('reasoning', 'No reasoning provided by Claude.')
-
-            normalized_categories = {}
-            category_evidence = {}
-            category_confidence = {}
-            valid_severities = {'green', 'yellow', 'orange', 'red'}
-
-            # Ensure all flagged categories are present in the output, defaulting if necessary
-            for cat_id in flagged_categories:
-                if cat_id in categories_data:
-                    cat_data = categories_data[cat_id]
-                    if isinstance(cat_data, dict):
-                        # Normalize severity: lowercase string, default GREEN
-                        severity = str(cat_data.get('severity', 'GREEN')).lower()
-                        if severity not in valid_severities:
-                             logger.warning(f"Invalid severity '{cat_data.get('severity')}' for category '{cat_id}'. Defaulting to 'green'.")
-                             severity = 'green'
-
-                        # Normalize evidence: list of strings, default empty
-                        evidence = cat_data.get('evidence', [])
-                        if not isinstance(evidence, list) or not all(isinstance(item, str) for item in evidence):
-                             logger.warning(f"Invalid evidence format for category '{cat_id}'. Defaulting to empty list.")
-                             evidence = []
-
-                        # Normalize confidence: integer 1-5, default 3
-                        confidence_raw = cat_data.get('confidence', 3)
-                        try:
-                            confidence = int(confidence_raw)
-                            if not 1 <= confidence <= 5:
-                                logger.warning(f"Confidence {confidence} out of range (1-5) for '{cat_id}'. Clamping to 3.")
-                                confidence = 3
-                        except (ValueError, TypeError):
-                             logger.warning(f"Invalid confidence value '{confidence_raw}' for '{cat_id}'. Defaulting to 3.")
-                             confidence = 3
-
-                        normalized_categories[cat_id] = severity
-                        category_evidence[cat_id] = evidence
-                        category_confidence[cat_id] = confidence
-                    else:
-                        logger.warning(f"Unexpected data format for category '{cat_id}': {cat_data}. Defaulting to 'green'.")
-                        normalized_categories[cat_id] = 'green'
-                        category_evidence[cat_id] = []
-                        category_confidence[cat_id] = 1
+        except json.JSONDecodeError as e:
+            self._log_json_error(e, json_str)
+            return self._error_result(flagged_categories, f'Parsing failed: JSONDecodeError - {e}')
+        except Exception as e:
+            logger.exception(f"Unexpected error parsing Claude response: {str(e)}")
+            return self._error_result(flagged_categories, f'Parsing failed: Unexpected error - {e}')
+
+    def _parse_packed_claude_response(self, response_text, flagged_by_key):
+        """
+        Split a packed Claude response back into per-article results.
+
+        Args:
+            response_text (str): Raw response to a packed prompt
+            flagged_by_key (dict): Packed key -> flagged categories for that article
+
+        Returns:
+            dict: Packed key -> parsed result (the error structure for articles
+                  missing from or malformed in the response)
+        """
+        if not response_text:
+            logger.warning("Cannot parse empty packed response from Claude.")
+            return {}
+
+        json_str = None
+        try:
+            json_str = self._extract_json_str(response_text)
+            if not json_str:
+                 logger.warning(f"Could not extract JSON object from packed Claude response. Response start: {response_text[:200]}...")
+                 return {key: self._error_result(flagged, 'Parsing failed: No JSON object found.') for key, flagged in flagged_by_key.items()}
+
+            result = json.loads(json_str)
+            articles_data = result.get('articles', result) if isinstance(result, dict) else {}
+            if not isinstance(articles_data, dict):
+                 articles_data = {}
+
+        except json.JSONDecodeError as e:
+            self._log_json_error(e, json_str)
+            return {key: self._error_result(flagged, f'Parsing failed: JSONDecodeError - {e}') for key, flagged in flagged_by_key.items()}
+
+        parsed = {}
+        for key, flagged_categories in flagged_by_key.items():
+            article_data = articles_data.get(key)
+            if not isinstance(article_data, dict):
+                 logger.warning(f"Article '{key}' was expected but missing in packed Claude response.")
+                 parsed[key] = self._error_result(flagged_categories, 'Parsing failed: Article missing from packed response.')
+                 continue
+            try:
+                 parsed[key] = self._normalize_claude_result(article_data, flagged_categories)
+            except Exception as e:
+                 logger.exception(f"Unexpected error parsing packed result for '{key}': {str(e)}")
+                 parsed[key] = self._error_result(flagged_categories, f'Parsing failed: Unexpected error - {e}')
+
+        return parsed
+
+    def _log_json_error(self, error, json_str):
+        """Log a JSON decode error with context around the error position."""
+        logger.error(f"Error decoding JSON from Claude response: {str(error)}")
+        # Log more context around the error position
+        error_pos = error.pos
+        context_window = 50 # Characters before and after error position
+        start = max(0, error_pos - context_window)
+        end = min(len(json_str or ''), error_pos + context_window)
+        logger.error(f"Context around error position {error_pos}: ...{(json_str or '')[start:end]}...")
+
+    def _normalize_claude_result(self, result, flagged_categories):
+        """Validate and normalize one decoded analysis object."""
+        # --- Data Validation and Normalization ---
+        is_us_based = result.get('is_us_based')
+        if not isinstance(is_us_based, bool):
+             logger.warning(f"Invalid 'is_us_based' value: {is_us_based}. Defaulting to True.")
+             is_us_based = True
+
+        categories_data = result.get('categories', {})
+        if not isinstance(categories_data, dict):
+             logger.warning(f"Invalid 'categories' format: Expected dict, got {type(categories_data)}. Defaulting to empty.")
+             categories_data = {}
+
+        summary = result.get('summary', 'No summary provided by Claude.')
+        reasoning = result.get('reasoning', 'No reasoning provided by Claude.')
+
+        normalized_categories = {}
+        category_evidence = {}
+        category_confidence = {}
+        valid_severities = {'green', 'yellow', 'orange', 'red'}
+
+        # Ensure all flagged categories are present in the output, defaulting if necessary
+        for cat_id in flagged_categories:
+            if cat_id in categories_data:
+                cat_data = categories_data[cat_id]
+                if isinstance(cat_data, dict):
+                    # Normalize severity: lowercase string, default GREEN
+                    severity = str(cat_data.get('severity', 'GREEN')).lower()
+                    if severity not in valid_severities:
+                         logger.warning(f"Invalid severity '{cat_data.get('severity')}' for category '{cat_id}'. Defaulting to 'green'.")
+                         severity = 'green'
+
+                    # Normalize evidence: list of strings, default empty
+                    evidence = cat_data.get('evidence', [])
+                    if not isinstance(evidence, list) or not all(isinstance(item, str) for item in evidence):
+                         logger.warning(f"Invalid evidence format for category '{cat_id}'. Defaulting to empty list.")
+                         evidence = []
+
+                    # Normalize confidence: integer 1-5, default 3
+                    confidence_raw = cat_data.get('confidence', 3)
+                    try:
+                        confidence = int(confidence_raw)
+                        if not 1 <= confidence <= 5:
+                            logger.warning(f"Confidence {confidence} out of range (1-5) for '{cat_id}'. Clamping to 3.")
+                            confidence = 3
+                    except (ValueError, TypeError):
+                         logger.warning(f"Invalid confidence value '{confidence_raw}' for '{cat_id}'. Defaulting to 3.")
+                         confidence = 3
+
+                    normalized_categories[cat_id] = severity
+                    category_evidence[cat_id] = evidence
+                    category_confidence[cat_id] = confidence
                 else:
-                    logger.warning(f"Category '{cat_id}' was expected but missing in Claude's response. Defaulting to 'green'.")
+                    logger.warning(f"Unexpected data format for category '{cat_id}': {cat_data}. Defaulting to 'green'.")
                     normalized_categories[cat_id] = 'green'
                     category_evidence[cat_id] = []
                     category_confidence[cat_id] = 1
+            else:
+                logger.warning(f"Category '{cat_id}' was expected but missing in Claude's response. Defaulting to 'green'.")
+                normalized_categories[cat_id] = 'green'
+                category_evidence[cat_id] = []
+                category_confidence[cat_id] = 1
 
-            # Determine overall categorization based on Claude's results
-            categorized = any(sev != 'green' for sev in normalized_categories.values())
-
-            logger.debug(f"Parsed Claude results: US={is_us_based}, Categorized={categorized}, Categories={normalized_categories}")
-            return {
-                'categorized': categorized,
-                'is_us_based': is_us_based,
-                'categories': normalized_categories,
-                'evidence': category_evidence,
-                'confidence': category_confidence,
-                'explanation': summary,
-                'reasoning': reasoning
-            }
+        # Determine overall categorization based on Claude's results
+        categorized = any(sev != 'green' for sev in normalized_categories.values())
 
-        except json.JSONDecodeError as e:
-            logger.error(f"Error decoding JSON from Claude response: {str(e)}")
-            # Log more context around the error position
-            error_pos = e.pos
-            context_window = 50 # Characters before and after error position
-            start = max(0, error_pos - context_window)
-            end = min(len(json_str), error_pos + context_window)
-            logger.error(f"Context around error position {error_pos}: ...{json_str[start:end]}...")
-            error_result['explanation'] = f'Parsing failed: JSONDecodeError - {e}'
-            error_result['reasoning'] = f'Parsing failed: JSONDecodeError - {e}'
-            return error_result # Return error structure
-        except Exception as e:
-            logger.exception(f"Unexpected error parsing Claude response: {str(e)}")
-            error_result['explanation'] = f'Parsing failed: Unexpected error - {e}'
-            error_result['reasoning'] = f'Parsing failed: Unexpected error - {e}'
-            return error_result # Return error structure
+        logger.debug(f"Parsed Claude results: US={is_us_based}, Categorized={categorized}, Categories={normalized_categories}")
+        return {
+            'categorized': categorized,
+            'is_us_based': is_us_based,
+            'categories': normalized_categories,
+            'evidence': category_evidence,
+            'confidence': category_confidence,
+            'explanation': summary,
+            'reasoning': reasoning
+        }
 
     def _combine_analysis_results(self, keyword_results, claude_results=None):
         """Combine keyword and Claude results, prioritizing Claude's non-green assessments."""
@@ -893,6 +2307,12 @@ class NewsAnalyzer:
             combined_results['is_us_based'] = claude_results.get('is_us_based')
             combined_results['evidence'] = claude_results.get('evidence', {})
             combined_results['confidence'] = claude_results.get('confidence', {})
+            combined_results['claude_model'] = claude_results.get('model')
+            # Claude's own verdicts, kept apart from the merged severities to train the pre-classifier
+            combined_results['claude_categories'] = dict(claude_results['categories'])
+            if claude_results.get('cluster_representative'):
+                 # Verdict reused from another article of the same story
+                 combined_results['cluster_representative'] = claude_results['cluster_representative']
 
             claude_analyzed_categories = claude_results['categories']
             severity_order = {'green': 0, 'yellow': 1, 'orange': 2, 'red': 3}
@@ -939,6 +2359,267 @@ class NewsAnalyzer:
 
         return combined_results
 
+    def _ensure_event_indexes(self):
+        """Create the indexes summary generation relies on (real database only)."""
+        if is_mock_db:
+            return
+        try:
+            # Latest events of a category, for the tracker
+            self.events_collection.create_index([('category', pymongo.ASCENDING), ('detected_date', pymongo.DESCENDING)])
+            # Counted events of a story cluster, to skip its duplicates
+            self.events_collection.create_index([('cluster_id', pymongo.ASCENDING), ('category', pymongo.ASCENDING)])
+            # Events of the partly covered first day of a summary period
+            self.events_collection.create_index('detected_date')
+            self.event_aggregates_collection.create_index('day')
+        except Exception as e:
+            logger.warning(f"Could not create event indexes: {str(e)}")
+
+    def _ensure_event_aggregates(self):
+        """Build the event aggregates from the events collection if they have never been built."""
+        try:
+            if self.event_aggregates_collection.find_one({'_id': EVENT_AGGREGATES_META_ID}) is None:
+                logger.info("Event aggregates have not been built yet. Backfilling from events...")
+                self.rebuild_event_aggregates()
+        except Exception as e:
+            logger.exception(f"Error checking event aggregates: {e}")
+
+    def rebuild_event_aggregates(self):
+        """
+        Recompute the per-day, per-category event aggregates from the events
+        collection, replacing any existing aggregates.
+
+        Returns:
+            int: Number of events counted
+        """
+        # Buffered events must be in the events collection before counting
+        self.bulk_writer.flush()
+
+        aggregates = {}
+        event_count = 0
+        for event in self.events_collection.find({}):
+            category = event.get('category')
+            severity = event.get('severity')
+            detected_date = event.get('detected_date')
+            if not category or not detected_date or severity not in ('green', 'yellow', 'orange', 'red'):
+                continue
+            if event.get('cluster_duplicate'):
+                # Another article of the same story was already counted
+                continue
+
+            day = detected_date[:10]
+            aggregate = aggregates.setdefault((day, category), {
+                '_id': self._event_aggregate_id(day, category),
+                'day': day,
+                'category': category,
+                'total': 0,
+                'severity_counts': {},
+                'latest_event_date': None
+            })
+            aggregate['total'] += 1
+            aggregate['severity_counts'][severity] = aggregate['severity_counts'].get(severity, 0) + 1
+            if aggregate['latest_event_date'] is None or detected_date > aggregate['latest_event_date']:
+                aggregate['latest_event_date'] = detected_date
+            event_count += 1
+
+        self.event_aggregates_collection.delete_many({})
+        for aggregate in aggregates.values():
+            self.event_aggregates_collection.insert_one(aggregate)
+        self.event_aggregates_collection.update_one(
+            {'_id': EVENT_AGGREGATES_META_ID},
+            {'$set': {'rebuilt_at': datetime.datetime.now().isoformat(), 'event_count': event_count}},
+            upsert=True
+        )
+
+        logger.info(f"Rebuilt {len(aggregates)} event aggregates from {event_count} events.")
+        return event_count
+
+    @staticmethod
+    def _event_aggregate_id(day, category_id):
+        return f"{day}:{category_id}"
+
+    def _increment_event_aggregate(self, event):
+        """Count a newly inserted event in its day/category aggregate."""
+        day = event['detected_date'][:10]
+        try:
+            self.bulk_writer.update_one(
+                self.event_aggregates_collection,
+                {'_id': self._event_aggregate_id(day, event['category'])},
+                {
+                    '$inc': {'total': 1, f"severity_counts.{event['severity']}": 1},
+                    '$max': {'latest_event_date': event['detected_date']},
+                    '$setOnInsert': {'day': day, 'category': event['category']}
+                },
+                upsert=True
+            )
+        except Exception as e:
+            logger.exception(f"Failed to update event aggregate for category '{event['category']}' on {day}: {e}")
+
+    def _event_aggregates_since(self, since_iso):
+        """
+        Get day/category event aggregates covering the events detected since a date.
+
+        Days after the first come from the aggregates collection. The first
+        day is only partly in range, so its counted events are aggregated
+        here from the events collection, one aggregate per category.
+        """
+        first_day = since_iso[:10]
+        next_day = (datetime.date.fromisoformat(first_day) + datetime.timedelta(days=1)).isoformat()
+        aggregates = list(self.event_aggregates_collection.find({'day': {'$gte': next_day}}))
+
+        query = {'detected_date': {'$gte': since_iso, '$lt': next_day}}
+        if is_mock_db:
+            events = self.events_collection.find(query)
+        else:
+            events = self.events_collection.find(query, {'category': 1, 'severity': 1, 'detected_date': 1, 'cluster_duplicate': 1})
+
+        first_day_aggregates = {}
+        for event in events:
+            category = event.get('category')
+            severity = event.get('severity')
+            detected_date = event.get('detected_date')
+            # The mock collection ignores the upper bound
+            if not category or not detected_date or detected_date >= next_day or severity not in ('green', 'yellow', 'orange', 'red'):
+                continue
+            if event.get('cluster_duplicate'):
+                continue
+
+            aggregate = first_day_aggregates.setdefault(category, {
+                'day': first_day,
+                'category': category,
+                'total': 0,
+                'severity_counts': {},
+                'latest_event_date': None
+            })
+            aggregate['total'] += 1
+            aggregate['severity_counts'][severity] = aggregate['severity_counts'].get(severity, 0) + 1
+            if aggregate['latest_event_date'] is None or detected_date > aggregate['latest_event_date']:
+                aggregate['latest_event_date'] = detected_date
+
+        return aggregates + list(first_day_aggregates.values())
+
+    def _is_cluster_duplicate(self, article, category_id):
+        """
+        Check whether an article's story cluster already has a counted event
+        for a category, so this one must not be counted again.
+        """
+        cluster_id = article.get('cluster_id')
+        if not cluster_id:
+            return False
+
+        key = (cluster_id, category_id)
+        if key in self._counted_cluster_events:
+            self._counted_cluster_events.move_to_end(key)
+            return True
+
+        duplicate = False
+        if not article.get('cluster_primary'):
+            # Counted by an earlier process or run
+            try:
+                duplicate = self.events_collection.find_one(
+                    {'cluster_id': cluster_id, 'category': category_id, 'cluster_duplicate': False}
+                ) is not None
+            except Exception as e:
+                logger.error(f"Error looking up events of story cluster {cluster_id}: {e}")
+
+        self._counted_cluster_events[key] = True
+        while len(self._counted_cluster_events) > COUNTED_CLUSTER_EVENTS_MEMORY:
+            self._counted_cluster_events.popitem(last=False)
+        return duplicate
+
+    def _latest_category_events(self, category_id, since_iso, limit):
+        """Get the most recent events of a category detected since a date, newest first."""
+        query = {'category': category_id, 'detected_date': {'$gte': since_iso}}
+        sort_spec = [('detected_date', pymongo.DESCENDING if not is_mock_db else -1)]
+        if is_mock_db:
+            return self.events_collection.find(query, sort=sort_spec, limit=limit)
+        return list(self.events_collection.find(query).sort(sort_spec).limit(limit))
+
+    def _get_category_streaks(self):
+        """
+        Get the in-memory streak state of every category, loading it on first use.
+
+        Categories without a stored streak document are bootstrapped from
+        their latest event within PERSISTENCE_LOOKBACK_DAYS, all in one query.
+        """
+        if self._category_streaks is not None:
+            return self._category_streaks
+
+        streaks = {}
+        try:
+            for doc in self.category_streaks_collection.find({}):
+                streaks[doc['_id']] = doc
+        except Exception as e:
+            logger.exception(f"Error loading category streaks: {e}")
+
+        missing = [category_id for category_id in self.categories if category_id not in streaks]
+        if missing:
+            logger.info(f"Bootstrapping streak state for {len(missing)} categories from events.")
+            lookback_date = (datetime.datetime.now() - datetime.timedelta(days=PERSISTENCE_LOOKBACK_DAYS)).isoformat()
+            for category_id, latest_event in self._latest_events_by_category(missing, lookback_date).items():
+                streaks[category_id] = {
+                    '_id': category_id,
+                    'current_severity': latest_event.get('severity'),
+                    'start_date': latest_event.get('start_date') or latest_event.get('detected_date'),
+                    'last_event_date': latest_event.get('detected_date')
+                }
+            for category_id in missing:
+                # Stored even without events so the bootstrap query runs only once
+                streaks.setdefault(category_id, {'_id': category_id, 'current_severity': None, 'start_date': None, 'last_event_date': None})
+                self._dirty_streaks.add(category_id)
+
+        self._category_streaks = streaks
+        return streaks
+
+    def _latest_events_by_category(self, category_ids, since_iso):
+        """Get the latest event of each category detected since a date."""
+        if is_mock_db:
+            latest = {}
+            for category_id in category_ids:
+                events = self._latest_category_events(category_id, since_iso, 1)
+                if events:
+                    latest[category_id] = events[0]
+            return latest
+
+        try:
+            pipeline = [
+                {'$match': {'category': {'$in': category_ids}, 'detected_date': {'$gte': since_iso}}},
+                {'$sort': {'category': 1, 'detected_date': -1}},
+                {'$group': {
+                    '_id': '$category',
+                    'severity': {'$first': '$severity'},
+                    'start_date': {'$first': '$start_date'},
+                    'detected_date': {'$first': '$detected_date'}
+                }}
+            ]
+            return {doc['_id']: doc for doc in self.events_collection.aggregate(pipeline)}
+        except Exception as e:
+            logger.exception(f"Error querying latest events for streak bootstrap: {e}")
+            return {}
+
+    def _save_category_streaks(self):
+        """Write the streak documents changed during this run back in one bulk write."""
+        if not self._dirty_streaks or self._category_streaks is None:
+            self._category_streaks = None
+            return
+
+        docs = [self._category_streaks[category_id] for category_id in self._dirty_streaks]
+        try:
+            if is_mock_db:
+                for doc in docs:
+                    self.category_streaks_collection.update_one({'_id': doc['_id']}, {'$set': doc}, upsert=True)
+            else:
+                self.category_streaks_collection.bulk_write(
+                    [pymongo.ReplaceOne({'_id': doc['_id']}, doc, upsert=True) for doc in docs],
+                    ordered=False
+                )
+            logger.info(f"Saved streak state for {len(docs)} categories.")
+        except Exception as e:
+            logger.exception(f"Error saving category streaks: {e}")
+
+        self._dirty_streaks.clear()
+        # Reloaded at the start of the next run so other processes' updates are picked up
+        self._category_streaks = None
+
     def _create_events(self, article, analysis_results):
         """Create event documents in the database for categorized articles."""
         now_iso = datetime.datetime.now().isoformat()
@@ -973,52 +2654,23 @@ class NewsAnalyzer:
                  evidence_html = "<p>Error formatting evidence.</p>" # Fallback
 
 
-            # --- Persistence Logic: Find most recent event for this category ---
-            # Look back further (e.g., 180 days) for persistence check than summary generation
-            persistence_lookback_days = 180
-            lookback_date = (datetime.datetime.now() - datetime.timedelta(days=persistence_lookback_days)).isoformat()
-
-            try:
-                # Define sort order based on whether using mock or real pymongo
-                sort_field = 'detected_date'
-                sort_direction = pymongo.DESCENDING if not is_mock_db else -1
-                sort_spec = [(sort_field, sort_direction)]
-
-                if is_mock_db:
-                     # Mock find handles sort directly
-                     latest_event_cursor_or_list = self.events_collection.find(
-                          {'category': category_id, 'detected_date': {'$gte': lookback_date}},
-                          sort=sort_spec,
-                          limit=1
-                     )
-                     latest_event_list = latest_event_cursor_or_list # Mock returns list
-                else:
-                     # Real pymongo uses cursor methods
-                     latest_event_cursor_or_list = self.events_collection.find(
-                          {'category': category_id, 'detected_date': {'$gte': lookback_date}}
-                     ).sort(sort_spec).limit(1)
-                     latest_event_list = list(latest_event_cursor_or_list)
-
-
-            except Exception as e:
-                 logger.exception(f"Error querying latest event for category {category_id}: {e}")
-                 latest_event_list = []
-
+            # --- Persistence Logic: Continue or start the category's severity streak ---
+            streak = self._get_category_streaks().get(category_id)
+            lookback_date = (datetime.datetime.now() - datetime.timedelta(days=PERSISTENCE_LOOKBACK_DAYS)).isoformat()
 
             start_date = now_iso # Default: start of a new streak
             previous_severity = None
             severity_change_date = None
 
 
-            if latest_event_list:
-                latest_event = latest_event_list[0]
-                previous_severity = latest_event.get('severity')
-                logger.debug(f"Found previous event for '{category_id}': Severity '{previous_severity}' on {latest_event.get('detected_date')}")
+            if streak and streak.get('current_severity') and (streak.get('last_event_date') or '') >= lookback_date:
+                previous_severity = streak['current_severity']
+                logger.debug(f"Found previous event for '{category_id}': Severity '{previous_severity}' on {streak.get('last_event_date')}")
 
                 # If severity is the same, continue the streak
                 if previous_severity == severity:
-                    # Use the start_date of the previous event in the streak
-                    start_date = latest_event.get('start_date', latest_event['detected_date'])
+                    # Use the start_date of the streak
+                    start_date = streak.get('start_date') or streak['last_event_date']
                     logger.debug(f"Severity unchanged for '{category_id}', continuing streak from {start_date}")
                 else:
                     # Severity changed, record the date of change (new streak starts now)
@@ -1028,6 +2680,8 @@ class NewsAnalyzer:
                  logger.debug(f"No recent previous event found for '{category_id}'. Starting new streak {start_date}.")
 
 
+            cluster_duplicate = self._is_cluster_duplicate(article, category_id)
+
             # Create the event document
             event = {
                 'article_id': article_id,
@@ -1046,6 +2700,10 @@ class NewsAnalyzer:
                 'is_us_based': is_us_based,
                 'reasoning': reasoning,
 
+                # Story clustering: events of the same story after the first are not counted in summaries
+                'cluster_id': article.get('cluster_id'),
+                'cluster_duplicate': cluster_duplicate,
+
                 # Persistence tracking fields
                 'start_date': start_date, # Start date of the current severity streak
                 'previous_severity': previous_severity, # Severity of the preceding event (if any)
@@ -1057,38 +2715,59 @@ class NewsAnalyzer:
             }
 
             try:
-                 self.events_collection.insert_one(event)
+                 self.bulk_writer.insert_one(self.events_collection, event)
                  logger.info(f"Successfully created '{severity}' event for category '{category_id}' (Article: {article_id})")
             except Exception as e:
                  logger.exception(f"Failed to insert event into database for category '{category_id}', article {article_id}: {e}")
+                 continue
+
+            if not cluster_duplicate:
+                 self._increment_event_aggregate(event)
+            self._get_category_streaks()[category_id] = {
+                '_id': category_id,
+                'current_severity': severity,
+                'start_date': start_date,
+                'last_event_date': now_iso
+            }
+            self._dirty_streaks.add(category_id)
 
 
     def _generate_summary(self):
-        """Generate and save a summary of the current system state."""
+        """
+        Generate and save a summary of the current system state.
+
+        Period counts cover the last `summary_lookback_days` days up to now.
+        Whole days come from the per-day event aggregates, so the work done
+        does not grow with the number of events; only the part of the first
+        day inside the period is counted from the events themselves. A story
+        reported by several sources (one story cluster) is counted once per
+        category.
+        """
         logger.info("Generating analysis summary...")
+        # Counts must include every event created so far
+        self.bulk_writer.flush()
         summary_lookback_days = 7 # How far back the summary counts events
         now = datetime.datetime.now()
         now_iso = now.isoformat()
         cutoff_date = now - datetime.timedelta(days=summary_lookback_days)
         cutoff_date_str = cutoff_date.isoformat()
 
-        # Query for all events within the lookback period for counting
+        # Day/category counts within the lookback period
         try:
-             query = {'detected_date': {'$gte': cutoff_date_str}}
-             # No sort needed here, just fetching all within period
-             recent_events_cursor = self.events_collection.find(query)
-             recent_events = list(recent_events_cursor)
-             logger.info(f"Found {len(recent_events)} events within the {summary_lookback_days}-day summary period.")
+             recent_aggregates = self._event_aggregates_since(cutoff_date_str)
+             total_events = sum(aggregate.get('total', 0) for aggregate in recent_aggregates)
+             logger.info(f"Found {total_events} events within the {summary_lookback_days}-day summary period.")
         except Exception as e:
-             logger.exception(f"Error fetching recent events for summary: {e}")
-             recent_events = []
+             logger.exception(f"Error fetching event aggregates for summary: {e}")
+             recent_aggregates = []
+             total_events = 0
 
 
         # Initialize summary structure
         summary = {
             'date': now_iso,
             'summary_period_days': summary_lookback_days,
-            'total_events_in_period': len(recent_events),
+            'total_events_in_period': total_events,
             'severity_counts_in_period': {'green': 0, 'yellow': 0, 'orange': 0, 'red': 0},
             'categories': {},
             'overall_status': 'green', # Default
@@ -1111,31 +2790,33 @@ class NewsAnalyzer:
                 # 'recent_events_details': [] # Optional: Can make summary very large
             }
 
-        # Process recent events to populate period counts
-        for event in recent_events:
-            category = event.get('category')
-            severity = event.get('severity')
-            if category in summary['categories'] and severity in summary['categories'][category]['severity_counts_in_period']:
-                cat_summary = summary['categories'][category]
-                cat_summary['event_count_in_period'] += 1
-                cat_summary['severity_counts_in_period'][severity] += 1
-                summary['severity_counts_in_period'][severity] += 1 # Update overall period count
+        # Process recent aggregates to populate period counts
+        for aggregate in recent_aggregates:
+            category = aggregate.get('category')
+            if category not in summary['categories']:
+                continue
+            cat_summary = summary['categories'][category]
+            for severity, count in (aggregate.get('severity_counts') or {}).items():
+                if severity in cat_summary['severity_counts_in_period']:
+                    cat_summary['event_count_in_period'] += count
+                    cat_summary['severity_counts_in_period'][severity] += count
+                    summary['severity_counts_in_period'][severity] += count # Update overall period count
 
-                detected_date = event.get('detected_date')
-                if detected_date and (cat_summary['latest_event_date_in_period'] is None or detected_date > cat_summary['latest_event_date_in_period']):
-                     cat_summary['latest_event_date_in_period'] = detected_date
+            latest_event_date = aggregate.get('latest_event_date')
+            if latest_event_date and (cat_summary['latest_event_date_in_period'] is None or latest_event_date > cat_summary['latest_event_date_in_period']):
+                 cat_summary['latest_event_date_in_period'] = latest_event_date
 
 
         # --- Apply Persistence and Confirmation using IndicatorTracker ---
         logger.info("Checking category persistence and confirmation using tracker...")
         for category_id, cat_summary in summary['categories'].items():
-            # Fetch events needed for the tracker's persistence check (might need longer lookback)
-            # For simplicity, we'll reuse the recent_events list here, assuming the mock tracker
-            # logic is sufficient or a real tracker manages its own state/longer lookback.
-            # A real implementation might query events specifically for the tracker's needs.
-            category_events_for_tracker = [e for e in recent_events if e.get('category') == category_id] # Using period events for mock/simple tracker
-
             try:
+                 # The tracker only looks at the newest event of a category and the one
+                 # before it (the streak start date is carried on every event)
+                 category_events_for_tracker = []
+                 if cat_summary['event_count_in_period']:
+                      category_events_for_tracker = self._latest_category_events(category_id, cutoff_date_str, TRACKER_EVENT_LIMIT)
+
                  # Call the tracker (real or mock)
                  persistence_data = self.tracker.check_category_persistence(category_id, category_events_for_tracker)
                  # Update summary with tracker results, ensuring keys exist
@@ -1226,6 +2907,8 @@ if __name__ == "__main__":
 
     print("\n" + "="*30 + " Starting News Analyzer Script " + "="*30)
     analyzer = NewsAnalyzer()
+    # Writes and leases are handed back even if the script is interrupted
+    atexit.register(analyzer.close)
 
     print("\n" + "="*30 + " Analyzing Recent Articles " + "="*30)
     # Pass days=7 for a wider initial test, adjust as needed
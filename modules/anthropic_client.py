@@ -0,0 +1,261 @@
+"""
+Anthropic client module - Shared Messages API client with usage accounting
+"""
+
+import time
+import random
+import logging
+import datetime
+import threading
+import email.utils
+import requests
+
+try:
+    from modules.http_client import get_http_client
+except ImportError:
+    # Running a script from modules/ puts modules/ itself on the path
+    from http_client import get_http_client
+
+logger = logging.getLogger('anthropic_client')
+
+# Marks the end of a prompt prefix that the API should cache between calls
+CACHE_CONTROL = {"type": "ephemeral"}
+
+# Responses worth retrying: timeouts, conflicts, rate limiting (429), overload (529) and server errors
+RETRYABLE_STATUS = {408, 409, 429, 500, 502, 503, 504, 529}
+THROTTLE_STATUS = {429, 529}
+
+class ClaudeUnavailable(requests.exceptions.RequestException):
+    """Raised when a request still fails with a transient error after every retry"""
+
+
+class AnthropicClient:
+    """
+    Sends Messages API requests and keeps running totals of the token usage
+    the API reports, including prompt cache reads and writes.
+
+    Timeouts, connection errors, 429/529 and 5xx responses are retried with
+    jittered exponential backoff, or after the `retry-after` delay the API
+    asks for. A throttling response also pauses the shared rate limiter, so
+    every thread backs off rather than only the one that was throttled.
+
+    The base URL is configurable so the client can be pointed at a local
+    stand-in server in tests.
+    """
+
+    def __init__(self, api_key, base_url='https://api.anthropic.com', timeout=90, rate_limiter=None, budget=None,
+                 max_retries=4, backoff_base=1.0, backoff_max=60.0, http=None):
+        """
+        Args:
+            api_key (str): Anthropic API key
+            base_url (str): API base URL
+            timeout (int): Request timeout in seconds
+            rate_limiter: Optional RateLimiter shared with other clients
+            budget: Optional TokenBudget every request is priced against
+            max_retries (int): Retries after the first attempt of a request
+            backoff_base (float): Backoff ceiling of the first retry, doubled for each further one
+            backoff_max (float): Largest backoff ceiling
+            http (PooledHTTPClient, optional): HTTP client (default: the shared keep-alive client)
+        """
+        self.api_key = api_key
+        self.base_url = base_url.rstrip('/')
+        self.timeout = timeout
+        self.rate_limiter = rate_limiter
+        self.budget = budget
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.http = http or get_http_client()
+        self._lock = threading.Lock()
+
+        # Counters for reporting
+        self.requests = 0
+        self.errors = 0
+        self.input_tokens = 0
+        self.output_tokens = 0
+        self.cache_creation_input_tokens = 0
+        self.cache_read_input_tokens = 0
+        self.retries = 0
+        self.throttled = 0
+        self.timeouts = 0
+        self.retry_wait_seconds = 0.0
+        self.exhausted = 0
+
+    def _headers(self):
+        return {
+            "x-api-key": self.api_key,
+            "content-type": "application/json",
+            "anthropic-version": "2023-06-01"
+        }
+
+    @staticmethod
+    def text_block(text, cache=False):
+        """Build a text content block, marked as a cache breakpoint if `cache` is set"""
+        block = {"type": "text", "text": text}
+        if cache:
+            block["cache_control"] = dict(CACHE_CONTROL)
+        return block
+
+    @staticmethod
+    def response_text(result):
+        """Get the text of the first content block of a Messages API response, or None"""
+        content = (result or {}).get('content')
+        if content and isinstance(content, list) and content[0].get('text'):
+            return content[0]['text']
+        return None
+
+    def create_message(self, payload, estimated_tokens=0):
+        """
+        Send one Messages API request.
+
+        Args:
+            payload (dict): Messages API request body
+            estimated_tokens (int): Input tokens to reserve on the rate limiter
+
+        Returns:
+            dict: The parsed response
+
+        Raises:
+            BudgetExceeded: If the budget does not allow the request (nothing is sent)
+            ClaudeUnavailable: If a transient failure outlasted every retry
+            requests.exceptions.RequestException: On other transport errors and non-2xx responses
+        """
+        reservation = self.budget.reserve(payload) if self.budget is not None else None
+
+        attempt = 0
+        while True:
+            if self.rate_limiter is not None:
+                self.rate_limiter.acquire(estimated_tokens)
+
+            try:
+                response = self.http.post(
+                    f"{self.base_url}/v1/messages",
+                    headers=self._headers(),
+                    json=payload,
+                    timeout=self.timeout
+                )
+                response.raise_for_status()
+                result = response.json()
+                break
+            except Exception as e:
+                status = self._status_code(e)
+                with self._lock:
+                    self.requests += 1
+                    self.errors += 1
+                    if status in THROTTLE_STATUS:
+                        self.throttled += 1
+                    if isinstance(e, requests.exceptions.Timeout):
+                        self.timeouts += 1
+
+                retryable = self._is_retryable(e)
+                if not retryable or attempt >= self.max_retries:
+                    if reservation is not None:
+                        self.budget.release(reservation)
+                    if retryable:
+                        with self._lock:
+                            self.exhausted += 1
+                        raise ClaudeUnavailable(
+                            f"Claude API still failing after {attempt + 1} attempts: {str(e)}",
+                            response=getattr(e, 'response', None)
+                        ) from e
+                    raise
+
+                delay = self._retry_delay(e, attempt)
+                attempt += 1
+                with self._lock:
+                    self.retries += 1
+                    self.retry_wait_seconds += delay
+                logger.warning(f"Claude API request failed ({status or type(e).__name__}), retry {attempt}/{self.max_retries} in {delay:.1f}s")
+
+                if status in THROTTLE_STATUS and self.rate_limiter is not None:
+                    # Every thread waits, not just this one; acquire() sleeps through the pause
+                    self.rate_limiter.pause(delay)
+                else:
+                    time.sleep(delay)
+
+        usage = result.get('usage') or {}
+        self._record_usage(usage)
+        if reservation is not None:
+            self.budget.record(reservation, payload.get('model'), usage)
+        return result
+
+    @staticmethod
+    def _status_code(error):
+        response = getattr(error, 'response', None)
+        return response.status_code if response is not None else None
+
+    def _is_retryable(self, error):
+        """Check whether a failed attempt is worth retrying"""
+        response = getattr(error, 'response', None)
+        if response is not None:
+            # The API says explicitly when a retry will or will not help
+            should_retry = (response.headers.get('x-should-retry') or '').lower()
+            if should_retry in ('true', 'false'):
+                return should_retry == 'true'
+            return response.status_code in RETRYABLE_STATUS
+        return isinstance(error, (requests.exceptions.Timeout, requests.exceptions.ConnectionError))
+
+    def _retry_delay(self, error, attempt):
+        """Seconds to wait before the next attempt: the server's retry-after, or full-jitter exponential backoff"""
+        response = getattr(error, 'response', None)
+        if response is not None:
+            retry_after = self._parse_retry_after(response.headers)
+            if retry_after is not None:
+                # A little jitter so throttled threads do not all return at once
+                return retry_after + random.uniform(0, self.backoff_base / 2)
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** attempt))
+
+    @staticmethod
+    def _parse_retry_after(headers):
+        """Get the retry-after-ms / retry-after delay in seconds, or None"""
+        try:
+            if headers.get('retry-after-ms'):
+                return max(0.0, float(headers['retry-after-ms']) / 1000)
+        except ValueError:
+            pass
+
+        value = headers.get('retry-after')
+        if not value:
+            return None
+        try:
+            return max(0.0, float(value))
+        except ValueError:
+            pass
+        try:
+            # HTTP-date form
+            retry_at = email.utils.parsedate_to_datetime(value)
+            return max(0.0, (retry_at - datetime.datetime.now(datetime.timezone.utc)).total_seconds())
+        except (TypeError, ValueError):
+            return None
+
+    def _record_usage(self, usage):
+        """Add the usage block of a response to the running totals"""
+        with self._lock:
+            self.requests += 1
+            self.input_tokens += usage.get('input_tokens') or 0
+            self.output_tokens += usage.get('output_tokens') or 0
+            self.cache_creation_input_tokens += usage.get('cache_creation_input_tokens') or 0
+            self.cache_read_input_tokens += usage.get('cache_read_input_tokens') or 0
+
+        logger.debug(
+            f"Claude usage: input={usage.get('input_tokens')}, output={usage.get('output_tokens')}, "
+            f"cache_write={usage.get('cache_creation_input_tokens')}, cache_read={usage.get('cache_read_input_tokens')}"
+        )
+
+    def stats(self):
+        """Get request and token usage counters"""
+        prompt_tokens = self.input_tokens + self.cache_creation_input_tokens + self.cache_read_input_tokens
+        return {
+            'requests': self.requests,
+            'errors': self.errors,
+            'input_tokens': self.input_tokens,
+            'output_tokens': self.output_tokens,
+            'cache_creation_input_tokens': self.cache_creation_input_tokens,
+            'cache_read_input_tokens': self.cache_read_input_tokens,
+            'cache_read_ratio': round(self.cache_read_input_tokens / prompt_tokens, 3) if prompt_tokens else 0.0,
+            'retries': self.retries,
+            'throttled': self.throttled,
+            'timeouts': self.timeouts,
+            'retry_wait_seconds': round(self.retry_wait_seconds, 2),
+            'gave_up': self.exhausted
+        }
@@ -0,0 +1,132 @@
+"""
+Batches module - Client for the Claude Message Batches API
+"""
+
+import json
+import time
+import logging
+
+try:
+    from modules.http_client import get_http_client
+except ImportError:
+    # Running a script from modules/ puts modules/ itself on the path
+    from http_client import get_http_client
+
+logger = logging.getLogger('batches')
+
+class MessageBatchClient:
+    """
+    Submits many Messages API requests as one asynchronous batch job,
+    polls until it ends and streams back the per-request results.
+
+    The base URL is configurable so the client can be pointed at a local
+    stand-in server in tests.
+    """
+
+    def __init__(self, api_key, base_url='https://api.anthropic.com', timeout=60, http=None):
+        self.api_key = api_key
+        self.base_url = base_url.rstrip('/')
+        self.timeout = timeout
+        self.http = http or get_http_client()
+
+    def _headers(self):
+        return {
+            "x-api-key": self.api_key,
+            "content-type": "application/json",
+            "anthropic-version": "2023-06-01"
+        }
+
+    def create_batch(self, batch_requests):
+        """
+        Create a batch job.
+
+        Args:
+            batch_requests (list): Dicts with a `custom_id` and the Messages API `params`
+
+        Returns:
+            dict: The created batch object
+        """
+        response = self.http.post(
+            f"{self.base_url}/v1/messages/batches",
+            headers=self._headers(),
+            json={"requests": batch_requests},
+            timeout=self.timeout
+        )
+        response.raise_for_status()
+        batch = response.json()
+        logger.info(f"Created message batch {batch.get('id')} with {len(batch_requests)} requests")
+        return batch
+
+    def get_batch(self, batch_id):
+        """Get the current state of a batch job"""
+        response = self.http.get(
+            f"{self.base_url}/v1/messages/batches/{batch_id}",
+            headers=self._headers(),
+            timeout=self.timeout
+        )
+        response.raise_for_status()
+        return response.json()
+
+    def wait_for_batch(self, batch_id, poll_interval=60, timeout=86400):
+        """
+        Poll a batch until processing has ended.
+
+        Returns:
+            dict or None: The ended batch, or None if it did not end within timeout
+        """
+        deadline = time.monotonic() + timeout
+        while True:
+            batch = self.get_batch(batch_id)
+            status = batch.get('processing_status')
+            logger.info(f"Batch {batch_id} status: {status}, counts: {batch.get('request_counts')}")
+
+            if status == 'ended':
+                return batch
+
+            if time.monotonic() + poll_interval > deadline:
+                logger.warning(f"Batch {batch_id} did not end within {timeout}s")
+                return None
+
+            time.sleep(poll_interval)
+
+    def iter_results(self, batch):
+        """
+        Stream the results of an ended batch.
+
+        Yields:
+            tuple: (custom_id, response text or None, result type, usage dict)
+        """
+        results_url = batch.get('results_url')
+        if not results_url:
+            logger.error(f"Batch {batch.get('id')} has no results_url")
+            return
+
+        response = self.http.get(results_url, headers=self._headers(), stream=True, timeout=self.timeout)
+        try:
+            response.raise_for_status()
+
+            for line in response.iter_lines():
+                if not line:
+                    continue
+                try:
+                    item = json.loads(line)
+                except ValueError as e:
+                    logger.error(f"Invalid result line in batch {batch.get('id')}: {str(e)}")
+                    continue
+
+                result = item.get('result', {})
+                result_type = result.get('type')
+                text = None
+                usage = {}
+                if result_type == 'succeeded':
+                    message = result.get('message', {})
+                    content = message.get('content') or [{}]
+                    text = content[0].get('text')
+                    usage = message.get('usage') or {}
+                else:
+                    logger.warning(f"Batch request {item.get('custom_id')} {result_type}: {result.get('error')}")
+
+                yield item.get('custom_id'), text, result_type, usage
+        finally:
+            # Hands the pooled connection back even if the caller stops early
+            response.close()
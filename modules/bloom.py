@@ -0,0 +1,235 @@
+"""
+Bloom filter module - Compact set of seen keys with a configurable false-positive rate, persisted in MongoDB
+"""
+
+import math
+import hashlib
+import logging
+import datetime
+import threading
+
+logger = logging.getLogger('bloom')
+
+class BloomFilter:
+    """
+    Probabilistic set of strings: membership tests never miss a key that
+    was added, and wrongly report an unseen key as present with probability
+    about `error_rate` while no more than `capacity` keys have been added.
+
+    Sized from capacity and error rate as m = -n ln(p) / ln(2)^2 bits and
+    k = (m / n) ln(2) hash functions; the k bit positions come from two
+    64-bit halves of one BLAKE2b digest (double hashing). Safe to share
+    between threads.
+    """
+
+    def __init__(self, capacity, error_rate, bits=None, count=0, generation=0, rebuilt_at=None):
+        """
+        Args:
+            capacity (int): Keys the filter holds at its target error rate
+            error_rate (float): Target false-positive probability (0 < error_rate < 1)
+            bits (bytes, optional): Saved bit array, from to_document()
+            count (int): Keys added to the saved bit array
+            generation (int): Times the saved filter was rebuilt from scratch
+            rebuilt_at (str, optional): When the saved filter was last rebuilt
+        """
+        if capacity <= 0 or not 0 < error_rate < 1:
+            raise ValueError("capacity must be positive and error_rate between 0 and 1")
+        self._lock = threading.Lock()
+        self._size(capacity, error_rate)
+
+        size = len(self.bits)
+        if bits is not None and len(bits) != size:
+            raise ValueError(f"Saved bit array has {len(bits)} bytes, expected {size}")
+        if bits is not None:
+            self.bits = bytearray(bits)
+        self.count = count
+        self.generation = generation
+        self.rebuilt_at = rebuilt_at
+        self._warned_full = False
+
+    def _size(self, capacity, error_rate):
+        """Set capacity, error rate, bit count and hash count, with an empty bit array"""
+        self.capacity = int(capacity)
+        self.error_rate = float(error_rate)
+        self.num_bits = max(8, int(math.ceil(-self.capacity * math.log(self.error_rate) / math.log(2) ** 2)))
+        self.num_hashes = max(1, int(round(self.num_bits / self.capacity * math.log(2))))
+        self.bits = bytearray((self.num_bits + 7) // 8)
+
+    def _positions(self, key):
+        digest = hashlib.blake2b(key.encode('utf-8'), digest_size=16).digest()
+        first = int.from_bytes(digest[:8], 'little')
+        second = int.from_bytes(digest[8:], 'little') | 1
+        return [(first + i * second) % self.num_bits for i in range(self.num_hashes)]
+
+    def __contains__(self, key):
+        return all(self.bits[position >> 3] & (1 << (position & 7)) for position in self._positions(key))
+
+    def __len__(self):
+        return self.count
+
+    def add(self, key):
+        """
+        Add a key.
+
+        Returns:
+            bool: True if the key was not (apparently) present before
+        """
+        positions = self._positions(key)
+        with self._lock:
+            new = False
+            for position in positions:
+                mask = 1 << (position & 7)
+                if not self.bits[position >> 3] & mask:
+                    self.bits[position >> 3] |= mask
+                    new = True
+            if new:
+                self.count += 1
+                if self.count > self.capacity and not self._warned_full:
+                    self._warned_full = True
+                    logger.warning(
+                        f"Bloom filter holds {self.count} keys, over its capacity of {self.capacity}; "
+                        f"false positives now exceed {self.error_rate}. Rebuild it with a larger capacity."
+                    )
+        return new
+
+    def estimated_error_rate(self):
+        """Get the false-positive probability at the current fill"""
+        return (1 - math.exp(-self.num_hashes * self.count / self.num_bits)) ** self.num_hashes
+
+    def to_document(self, filter_id):
+        """Get a MongoDB document holding the filter"""
+        with self._lock:
+            return {
+                '_id': filter_id,
+                'capacity': self.capacity,
+                'error_rate': self.error_rate,
+                'count': self.count,
+                'bits': bytes(self.bits),
+                'generation': self.generation,
+                'rebuilt_at': self.rebuilt_at,
+                'saved_at': datetime.datetime.now().isoformat()
+            }
+
+    @classmethod
+    def from_document(cls, document):
+        """Rebuild a filter from to_document() output"""
+        return cls(
+            document['capacity'], document['error_rate'], bits=document['bits'], count=document.get('count', 0),
+            generation=document.get('generation', 0), rebuilt_at=document.get('rebuilt_at')
+        )
+
+    def _reload(self, document):
+        """Replace this filter's contents and sizing with a saved filter's"""
+        saved = self.from_document(document)
+        with self._lock:
+            self._size(saved.capacity, saved.error_rate)
+            self.bits = saved.bits
+            self.count = saved.count
+            self.generation = saved.generation
+            self.rebuilt_at = saved.rebuilt_at
+            self._warned_full = False
+
+    def merge(self, other):
+        """Add every key of another filter with the same capacity and error rate (bitwise OR)"""
+        if (other.capacity, other.error_rate) != (self.capacity, self.error_rate):
+            raise ValueError("Only filters with the same capacity and error rate can be merged")
+        with self._lock:
+            merged = int.from_bytes(self.bits, 'little') | int.from_bytes(other.bits, 'little')
+            self.bits = bytearray(merged.to_bytes(len(self.bits), 'little'))
+            # Keys both filters added are counted twice; the count only bounds the fill
+            self.count = max(self.count, other.count)
+
+    @classmethod
+    def load(cls, collection, filter_id, capacity, error_rate):
+        """
+        Load a filter saved in a collection, or create an empty one with the
+        given capacity and error rate.
+
+        A saved filter keeps the size it was built with; new sizing settings
+        take effect when the filter is rebuilt.
+        """
+        try:
+            document = collection.find_one({'_id': filter_id})
+        except Exception as e:
+            logger.error(f"Error loading Bloom filter '{filter_id}': {str(e)}")
+            document = None
+
+        if document is None:
+            logger.info(f"No saved Bloom filter '{filter_id}'. Starting empty (capacity {capacity}, error rate {error_rate}).")
+            return cls(capacity, error_rate)
+
+        bloom = cls.from_document(document)
+        if (bloom.capacity, bloom.error_rate) != (capacity, error_rate):
+            logger.warning(
+                f"Bloom filter '{filter_id}' was built for capacity {bloom.capacity} and error rate {bloom.error_rate}, "
+                f"not {capacity} and {error_rate}. Rebuild it to apply the new settings."
+            )
+        logger.info(f"Loaded Bloom filter '{filter_id}' with {bloom.count} keys ({len(bloom.bits)} bytes)")
+        return bloom
+
+    def save(self, collection, filter_id, merge=True):
+        """
+        Save the filter to a collection.
+
+        With `merge`, keys another process saved in the meantime are merged
+        in first, so concurrent collectors do not drop each other's keys.
+        If the saved filter was rebuilt since this one was loaded (a newer
+        generation, or a different capacity or error rate), nothing is
+        written and this filter is reloaded from it instead; keys added
+        since are found in the database again and re-added.
+
+        Without `merge` the saved filter is replaced by this one as its next
+        generation, as after a rebuild.
+
+        Returns:
+            bool: True if the filter was written
+        """
+        try:
+            document = collection.find_one({'_id': filter_id})
+        except Exception as e:
+            logger.error(f"Error reading saved Bloom filter '{filter_id}': {str(e)}")
+            return False
+
+        if not merge:
+            self.generation = (document or {}).get('generation', 0) + 1
+            self.rebuilt_at = datetime.datetime.now().isoformat()
+            try:
+                collection.replace_one({'_id': filter_id}, self.to_document(filter_id), upsert=True)
+                return True
+            except Exception as e:
+                logger.error(f"Error saving Bloom filter '{filter_id}': {str(e)}")
+                return False
+
+        if document is not None and (
+            document.get('generation', 0) > self.generation
+            or (document.get('capacity'), document.get('error_rate')) != (self.capacity, self.error_rate)
+        ):
+            self._refuse_save(filter_id, document)
+            return False
+
+        try:
+            if document is None:
+                collection.replace_one({'_id': filter_id}, self.to_document(filter_id), upsert=True)
+                return True
+
+            self.merge(self.from_document(document))
+            # Only replaces the generation that was merged (None matches filters saved before generations); a rebuild in between wins
+            result = collection.replace_one({'_id': filter_id, 'generation': document.get('generation')}, self.to_document(filter_id))
+            if result.matched_count:
+                return True
+            document = collection.find_one({'_id': filter_id})
+        except Exception as e:
+            logger.error(f"Error saving Bloom filter '{filter_id}': {str(e)}")
+            return False
+
+        if document is not None:
+            self._refuse_save(filter_id, document)
+        return False
+
+    def _refuse_save(self, filter_id, document):
+        logger.warning(
+            f"Bloom filter '{filter_id}' was rebuilt (generation {document.get('generation', 0)}, "
+            f"rebuilt at {document.get('rebuilt_at')}) since generation {self.generation} was loaded. "
+            f"Reloading it instead of saving."
+        )
+        self._reload(document)
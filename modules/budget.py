@@ -0,0 +1,282 @@
+"""
+Budget module - Local token estimation and per-run/per-day Claude spend limits
+"""
+
+import re
+import logging
+import datetime
+import threading
+
+logger = logging.getLogger('budget')
+
+# Word pieces, numbers and single punctuation marks, roughly how a BPE tokenizer splits text
+_TOKEN_PIECE = re.compile(r"[A-Za-z]+|\d+|[^\sA-Za-z\d]")
+
+# Tokens added per request and per message/system block for role and formatting markers
+REQUEST_OVERHEAD_TOKENS = 10
+BLOCK_OVERHEAD_TOKENS = 4
+
+def estimate_tokens(text):
+    """
+    Estimate the number of tokens in text without calling the API.
+
+    Every word, number and punctuation mark counts as at least one token,
+    and long words as one token per ~4 characters. This slightly
+    overestimates English prose, which is the safe side for a budget.
+    """
+    if not text:
+        return 0
+    tokens = 0
+    for piece in _TOKEN_PIECE.findall(text):
+        tokens += max(1, (len(piece) + 3) // 4)
+    return tokens
+
+def _content_text(content):
+    """Get (text, cached) pairs from a string or a list of content blocks"""
+    if isinstance(content, str):
+        return [(content, False)]
+    return [(block.get('text', ''), 'cache_control' in block) for block in content or [] if isinstance(block, dict)]
+
+def estimate_request_tokens(payload):
+    """
+    Estimate the input tokens of a Messages API request body.
+
+    Returns:
+        tuple: (uncached input tokens, tokens in cache-marked prefix blocks)
+    """
+    uncached = REQUEST_OVERHEAD_TOKENS
+    cached = 0
+    blocks = _content_text(payload.get('system'))
+    for message in payload.get('messages', []):
+        blocks.extend(_content_text(message.get('content')))
+
+    for text, is_cached in blocks:
+        tokens = estimate_tokens(text) + BLOCK_OVERHEAD_TOKENS
+        if is_cached:
+            cached += tokens
+        else:
+            uncached += tokens
+    return uncached, cached
+
+
+class BudgetExceeded(Exception):
+    """Raised when a request would exceed the run or daily Claude budget"""
+
+
+class TokenBudget:
+    """
+    Enforces token and cost limits on Claude requests, per run and per day.
+
+    Before a request is sent, reserve() prices it from a local token
+    estimate (cache-marked prefix blocks at the cache read rate, output at
+    max_tokens) and refuses it if that would cross a limit. Once the
+    response arrives, record() replaces the reservation with the `usage`
+    the API reported. Daily totals are kept in a MongoDB collection when one
+    is given, so every process counts against the same day. Requests
+billed at a discount (e.g. Message Batches) pass a `price_factor`.
+
+    Any limit may be None to disable it.
+    """
+
+    def __init__(self, pricing, run_token_limit=None, run_cost_limit=None,
+                 daily_token_limit=None, daily_cost_limit=None, usage_collection=None):
+        """
+        Args:
+            pricing (dict): Model -> USD per million tokens for 'input', 'output', 'cache_write' and 'cache_read'
+            run_token_limit (int): Tokens (input + output) allowed per run
+            run_cost_limit (float): USD allowed per run
+            daily_token_limit (int): Tokens allowed per UTC day
+            daily_cost_limit (float): USD allowed per UTC day
+            usage_collection: MongoDB collection for daily totals, or None for this process only
+        """
+        self.pricing = pricing
+        self.run_token_limit = run_token_limit
+        self.run_cost_limit = run_cost_limit
+        self.daily_token_limit = daily_token_limit
+        self.daily_cost_limit = daily_cost_limit
+        self.usage_collection = usage_collection
+        self._lock = threading.Lock()
+
+        self._reserved_tokens = 0
+        self._reserved_cost = 0.0
+        self._day = None
+        self._day_tokens = 0
+        self._day_cost = 0.0
+        self.start_run()
+
+    def start_run(self):
+        """Reset the per-run totals and reload today's totals"""
+        with self._lock:
+            self.run_tokens = 0
+            self.run_cost = 0.0
+            self.requests = 0
+            self.refused = 0
+            if self.usage_collection is not None:
+                # Picks up what other processes spent since the last run
+                self._load_day()
+            else:
+                self._roll_day()
+
+    def _rates(self, model):
+        rates = self.pricing.get(model)
+        if rates is None:
+            # Price unknown models like the most expensive known one
+            rates = max(self.pricing.values(), key=lambda r: r.get('output', 0), default={})
+        return rates
+
+    def estimate_cost(self, model, input_tokens=0, output_tokens=0, cache_write_tokens=0, cache_read_tokens=0, price_factor=1.0):
+        """Get the USD cost of a request (times `price_factor` for discounted requests)"""
+        rates = self._rates(model)
+        return (
+            input_tokens * rates.get('input', 0)
+            + output_tokens * rates.get('output', 0)
+            + cache_write_tokens * rates.get('cache_write', rates.get('input', 0))
+            + cache_read_tokens * rates.get('cache_read', rates.get('input', 0))
+        ) * price_factor / 1_000_000
+
+    def _estimate(self, payload, price_factor):
+        """Get the (tokens, cost) estimate of a request"""
+        uncached, cached = estimate_request_tokens(payload)
+        output = payload.get('max_tokens', 0)
+        cost = self.estimate_cost(
+            payload.get('model'), input_tokens=uncached, output_tokens=output, cache_read_tokens=cached, price_factor=price_factor
+        )
+        return uncached + cached + output, cost
+
+    def reserve(self, payload, price_factor=1.0):
+        """
+        Price a request before sending it and hold its estimated spend.
+
+        Returns:
+            tuple: The reservation, to pass to record() or release()
+
+        Raises:
+            BudgetExceeded: If the request would cross a limit
+        """
+        tokens, cost = self._estimate(payload, price_factor)
+
+        with self._lock:
+            self._roll_day()
+            reason = self._over_limit(tokens, cost)
+            if reason:
+                self.refused += 1
+                raise BudgetExceeded(f"{reason} (request estimated at {tokens} tokens, ${cost:.4f})")
+            self._reserved_tokens += tokens
+            self._reserved_cost += cost
+        return (tokens, cost)
+
+    def reserve_many(self, payloads, price_factor=1.0):
+        """
+        Price requests sent together (e.g. one batch job) and hold the
+        estimated spend of as many of them, in order, as the limits allow.
+
+        Returns:
+            list: Reservations of the leading payloads that fit; shorter than
+                  `payloads` if a limit was reached
+        """
+        estimates = [self._estimate(payload, price_factor) for payload in payloads]
+
+        reservations = []
+        with self._lock:
+            self._roll_day()
+            for tokens, cost in estimates:
+                reason = self._over_limit(tokens, cost)
+                if reason:
+                    self.refused += 1
+                    logger.warning(f"{reason}: holding {len(reservations)} of {len(payloads)} requests")
+                    break
+                self._reserved_tokens += tokens
+                self._reserved_cost += cost
+                reservations.append((tokens, cost))
+        return reservations
+
+    def _over_limit(self, tokens, cost):
+        """Get why a request of this size would cross a limit, or None. Hold the lock."""
+        run_tokens = self.run_tokens + self._reserved_tokens + tokens
+        run_cost = self.run_cost + self._reserved_cost + cost
+        day_tokens = self._day_tokens + self._reserved_tokens + tokens
+        day_cost = self._day_cost + self._reserved_cost + cost
+
+        if self.run_token_limit is not None and run_tokens > self.run_token_limit:
+            return f"Run token budget of {self.run_token_limit} reached"
+        if self.run_cost_limit is not None and run_cost > self.run_cost_limit:
+            return f"Run cost budget of ${self.run_cost_limit} reached"
+        if self.daily_token_limit is not None and day_tokens > self.daily_token_limit:
+            return f"Daily token budget of {self.daily_token_limit} reached"
+        if self.daily_cost_limit is not None and day_cost > self.daily_cost_limit:
+            return f"Daily cost budget of ${self.daily_cost_limit} reached"
+        return None
+
+    def release(self, reservation):
+        """Drop a reservation for a request that failed without usage"""
+        tokens, cost = reservation
+        with self._lock:
+            self._reserved_tokens -= tokens
+            self._reserved_cost -= cost
+
+    def record(self, reservation, model, usage, price_factor=1.0):
+        """Replace a reservation with the usage the API reported"""
+        input_tokens = usage.get('input_tokens') or 0
+        output_tokens = usage.get('output_tokens') or 0
+        cache_write = usage.get('cache_creation_input_tokens') or 0
+        cache_read = usage.get('cache_read_input_tokens') or 0
+        tokens = input_tokens + output_tokens + cache_write + cache_read
+        cost = self.estimate_cost(model, input_tokens, output_tokens, cache_write, cache_read, price_factor)
+
+        self.release(reservation)
+        with self._lock:
+            self._roll_day()
+            self.run_tokens += tokens
+            self.run_cost += cost
+            self.requests += 1
+            self._day_tokens += tokens
+            self._day_cost += cost
+            day = self._day
+
+        if self.usage_collection is not None:
+            try:
+                self.usage_collection.update_one(
+                    {'_id': day},
+                    {'$inc': {
+                        'requests': 1,
+                        'input_tokens': input_tokens,
+                        'output_tokens': output_tokens,
+                        'cache_creation_input_tokens': cache_write,
+                        'cache_read_input_tokens': cache_read,
+                        'tokens': tokens,
+                        'cost_usd': cost
+                    }},
+                    upsert=True
+                )
+            except Exception as e:
+                logger.error(f"Error recording API usage: {str(e)}")
+
+    def _roll_day(self):
+        """Reload the daily totals when the UTC day changes. Hold the lock."""
+        if self._day != datetime.datetime.utcnow().strftime('%Y-%m-%d'):
+            self._load_day()
+
+    def _load_day(self):
+        """Load today's totals, including other processes' usage. Hold the lock."""
+        self._day = datetime.datetime.utcnow().strftime('%Y-%m-%d')
+        self._day_tokens = 0
+        self._day_cost = 0.0
+        if self.usage_collection is None:
+            return
+        try:
+            doc = self.usage_collection.find_one({'_id': self._day}) or {}
+            self._day_tokens = doc.get('tokens', 0)
+            self._day_cost = doc.get('cost_usd', 0.0)
+        except Exception as e:
+            logger.error(f"Error loading API usage for {self._day}: {str(e)}")
+
+    def stats(self):
+        """Get spend counters"""
+        return {
+            'run_tokens': self.run_tokens,
+            'run_cost_usd': round(self.run_cost, 4),
+            'day_tokens': self._day_tokens,
+            'day_cost_usd': round(self._day_cost, 4),
+            'requests': self.requests,
+            'refused': self.refused
+        }
@@ -0,0 +1,151 @@
+"""
+Bulk writer module - Write-behind buffer that batches MongoDB writes
+"""
+
+import time
+import logging
+import threading
+
+try:
+    import pymongo
+    from pymongo.errors import BulkWriteError
+except ImportError:
+    # Without pymongo (mock collections) buffered ops are replayed one by one
+    pymongo = None
+    BulkWriteError = None
+
+logger = logging.getLogger('bulk_writer')
+
+class BulkWriter:
+    """
+    Buffers update_one and insert_one calls and writes them with one
+    bulk_write per collection once `max_ops` writes are buffered or the
+    oldest buffered write is `max_age_seconds` old (checked as writes are
+    added), or when flush() is called.
+
+    Collections are flushed in the order they were first written to, so
+    article updates buffered before their events are persisted before them.
+    """
+
+    def __init__(self, max_ops=500, max_age_seconds=5.0):
+        """
+        Args:
+            max_ops (int): Buffered writes that trigger a flush
+            max_age_seconds (float): Age of the oldest buffered write that triggers a flush
+        """
+        self.max_ops = max_ops
+        self.max_age_seconds = max_age_seconds
+        self._queues = {} # collection name -> (collection, list of ops), in first-write order
+        self._pending = 0
+        self._oldest = None
+        self._lock = threading.RLock()
+
+        # Counters for reporting
+        self.flushes = 0
+        self.ops_written = 0
+        self.errors = 0
+        self.batched_ops = 0
+        self.max_batch_size = 0
+        self.flush_seconds = 0.0
+        self.max_flush_seconds = 0.0
+
+    def update_one(self, collection, query, update, upsert=False):
+        """Buffer an update_one"""
+        self._add(collection, ('update_one', query, update, upsert))
+
+    def insert_one(self, collection, document):
+        """Buffer an insert_one"""
+        self._add(collection, ('insert_one', document))
+
+    def _add(self, collection, op):
+        with self._lock:
+            name = getattr(collection, 'name', str(id(collection)))
+            self._queues.setdefault(name, (collection, []))[1].append(op)
+            self._pending += 1
+            if self._oldest is None:
+                self._oldest = time.monotonic()
+
+            if self._pending >= self.max_ops or time.monotonic() - self._oldest >= self.max_age_seconds:
+                self.flush()
+
+    def flush(self):
+        """Write every buffered op, returning how many were written"""
+        with self._lock:
+            if not self._pending:
+                return 0
+
+            start = time.monotonic()
+            written = 0
+            for collection, ops in self._queues.values():
+                if ops:
+                    written += self._write(collection, ops)
+
+            batch_size = self._pending
+            self._queues = {}
+            self._pending = 0
+            self._oldest = None
+
+            elapsed = time.monotonic() - start
+            self.flushes += 1
+            self.ops_written += written
+            self.batched_ops += batch_size
+            self.max_batch_size = max(self.max_batch_size, batch_size)
+            self.flush_seconds += elapsed
+            self.max_flush_seconds = max(self.max_flush_seconds, elapsed)
+
+        logger.debug(f"Flushed {written}/{batch_size} buffered writes in {elapsed:.3f}s")
+        return written
+
+    def _write(self, collection, ops):
+        """Write one collection's ops, returning how many succeeded"""
+        if pymongo is None or not hasattr(collection, 'bulk_write'):
+            return self._replay(collection, ops)
+
+        requests = []
+        for op in ops:
+            if op[0] == 'update_one':
+                requests.append(pymongo.UpdateOne(op[1], op[2], upsert=op[3]))
+            else:
+                requests.append(pymongo.InsertOne(op[1]))
+
+        try:
+            # Unordered: ops within a collection are independent of each other
+            collection.bulk_write(requests, ordered=False)
+            return len(requests)
+        except BulkWriteError as e:
+            write_errors = e.details.get('writeErrors', [])
+            self.errors += len(write_errors)
+            logger.error(f"Bulk write to '{collection.name}' failed for {len(write_errors)} of {len(requests)} ops: {write_errors[:3]}")
+            return len(requests) - len(write_errors)
+        except Exception as e:
+            self.errors += len(requests)
+            logger.exception(f"Bulk write to '{getattr(collection, 'name', collection)}' failed: {str(e)}")
+            return 0
+
+    def _replay(self, collection, ops):
+        """Write ops one at a time (collections without bulk_write)"""
+        written = 0
+        for op in ops:
+            try:
+                if op[0] == 'update_one':
+                    collection.update_one(op[1], op[2], upsert=op[3])
+                else:
+                    collection.insert_one(op[1])
+                written += 1
+            except Exception as e:
+                self.errors += 1
+                logger.error(f"Buffered {op[0]} on '{getattr(collection, 'name', collection)}' failed: {str(e)}")
+        return written
+
+    def stats(self):
+        """Get flush counters"""
+        return {
+            'flushes': self.flushes,
+            'ops_written': self.ops_written,
+            'errors': self.errors,
+            'pending': self._pending,
+            'avg_batch_size': round(self.batched_ops / self.flushes, 1) if self.flushes else 0.0,
+            'max_batch_size': self.max_batch_size,
+            'avg_flush_seconds': round(self.flush_seconds / self.flushes, 4) if self.flushes else 0.0,
+            'max_flush_seconds': round(self.max_flush_seconds, 4)
+        }
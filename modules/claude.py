@@ -1,9 +1,29 @@
 # Enhanced claude.py with objective numerical ratings
 
+import time
 import requests
 import json
 import logging
-from config import ANTHROPIC_API_KEY
+from concurrent.futures import ThreadPoolExecutor
+from config import (
+    ANTHROPIC_API_KEY, ANTHROPIC_API_URL, CLAUDE_MODEL_PRICING,
+    CLAUDE_MODEL, CLAUDE_STRONG_MODEL, CLAUDE_ESCALATE_MAX_CONFIDENCE,
+    CLAUDE_RUN_TOKEN_BUDGET, CLAUDE_RUN_COST_BUDGET_USD,
+    CLAUDE_DAILY_TOKEN_BUDGET, CLAUDE_DAILY_COST_BUDGET_USD,
+    CLAUDE_PERSPECTIVE_ADAPTIVE, CLAUDE_PERSPECTIVE_TOLERANCE,
+    CLAUDE_REQUESTS_PER_MINUTE, CLAUDE_TOKENS_PER_MINUTE, CLAUDE_REQUEST_TIMEOUT_SECONDS,
+    CLAUDE_MAX_RETRIES, CLAUDE_RETRY_BASE_SECONDS, CLAUDE_RETRY_MAX_SECONDS
+)
+
+try:
+    from modules.anthropic_client import AnthropicClient, ClaudeUnavailable
+    from modules.budget import TokenBudget, BudgetExceeded
+    from modules.ratelimit import RateLimiter
+except ImportError:
+    # Running this file directly puts modules/ itself on the path
+    from anthropic_client import AnthropicClient, ClaudeUnavailable
+    from budget import TokenBudget, BudgetExceeded
+    from ratelimit import RateLimiter
 
 # Set up logging
 logging.basicConfig(
@@ -12,17 +32,47 @@ logging.basicConfig(
 )
 logger = logging.getLogger('claude')
 
+# Perspectives run first in adaptive mode; when these opposing views agree the
+# remaining perspectives are skipped
+ADAPTIVE_FIRST_PERSPECTIVES = ("conservative", "progressive")
+
 class ClaudeAPI:
     """
     Handles interactions with the Claude AI API for enhanced text analysis
     with objective ratings and multiple perspectives.
     """
     
-    def __init__(self, api_key=None):
+    def __init__(self, api_key=None, budget=None):
+        """
+        Args:
+            api_key (str, optional): Anthropic API key (default: from config)
+            budget (TokenBudget, optional): Spend limits to enforce (default: the configured
+                run and daily limits, counted for this instance only)
+        """
         self.api_key = api_key or ANTHROPIC_API_KEY
         if not self.api_key:
             logger.error("No Claude API key provided")
             raise ValueError("Claude API key is required")
+
+        self.budget = budget or TokenBudget(
+            CLAUDE_MODEL_PRICING,
+            run_token_limit=CLAUDE_RUN_TOKEN_BUDGET,
+            run_cost_limit=CLAUDE_RUN_COST_BUDGET_USD,
+            daily_token_limit=CLAUDE_DAILY_TOKEN_BUDGET,
+            daily_cost_limit=CLAUDE_DAILY_COST_BUDGET_USD
+        )
+        # Perspectives run concurrently, so requests share one limiter
+        self.rate_limiter = RateLimiter(CLAUDE_REQUESTS_PER_MINUTE, CLAUDE_TOKENS_PER_MINUTE)
+        self.client = AnthropicClient(
+            self.api_key,
+            base_url=ANTHROPIC_API_URL,
+            timeout=CLAUDE_REQUEST_TIMEOUT_SECONDS,
+            rate_limiter=self.rate_limiter,
+            budget=self.budget,
+            max_retries=CLAUDE_MAX_RETRIES,
+            backoff_base=CLAUDE_RETRY_BASE_SECONDS,
+            backoff_max=CLAUDE_RETRY_MAX_SECONDS
+        )
             
         # Define different analysis perspectives
         self.perspectives = {
@@ -40,24 +90,21 @@ class ClaudeAPI:
             }
         }
     
-    def analyze_text(self, text, system_prompt=None, max_tokens=1500, model="claude-3-sonnet-20240229"):
+    def analyze_text(self, text, system_prompt=None, max_tokens=1500, model=None):
         """
         Analyze text using Claude AI.
         
         Args:
             text (str): The main text to analyze
-            system_prompt (str, optional): System message to guide Claude
+            system_prompt (str or list, optional): System message to guide Claude,
+                or a list of system content blocks (which may carry cache_control)
             max_tokens (int): Maximum tokens in response
-            model (str): Claude model to use
+            model (str, optional): Claude model to use (default: the fast tier, CLAUDE_MODEL)
             
         Returns:
             str or None: Claude's response or None if error
         """
-        headers = {
-            "x-api-key": self.api_key,
-            "content-type": "application/json",
-            "anthropic-version": "2023-06-01"
-        }
+        model = model or CLAUDE_MODEL
         
         # Prepare the request payload
         messages = [{"role": "user", "content": text}]
@@ -74,141 +121,281 @@ class ClaudeAPI:
         
         try:
             logger.info(f"Sending request to Claude API using model {model}")
-            response = requests.post(
-                "https://api.anthropic.com/v1/messages",
-                headers=headers,
-                json=payload
-            )
+            start = time.monotonic()
+            result = self.client.create_message(payload)
+            elapsed = time.monotonic() - start
             
-            if response.status_code != 200:
-                logger.error(f"Claude API error: Status {response.status_code}, Response: {response.text}")
-                return None
-            
-            result = response.json()
-            response_text = result.get('content', [{}])[0].get('text', '')
+            response_text = AnthropicClient.response_text(result) or ''
+            usage = result.get('usage') or {}
             
-            logger.info(f"Received response from Claude API ({len(response_text)} chars)")
+            logger.info(f"Received response from {model} in {elapsed:.2f}s ({len(response_text)} chars, {usage.get('cache_read_input_tokens') or 0} cached input tokens)")
             return response_text
             
+        except BudgetExceeded as e:
+            logger.warning(f"Claude request not sent: {str(e)}")
+            return None
+        except ClaudeUnavailable as e:
+            logger.error(f"Claude API unavailable: {str(e)}")
+            return None
+        except requests.exceptions.HTTPError as e:
+            logger.error(f"Claude API error: Status {e.response.status_code}, Response: {e.response.text}")
+            return None
         except Exception as e:
             logger.error(f"Error calling Claude API: {str(e)}")
             return None
     
-    def _create_analysis_prompt(self, article, categories, perspective_name):
-        """Create a specialized prompt for a specific perspective"""
-        
-        prompt = f"""
-        You are analyzing this news article from the perspective of {perspective_name}.
-        
-        Please analyze according to the Despotism Readiness Framework categories: {', '.join(categories)}
-        
-        Article Title: {article.get('title', 'No title')}
+    def _create_framework_prompt(self, framework_description=None):
+        """
+        Create the static framework instructions and output format.
         
-        Article Content:
-        {article.get('content', 'No content')}
+        This is identical for every article and perspective, so it is sent
+        first in the system prompt and cached between calls.
+        """
+        prompt = """
+        Your task is to analyze news articles according to the Despotism Readiness Framework, 
+        which tracks indicators of democratic backsliding.
         
-        Source: {article.get('source', 'Unknown')}
-        Date: {article.get('published_date', 'Unknown')}
+        Be thorough and evidence-based in your analysis.
         
-        For each category, provide:
+        For each category you are asked about, provide:
         1. A severity rating (GREEN, YELLOW, ORANGE, or RED)
         2. A numerical score from 0-100 where:
            - 0-25: GREEN (No concerning indicators)
            - 26-50: YELLOW (Early warning signs)
            - 51-75: ORANGE (Significant concerns)
            - 76-100: RED (Critical threat)
-        3. A brief explanation for your rating
+        3. A confidence score as an integer from 1 (low) to 5 (high) reflecting your certainty in the rating
+        4. A brief explanation for your rating
         
         Please respond in JSON format like this:
-        {{
-            "categories": {{
-                "category_id": {{
+        {
+            "categories": {
+                "category_id": {
                     "severity": "severity_level",
                     "score": numerical_score,
+                    "confidence": <integer_1_to_5>,
                     "explanation": "Your brief explanation"
-                }},
+                },
                 ...
-            }},
+            },
             "overall_assessment": "Your brief overall assessment"
-        }}
+        }
+        
+        Only include the categories you are asked about, and use only GREEN, YELLOW, ORANGE, or RED as severity levels.
+        """
+        
+        # Add custom framework description if provided
+        if framework_description:
+            prompt += f"\n\n{framework_description}"
+        
+        return prompt
+    
+    def _create_system_blocks(self, framework_prompt, perspective_data):
+        """
+        Create the system prompt blocks for one perspective.
+        
+        The shared framework comes first and the perspective second, each
+        ending in a cache breakpoint, so the framework prefix is reused by
+        every perspective and the framework plus perspective by every article.
+        """
+        perspective_prompt = f"""
+        {perspective_data['description']}
+        
+        You are analyzing news articles from the perspective of {perspective_data['name']}.
+        """
+        return [
+            AnthropicClient.text_block(framework_prompt, cache=True),
+            AnthropicClient.text_block(perspective_prompt, cache=True)
+        ]
+    
+    def _create_analysis_prompt(self, article, categories):
+        """Create the per-article part of the prompt"""
+        
+        prompt = f"""
+        Please analyze this news article according to the Despotism Readiness Framework categories: {', '.join(categories)}
+        
+        Article Title: {article.get('title', 'No title')}
+        
+        Article Content:
+        {article.get('content', 'No content')}
         
-        Only include the categories I've asked about, and use only GREEN, YELLOW, ORANGE, or RED as severity levels.
+        Source: {article.get('source', 'Unknown')}
+        Date: {article.get('published_date', 'Unknown')}
         """
         
         return prompt
         
-    def analyze_news_article_multi_perspective(self, article, categories, framework_description=None):
+    def analyze_news_article_multi_perspective(self, article, categories, framework_description=None, adaptive=None):
         """
         Analyze a news article from multiple perspectives to control for bias.
         
+        Perspectives are requested concurrently. In adaptive mode the
+        conservative and progressive perspectives run first, and the rest
+        only if their category scores differ by more than
+        CLAUDE_PERSPECTIVE_TOLERANCE.
+        
         Args:
             article (dict): Article data with title, content, etc.
             categories (list): List of category IDs to analyze
             framework_description (str, optional): Description of the framework
+            adaptive (bool, optional): Stop early when perspectives agree (default: CLAUDE_PERSPECTIVE_ADAPTIVE)
             
         Returns:
             dict: Combined analysis results with category ratings, scores, and explanations
         """
-        all_analyses = {}
+        adaptive = CLAUDE_PERSPECTIVE_ADAPTIVE if adaptive is None else adaptive
+        
+        # The framework and article prompts are the same for every perspective
+        framework_prompt = self._create_framework_prompt(framework_description)
+        prompt = self._create_analysis_prompt(article, categories)
+        
+        first = list(self.perspectives)
+        if adaptive:
+            first = [p for p in ADAPTIVE_FIRST_PERSPECTIVES if p in self.perspectives] or first
+        perspectives_run = list(first)
+        all_analyses = self._run_perspectives(first, framework_prompt, prompt)
+        
+        rest = [p for p in self.perspectives if p not in first]
+        if rest:
+            if len(all_analyses) == len(first) and self._perspectives_agree(all_analyses, CLAUDE_PERSPECTIVE_TOLERANCE):
+                logger.info(f"Perspectives {', '.join(first)} agree within {CLAUDE_PERSPECTIVE_TOLERANCE} points; skipping {', '.join(rest)}")
+            else:
+                perspectives_run.extend(rest)
+                all_analyses.update(self._run_perspectives(rest, framework_prompt, prompt))
+        
+        logger.info(f"Claude usage: {self.client.stats()}")
+        logger.info(f"Claude rate limiter: {self.rate_limiter.stats()}")
+        logger.info(f"Claude spend: {self.budget.stats()}")
+        
+        # Combine analyses from all perspectives, in the order they are defined
+        all_analyses = {p: all_analyses[p] for p in self.perspectives if p in all_analyses}
+        perspectives_run = [p for p in self.perspectives if p in perspectives_run]
+        combined_result = self._combine_multi_perspective_analyses(all_analyses, perspectives_run)
+        return combined_result
+    
+    def _run_perspectives(self, perspective_ids, framework_prompt, prompt):
+        """
+        Request several perspectives concurrently.
+        
+        Returns:
+            dict: Parsed analyses by perspective, for the perspectives that succeeded
+        """
+        if len(perspective_ids) == 1:
+            results = [self._analyze_perspective(perspective_ids[0], framework_prompt, prompt)]
+        else:
+            with ThreadPoolExecutor(max_workers=len(perspective_ids)) as executor:
+                results = list(executor.map(
+                    lambda perspective_id: self._analyze_perspective(perspective_id, framework_prompt, prompt),
+                    perspective_ids
+                ))
+        
+        return {
+            perspective_id: result
+            for perspective_id, result in zip(perspective_ids, results)
+            if result is not None
+        }
+    
+    def _analyze_perspective(self, perspective_id, framework_prompt, prompt):
+        """
+        Request and parse one perspective's analysis, returning None on failure.
+        
+        The fast model answers first; the strong model is asked again only
+        when that answer has a red severity or low confidence.
+        """
+        # Create system prompt for this perspective
+        system_prompt = self._create_system_blocks(framework_prompt, self.perspectives[perspective_id])
+        
+        result = self._parse_perspective_response(perspective_id, self.analyze_text(prompt, system_prompt=system_prompt))
+        
+        reason = self._escalation_reason(result)
+        if reason:
+            logger.info(f"Routing {perspective_id} perspective to {CLAUDE_STRONG_MODEL}: {reason}")
+            strong_result = self._parse_perspective_response(
+                perspective_id,
+                self.analyze_text(prompt, system_prompt=system_prompt, model=CLAUDE_STRONG_MODEL)
+            )
+            if strong_result is not None:
+                result = strong_result
+            else:
+                logger.warning(f"Escalation failed for {perspective_id} perspective. Keeping the {CLAUDE_MODEL} result.")
         
-        # Analyze from each perspective
-        for perspective_id, perspective_data in self.perspectives.items():
-            # Create system prompt for this perspective
-            system_prompt = f"""
-            {perspective_data['description']}
+        return result
+    
+    def _escalation_reason(self, result):
+        """Get why a fast-tier perspective result should be redone with the strong model, or None"""
+        if not result or not CLAUDE_STRONG_MODEL or CLAUDE_STRONG_MODEL == CLAUDE_MODEL:
+            return None
+        
+        for cat_id, cat_data in (result.get('categories') or {}).items():
+            if not isinstance(cat_data, dict):
+                continue
+            if cat_data.get('severity') == 'red':
+                return f"red severity for {cat_id}"
+            confidence = cat_data.get('confidence')
+            if isinstance(confidence, (int, float)) and confidence <= CLAUDE_ESCALATE_MAX_CONFIDENCE:
+                return f"confidence {confidence} for {cat_id}"
+        return None
+    
+    def _parse_perspective_response(self, perspective_id, response):
+        """Parse one perspective's response, returning None on failure"""
+        if not response:
+            return None
+        
+        # Parse response
+        try:
+            # Extract JSON from response
+            json_start = response.find('{')
+            json_end = response.rfind('}') + 1
             
-            Your task is to analyze news articles according to the Despotism Readiness Framework, 
-            which tracks indicators of democratic backsliding.
+            if json_start == -1 or json_end == 0:
+                logger.warning(f"No JSON found in Claude response for {perspective_id} perspective")
+                return None
             
-            Be thorough and evidence-based in your analysis.
-            """
+            json_str = response[json_start:json_end]
+            result = json.loads(json_str)
             
-            # Add custom framework description if provided
-            if framework_description:
-                system_prompt += f"\n\n{framework_description}"
-                
-            # Create the analysis prompt for this perspective    
-            prompt = self._create_analysis_prompt(article, categories, perspective_data['name'])
+            # Normalize the severity levels to lowercase
+            if 'categories' in result:
+                for cat_id, cat_data in result['categories'].items():
+                    if isinstance(cat_data, dict) and 'severity' in cat_data:
+                        cat_data['severity'] = cat_data['severity'].lower()
             
-            # Call Claude API
-            response = self.analyze_text(prompt, system_prompt=system_prompt)
+            return result
             
-            # Parse response
-            if response:
-                try:
-                    # Extract JSON from response
-                    json_start = response.find('{')
-                    json_end = response.rfind('}') + 1
-                    
-                    if json_start == -1 or json_end == 0:
-                        logger.warning(f"No JSON found in Claude response for {perspective_id} perspective")
-                        continue
-                    
-                    json_str = response[json_start:json_end]
-                    result = json.loads(json_str)
-                    
-                    # Normalize the severity levels to lowercase
-                    if 'categories' in result:
-                        for cat_id, cat_data in result['categories'].items():
-                            if isinstance(cat_data, dict) and 'severity' in cat_data:
-                                cat_data['severity'] = cat_data['severity'].lower()
-                    
-                    # Store this perspective's analysis
-                    all_analyses[perspective_id] = result
-                    
-                except Exception as e:
-                    logger.error(f"Error parsing Claude response for {perspective_id} perspective: {str(e)}")
+        except Exception as e:
+            logger.error(f"Error parsing Claude response for {perspective_id} perspective: {str(e)}")
+            return None
+    
+    def _perspectives_agree(self, analyses, tolerance):
+        """
+        Check whether every category scored by any perspective was scored by
+        all of them, within `tolerance` points of each other.
+        """
+        all_categories = set()
+        for analysis in analyses.values():
+            all_categories.update((analysis.get('categories') or {}).keys())
+        if not all_categories:
+            return False
         
-        # Combine analyses from all perspectives
-        combined_result = self._combine_multi_perspective_analyses(all_analyses)
-        return combined_result
+        for cat_id in all_categories:
+            scores = []
+            for analysis in analyses.values():
+                cat_data = (analysis.get('categories') or {}).get(cat_id)
+                if not isinstance(cat_data, dict) or not isinstance(cat_data.get('score'), (int, float)):
+                    return False
+                scores.append(cat_data['score'])
+            if max(scores) - min(scores) > tolerance:
+                return False
+        return True
             
-    def _combine_multi_perspective_analyses(self, all_analyses):
+    def _combine_multi_perspective_analyses(self, all_analyses, perspectives_run=None):
         """
         Combine analyses from multiple perspectives into a single result.
         
         Args:
             all_analyses (dict): Dictionary of analyses by perspective
+            perspectives_run (list, optional): Perspectives that were requested,
+                including any that failed (default: those in all_analyses)
             
         Returns:
             dict: Combined analysis with averaged scores and all explanations
@@ -220,6 +407,7 @@ class ClaudeAPI:
         combined = {
             "categories": {},
             "perspectives": {},
+            "perspectives_run": list(perspectives_run) if perspectives_run is not None else list(all_analyses),
             "overall_assessment": ""
         }
         
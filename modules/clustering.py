@@ -0,0 +1,190 @@
+"""
+Clustering module - MinHash signatures and an LSH index for grouping near-duplicate stories
+"""
+
+import re
+import zlib
+import random
+import hashlib
+import logging
+import threading
+
+try:
+    from modules.context import strip_markup
+except ImportError:
+    # Running a script from modules/ puts modules/ itself on the path
+    from context import strip_markup
+
+logger = logging.getLogger('clustering')
+
+_WORD = re.compile(r"[a-z0-9]+")
+
+# Mersenne prime modulus of the permutation hashes, and the signature value range
+_PRIME = (1 << 61) - 1
+_MAX_HASH = (1 << 32) - 1
+
+def shingles(text, size=3):
+    """
+    Get the set of `size`-word shingles of a text.
+
+    Markup, case and punctuation are ignored, so the same wire copy
+    republished with different formatting gives the same shingles. Texts
+    shorter than one shingle give a single shingle of all their words.
+    """
+    words = _WORD.findall(strip_markup(text).lower())
+    if len(words) <= size:
+        return {' '.join(words)} if words else set()
+    return {' '.join(words[i:i + size]) for i in range(len(words) - size + 1)}
+
+
+class MinHasher:
+    """
+    Computes MinHash signatures of article text and the LSH band keys
+    that let near-duplicates be found without comparing every pair.
+
+    The share of equal values in two signatures estimates the Jaccard
+    similarity of the articles' shingle sets. Signatures are split into
+    `bands` bands of `num_perm / bands` values; two articles with
+    similarity s share at least one band key with probability
+    1 - (1 - s^rows)^bands, so similar articles almost always collide and
+    unrelated ones rarely do.
+    """
+
+    def __init__(self, num_perm=64, bands=16, shingle_size=3, seed=1):
+        """
+        Args:
+            num_perm (int): Signature length (number of hash permutations)
+            bands (int): LSH bands; must divide num_perm
+            shingle_size (int): Words per shingle
+            seed (int): Seed of the permutation parameters; signatures are only comparable with the same seed
+        """
+        if num_perm % bands:
+            raise ValueError(f"num_perm ({num_perm}) must be a multiple of bands ({bands})")
+        self.num_perm = num_perm
+        self.bands = bands
+        self.rows = num_perm // bands
+        self.shingle_size = shingle_size
+
+        rng = random.Random(seed)
+        self._permutations = [
+            (rng.randrange(1, _PRIME), rng.randrange(0, _PRIME))
+            for _ in range(num_perm)
+        ]
+
+    def signature(self, text):
+        """
+        Get the MinHash signature of a text.
+
+        Returns:
+            list: num_perm integers, or None if the text has no words
+        """
+        hashes = [zlib.crc32(shingle.encode('utf-8')) for shingle in shingles(text, self.shingle_size)]
+        if not hashes:
+            return None
+        return [
+            min((a * h + b) % _PRIME for h in hashes) & _MAX_HASH
+            for a, b in self._permutations
+        ]
+
+    def band_keys(self, signature):
+        """Get the LSH bucket key of each band of a signature"""
+        keys = []
+        for band in range(self.bands):
+            rows = signature[band * self.rows:(band + 1) * self.rows]
+            digest = hashlib.md5(','.join(map(str, rows)).encode('ascii')).hexdigest()[:16]
+            keys.append(f"{band}:{digest}")
+        return keys
+
+    @staticmethod
+    def similarity(first, second):
+        """Estimate the Jaccard similarity of two articles from their signatures"""
+        if not first or not second or len(first) != len(second):
+            return 0.0
+        return sum(1 for a, b in zip(first, second) if a == b) / len(first)
+
+
+class LSHIndex:
+    """
+    In-memory LSH index of article signatures that assigns each article to
+    a story cluster.
+
+    An article joins the cluster of the most similar indexed article that
+    shares an LSH band with it and whose estimated similarity reaches
+    `threshold`; otherwise it starts a cluster of its own. Safe to share
+    between threads.
+    """
+
+    def __init__(self, threshold=0.5):
+        """
+        Args:
+            threshold (float): Estimated Jaccard similarity at which two articles are the same story
+        """
+        self.threshold = threshold
+        self._lock = threading.Lock()
+        self._buckets = {}
+        self._entries = {}
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, key):
+        return key in self._entries
+
+    def add(self, key, signature, band_keys, cluster_id):
+        """Index an article that already belongs to a cluster"""
+        with self._lock:
+            self._add(key, signature, band_keys, cluster_id)
+
+    def _add(self, key, signature, band_keys, cluster_id):
+        """Index an article. Hold the lock."""
+        self._entries[key] = (signature, cluster_id, band_keys)
+        for band_key in band_keys:
+            self._buckets.setdefault(band_key, set()).add(key)
+
+    def remove(self, key):
+        """Drop an article from the index (e.g. one that was never stored)"""
+        with self._lock:
+            entry = self._entries.pop(key, None)
+            if entry is None:
+                return
+            for band_key in entry[2]:
+                bucket = self._buckets.get(band_key)
+                if bucket is not None:
+                    bucket.discard(key)
+                    if not bucket:
+                        del self._buckets[band_key]
+
+    def assign(self, key, signature, band_keys, new_cluster_id):
+        """
+        Find the cluster of an article and index it.
+
+        Args:
+            key: Unique article key (e.g. its URL)
+            signature (list): The article's MinHash signature
+            band_keys (list): The article's LSH band keys
+            new_cluster_id (str): Cluster id to use if the article starts a new cluster
+
+        Returns:
+            tuple: (cluster id, True if the article started the cluster, similarity to the closest match)
+        """
+        with self._lock:
+            if key in self._entries:
+                return self._entries[key][1], False, 1.0
+
+            candidates = set()
+            for band_key in band_keys:
+                candidates.update(self._buckets.get(band_key, ()))
+
+            best_cluster, best_similarity = None, 0.0
+            for candidate in candidates:
+                candidate_signature, candidate_cluster, _ = self._entries[candidate]
+                similarity = MinHasher.similarity(signature, candidate_signature)
+                if similarity > best_similarity:
+                    best_cluster, best_similarity = candidate_cluster, similarity
+
+            if best_cluster is not None and best_similarity >= self.threshold:
+                self._add(key, signature, band_keys, best_cluster)
+                return best_cluster, False, best_similarity
+
+            self._add(key, signature, band_keys, new_cluster_id)
+            return new_cluster_id, True, best_similarity
@@ -1,17 +1,42 @@
 import requests
 import feedparser
+import pymongo
+from pymongo import UpdateOne
+from pymongo.errors import BulkWriteError
 import datetime
 import time
 import logging
+import hashlib
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from urllib.parse import urlparse
 from config import (
     GUARDIAN_API_KEY, 
     NEWS_API_KEY,
     NEWS_SOURCES,
     COLLECTION_ARTICLES,
+    COLLECTION_FEED_CACHE,
+    COLLECTION_URL_FILTER,
     NEWSDATA_API_KEY,
-    THENEWSAPI_KEY
+    THENEWSAPI_KEY,
+    COLLECTION_MAX_WORKERS,
+    COLLECTION_HOST_INTERVAL_SECONDS,
+    STORY_CLUSTERING_ENABLED,
+    STORY_MINHASH_PERMUTATIONS,
+    STORY_LSH_BANDS,
+    STORY_SHINGLE_WORDS,
+    STORY_SIMILARITY_THRESHOLD,
+    STORY_CLUSTER_WINDOW_HOURS,
+    URL_FILTER_ENABLED,
+    URL_FILTER_CAPACITY,
+    URL_FILTER_ERROR_RATE
 )
 from modules.database import get_collection
+from modules.matcher import KeywordMatcher
+from modules.http_client import get_http_client
+from modules.clustering import MinHasher, LSHIndex
+from modules.urlcanon import canonicalize_url
+from modules.bloom import BloomFilter
 
 # Set up logging
 logging.basicConfig(
@@ -20,6 +45,34 @@ logging.basicConfig(
 )
 logger = logging.getLogger('collector')
 
+# _id of the seen canonical URL filter in the url filter collection
+URL_FILTER_ID = 'seen_canonical_urls'
+# Articles updated per bulk write when backfilling canonical URLs
+CANONICAL_URL_BACKFILL_BATCH = 1000
+
+class HostRateLimiter:
+    """
+    Enforces a minimum interval between requests to the same host.
+    Safe to share between collector worker threads.
+    """
+    
+    def __init__(self, min_interval):
+        self.min_interval = min_interval
+        self._next_allowed = {}
+        self._lock = threading.Lock()
+    
+    def wait(self, host):
+        """Block until a request to host is allowed, then reserve the next slot"""
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next_allowed.get(host, now))
+            self._next_allowed[host] = slot + self.min_interval
+        
+        delay = slot - now
+        if delay > 0:
+            logger.debug(f"Rate limiting {host}: waiting {delay:.2f}s")
+            time.sleep(delay)
+
 class NewsCollector:
     """
     Collects news from multiple sources using free APIs and RSS feeds.
@@ -29,11 +82,38 @@ class NewsCollector:
     def __init__(self):
         try:
             self.articles_collection = get_collection(COLLECTION_ARTICLES)
+            self.feed_cache_collection = get_collection(COLLECTION_FEED_CACHE)
+            self.url_filter_collection = get_collection(COLLECTION_URL_FILTER)
             logger.info("Successfully connected to database")
         except Exception as e:
             logger.error(f"Database connection error: {str(e)}")
             raise
         
+        self._ensure_indexes()
+        
+        # Shared between worker threads in collect_all
+        self.rate_limiter = HostRateLimiter(COLLECTION_HOST_INTERVAL_SECONDS)
+        # Keep-alive connections reused across sources and cycles
+        self.http = get_http_client()
+        self.source_timings = {}
+        
+        # Near-duplicate articles (syndicated copies, light rewrites) share a story cluster
+        self.minhasher = MinHasher(STORY_MINHASH_PERMUTATIONS, STORY_LSH_BANDS, STORY_SHINGLE_WORDS)
+        self.story_index = LSHIndex(STORY_SIMILARITY_THRESHOLD)
+        
+        # Canonical URLs of every stored article, checked before any database lookup;
+        # hits are confirmed in the database, counted per cycle
+        self.url_filter = None
+        self.url_filter_stats = {'hits': 0, 'confirmed': 0, 'false_positives': 0, 'lookups_skipped': 0}
+        self._url_filter_stats_lock = threading.Lock()
+        if URL_FILTER_ENABLED:
+            self._ensure_url_filter()
+        
+        # Conditional GET state per source: saved validators and the ones
+        # fetched this cycle, which are committed once the articles are stored
+        self.feed_cache = {}
+        self.pending_feed_cache = {}
+        
         # Configure news sources with updated URLs
         self.sources = {
             # The Guardian API
@@ -61,11 +141,13 @@ class NewsCollector:
             # NewsData.io API
             'newsdata': {
                 'type': 'custom',
+                'url': 'https://newsdata.io/api/1/news',
                 'processor': '_collect_from_newsdata'
             },
             # TheNewsAPI
             'thenewsapi': {
                 'type': 'custom',
+                'url': 'https://api.thenewsapi.com/v1/news/all',
                 'processor': '_collect_from_thenewsapi'
             },
             # Updated and expanded RSS feeds
@@ -151,62 +233,70 @@ class NewsCollector:
             'electoral commission', 'oversight body', 'inspector general',
             'term limits', 'civil service', 'bureaucracy', 'career official'
         ]
+        
+        # Keywords marking an article as US-related
+        self.us_keywords = [
+            "united states", "u.s.", "us ", "usa", "american", 
+            "biden", "trump", "congress", "white house", "washington",
+            "supreme court", "federal", "pentagon", "democrats", "republicans"
+        ]
+        
+        # Both relevance lists compiled once, evaluated in a single scan per article
+        self.relevance_matcher = KeywordMatcher({
+            'us': self.us_keywords,
+            'political': self.political_keywords
+        })
     
-    def collect_all(self):
-        """Collect news from all configured sources"""
+    def collect_all(self, max_workers=None):
+        """
+        Collect news from all configured sources.
+        
+        Sources are fetched concurrently by a bounded worker pool so a cycle
+        takes about as long as the slowest feed. Requests to the same host are
+        spaced by a per-host rate limit. Pass max_workers=1 to collect
+        sequentially.
+        """
         new_articles_count = 0
-        logger.info("Starting news collection cycle")
+        max_workers = max_workers or COLLECTION_MAX_WORKERS
+        logger.info(f"Starting news collection cycle ({max_workers} workers)")
+        cycle_start = time.monotonic()
         
         # For testing, try using a dummy article if no real ones are found
         added_dummy = False
         
-        for source_name, config in self.sources.items():
-            try:
-                logger.info(f"Collecting from {source_name}")
-                
-                if config['type'] == 'api':
-                    articles = self._collect_from_api(source_name, config)
-                elif config['type'] == 'rss':
-                    articles = self._collect_from_rss(source_name, config)
-                elif config['type'] == 'custom':
-                    # Call the custom processor method
-                    processor_method = getattr(self, config['processor'], None)
-                    if processor_method and callable(processor_method):
-                        articles = processor_method()
-                    else:
-                        logger.warning(f"Unknown processor method for {source_name}")
-                        continue
-                else:
-                    logger.warning(f"Unknown source type for {source_name}")
-                    continue
-                
-                # Add debugging info
-                logger.info(f"Initial collection from {source_name}: {len(articles)} articles")
-                
-                # MODIFY THIS SECTION to add US filtering:
-                logger.info(f"Initial collection from {source_name}: {len(articles)} articles")
-
-                # First filter to only US content
-                articles = self._filter_us_content(articles) 
-                logger.info(f"After US filtering from {source_name}: {len(articles)} articles")
-                # Filter for political content
-                filtered_articles = self._filter_political_content(articles)
-                
-                logger.info(f"After filtering from {source_name}: {len(filtered_articles)} articles")
-                
-                # Store articles in database
-                try:
-                    new_count = self._store_articles(filtered_articles)
-                    new_articles_count += new_count
-                    logger.info(f"Stored {new_count} new articles from {source_name}")
-                except Exception as e:
-                    logger.error(f"Error storing articles from {source_name}: {str(e)}")
-                
-                # Sleep between API calls to avoid rate limiting
-                time.sleep(2)
-                
-            except Exception as e:
-                logger.error(f"Error collecting from {source_name}: {str(e)}")
+        # Wall time per source for this cycle, in seconds
+        self.source_timings = {}
+        self.url_filter_stats = dict.fromkeys(self.url_filter_stats, 0)
+        self._load_feed_cache()
+        
+        # Articles from earlier cycles are matched through their stored band keys
+        self.story_index = LSHIndex(STORY_SIMILARITY_THRESHOLD)
+        
+        if max_workers <= 1:
+            for source_name, config in self.sources.items():
+                new_articles_count += self._collect_source(source_name, config)
+        else:
+            with ThreadPoolExecutor(max_workers=max_workers) as executor:
+                futures = {
+                    executor.submit(self._collect_source, source_name, config): source_name
+                    for source_name, config in self.sources.items()
+                }
+                for future in as_completed(futures):
+                    try:
+                        new_articles_count += future.result()
+                    except Exception as e:
+                        logger.error(f"Error collecting from {futures[future]}: {str(e)}")
+        
+        cycle_time = time.monotonic() - cycle_start
+        for source_name, elapsed in sorted(self.source_timings.items(), key=lambda item: item[1], reverse=True):
+            logger.info(f"Source timing - {source_name}: {elapsed:.2f}s")
+        logger.info(f"Collected from {len(self.sources)} sources in {cycle_time:.2f}s")
+        logger.info(f"HTTP connections: {self.http.stats()}")
+        
+        if self.url_filter is not None:
+            self.url_filter.save(self.url_filter_collection, URL_FILTER_ID)
+            logger.info(f"Seen-URL filter: {len(self.url_filter)} URLs, estimated false-positive rate {self.url_filter.estimated_error_rate():.6f}")
+            logger.info(f"Seen-URL filter checks: {self.url_filter_stats}")
         
         # If no articles were collected, add a dummy article for testing
         if new_articles_count == 0 and not added_dummy:
@@ -230,6 +320,157 @@ class NewsCollector:
         logger.info(f"Collection cycle complete. Total new articles: {new_articles_count}")
         return new_articles_count
     
+    def _collect_source(self, source_name, config):
+        """Collect, filter and store articles from a single source, returning the new article count"""
+        # Respect the per-host rate limit before hitting the source
+        self.rate_limiter.wait(self._source_host(source_name, config))
+        source_start = time.monotonic()
+        new_count = 0
+        
+        try:
+            logger.info(f"Collecting from {source_name}")
+            
+            if config['type'] == 'api':
+                articles = self._collect_from_api(source_name, config)
+            elif config['type'] == 'rss':
+                articles = self._collect_from_rss(source_name, config)
+            elif config['type'] == 'custom':
+                # Call the custom processor method
+                processor_method = getattr(self, config['processor'], None)
+                if processor_method and callable(processor_method):
+                    articles = processor_method()
+                else:
+                    logger.warning(f"Unknown processor method for {source_name}")
+                    return 0
+            else:
+                logger.warning(f"Unknown source type for {source_name}")
+                return 0
+            
+            # Nothing to parse, filter or store if the source has not changed
+            if articles is None:
+                logger.info(f"Source {source_name} unchanged since last cycle, skipping")
+                return 0
+            
+            logger.info(f"Initial collection from {source_name}: {len(articles)} articles")
+            
+            # Filter to US political content in one pass over each article
+            filtered_articles = self._filter_relevant_content(articles)
+            
+            logger.info(f"After filtering from {source_name}: {len(filtered_articles)} articles")
+            
+            # Store articles in database
+            try:
+                new_count = self._store_articles(filtered_articles)
+                logger.info(f"Stored {new_count} new articles from {source_name}")
+                self._commit_feed_cache(source_name)
+            except Exception as e:
+                logger.error(f"Error storing articles from {source_name}: {str(e)}")
+            
+        except Exception as e:
+            logger.error(f"Error collecting from {source_name}: {str(e)}")
+        finally:
+            self.source_timings[source_name] = time.monotonic() - source_start
+        
+        return new_count
+    
+    def _source_host(self, source_name, config):
+        """Get the host a source is fetched from, used as the rate limiting key"""
+        host = urlparse(config.get('url', '')).netloc
+        return host or source_name
+    
+    def _ensure_indexes(self):
+        """Create the unique url index used for de-duplicating inserts and the LSH band index"""
+        try:
+            self.articles_collection.create_index(
+                [('url', pymongo.ASCENDING)],
+                unique=True,
+                name='url_unique'
+            )
+        except Exception as e:
+            # Typically existing duplicate URLs; the $in lookup still de-duplicates
+            logger.warning(f"Could not create unique url index: {str(e)}")
+        
+        try:
+            # Sparse: articles stored before canonicalization have no canonical_url
+            # until rebuild_url_filter backfills it
+            self.articles_collection.create_index(
+                [('canonical_url', pymongo.ASCENDING)],
+                unique=True,
+                sparse=True,
+                name='canonical_url_unique'
+            )
+        except Exception as e:
+            logger.warning(f"Could not create unique canonical_url index: {str(e)}")
+        
+        if STORY_CLUSTERING_ENABLED:
+            try:
+                # Multikey index: finds stored articles sharing any band key with a new one
+                self.articles_collection.create_index([('lsh_bands', pymongo.ASCENDING)], name='lsh_bands')
+            except Exception as e:
+                logger.warning(f"Could not create LSH band index: {str(e)}")
+    
+    def _load_feed_cache(self):
+        """Load the saved conditional GET validators for all sources"""
+        self.pending_feed_cache = {}
+        try:
+            self.feed_cache = {doc['_id']: doc for doc in self.feed_cache_collection.find()}
+        except Exception as e:
+            logger.error(f"Error loading feed cache: {str(e)}")
+            self.feed_cache = {}
+    
+    def _conditional_get(self, source_name, url, params=None, headers=None, timeout=10):
+        """
+        GET a source URL, sending the ETag and Last-Modified saved for it.
+        
+        Returns None when the source has not changed since the last cycle,
+        either because the server answered 304 or because the body hashes
+        to the same value as last time. Otherwise returns the response.
+        """
+        cached = self.feed_cache.get(source_name, {})
+        headers = dict(headers or {})
+        if cached.get('etag'):
+            headers['If-None-Match'] = cached['etag']
+        if cached.get('last_modified'):
+            headers['If-Modified-Since'] = cached['last_modified']
+        
+        response = self.http.get(url, params=params, headers=headers, timeout=timeout)
+        
+        if response.status_code == 304:
+            logger.info(f"Source {source_name} returned 304 Not Modified")
+            return None
+        
+        if response.status_code != 200:
+            return response
+        
+        body_hash = hashlib.sha256(response.content).hexdigest()
+        if body_hash == cached.get('body_hash'):
+            logger.info(f"Source {source_name} body unchanged (hash {body_hash[:12]})")
+            return None
+        
+        self.pending_feed_cache[source_name] = {
+            'etag': response.headers.get('ETag'),
+            'last_modified': response.headers.get('Last-Modified'),
+            'body_hash': body_hash,
+            'updated_at': datetime.datetime.now().isoformat()
+        }
+        return response
+    
+    def _commit_feed_cache(self, source_name):
+        """Persist the validators fetched this cycle once the source's articles are stored"""
+        entry = self.pending_feed_cache.pop(source_name, None)
+        if not entry:
+            return
+        
+        try:
+            self.feed_cache_collection.update_one(
+                {'_id': source_name},
+                {'$set': entry},
+                upsert=True
+            )
+            self.feed_cache[source_name] = entry
+        except Exception as e:
+            logger.error(f"Error saving feed cache for {source_name}: {str(e)}")
+    
     def _collect_from_api(self, source_name, config):
         """Collect news from an API source"""
         articles = []
@@ -243,13 +484,17 @@ class NewsCollector:
                 'User-Agent': 'Political Risk Monitor/1.0'
             }
             
-            response = requests.get(
+            response = self._conditional_get(
+                source_name,
                 config['url'], 
                 params=config['params'],
                 headers=headers,
                 timeout=10  # Add timeout
             )
             
+            if response is None:
+                return None
+            
             # Log response status
             logger.info(f"Response from {source_name}: Status {response.status_code}")
             
@@ -321,8 +566,19 @@ class NewsCollector:
             logger.info(f"Fetching RSS feed from {config['url']}")
             
             # Add user agent to avoid some feed blocks
-            user_agent = 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
-            feed = feedparser.parse(config['url'], agent=user_agent)
+            headers = {
+                'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
+            }
+            response = self._conditional_get(source_name, config['url'], headers=headers, timeout=15)
+            
+            if response is None:
+                return None
+            
+            if response.status_code != 200:
+                logger.error(f"RSS error {response.status_code} from {source_name}")
+                return articles
+            
+            feed = feedparser.parse(response.content, response_headers=response.headers)
             
             # Log feed info
             logger.info(f"Feed info - version: {feed.get('version', 'unknown')}, " 
@@ -392,7 +648,7 @@ class NewsCollector:
         
         try:
             # Base URL for NewsData API
-            base_url = 'https://newsdata.io/api/1/news'
+            base_url = self.sources['newsdata']['url']
             
             # Parameters for the API request
             params = {
@@ -407,7 +663,10 @@ class NewsCollector:
             logger.info(f"Making request to NewsData.io API with params: {params}")
             
             # Make the request
-            response = requests.get(base_url, params=params, timeout=10)
+            response = self._conditional_get('newsdata', base_url, params=params, timeout=10)
+            
+            if response is None:
+                return None
             
             # Check if the request was successful
             if response.status_code == 200:
@@ -447,7 +706,7 @@ class NewsCollector:
         
         try:
             # Base URL for The News API
-            base_url = 'https://api.thenewsapi.com/v1/news/all'
+            base_url = self.sources['thenewsapi']['url']
             
             # Parameters for the API request
             params = {
@@ -461,7 +720,10 @@ class NewsCollector:
             logger.info(f"Making request to TheNewsAPI with params: {params}")
             
             # Make the request
-            response = requests.get(base_url, params=params, timeout=10)
+            response = self._conditional_get('thenewsapi', base_url, params=params, timeout=10)
+            
+            if response is None:
+                return None
             
             # Check if the request was successful
             if response.status_code == 200:
@@ -494,22 +756,34 @@ class NewsCollector:
             logger.error(f"Exception in TheNewsAPI collection: {str(e)}")
         
         return articles
-    def _filter_us_content(self, articles):
-        """Filter articles to only include US-related content"""
-        filtered = []
-        us_keywords = [
-            "united states", "u.s.", "us ", "usa", "american", 
-            "biden", "trump", "congress", "white house", "washington",
-            "supreme court", "federal", "pentagon", "democrats", "republicans"
-        ]
+    def _article_text(self, article):
+        """Combine title and content for keyword search"""
+        return f"{article.get('title', '')} {article.get('content', '')}"
     
+    def _filter_relevant_content(self, articles):
+        """
+        Filter articles to US-related political content, checking both
+        keyword lists in a single scan of each article's text
+        """
+        filtered = []
+        us_count = 0
+        
         for article in articles:
-            # Combine title and content for keyword search
-            text = f"{article.get('title', '')} {article.get('content', '')}".lower()
+            matched = self.relevance_matcher.matched_labels(self._article_text(article))
+            if 'us' in matched:
+                us_count += 1
+                if 'political' in matched:
+                    filtered.append(article)
         
-            # Check if any US keywords are present
-            if any(us_keyword in text for us_keyword in us_keywords):
-                filtered.append(article)
+        logger.info(f"Filtered {len(articles) - us_count} non-US articles")
+        logger.info(f"Filtered {len(filtered)}/{us_count} articles as politically relevant")
+        return filtered
+    def _filter_us_content(self, articles):
+        """Filter articles to only include US-related content"""
+        filtered = [
+            article for article in articles
+            if 'us' in self.relevance_matcher.matched_labels(self._article_text(article))
+        ]
     
         logger.info(f"Filtered {len(articles) - len(filtered)} non-US articles")
         return filtered
@@ -518,47 +792,245 @@ class NewsCollector:
         Enhanced filter to identify political content with specific focus on 
         indicators relevant to the Despotism Readiness Framework
         """
-        filtered = []
-        total_count = len(articles)
-        filtered_count = 0
-        
-        for article in articles:
-            # Combine title and content for keyword search
-            text = f"{article['title']} {article.get('content', '')}".lower()
-            
-            # Check if any political keywords are present
-            if any(keyword.lower() in text for keyword in self.political_keywords):
-                filtered.append(article)
-                filtered_count += 1
+        filtered = [
+            article for article in articles
+            if 'political' in self.relevance_matcher.matched_labels(self._article_text(article))
+        ]
         
-        logger.info(f"Filtered {filtered_count}/{total_count} articles as politically relevant")
+        logger.info(f"Filtered {len(filtered)}/{len(articles)} articles as politically relevant")
         return filtered
     def _store_articles(self, articles):
-        """Store articles in the database, avoiding duplicates"""
-        new_count = 0
-    
+        """
+        Store articles in the database, avoiding duplicates.
+        
+        Articles are de-duplicated by canonical URL, so tracking parameters,
+        AMP and mobile variants and http/https differences of one article
+        count as the same article. URLs the seen-URL filter has never had are
+        new without a database lookup. Filter hits may be false positives, so
+        they are confirmed with a single $in query, and the new articles are
+        written with one unordered insert_many. Duplicate key errors from the
+        unique url indexes (e.g. another collector inserting the same article
+        concurrently) are counted as duplicates.
+        """
+        # Ensure URL is present and drop repeats within the batch
+        batch = {}
         for article in articles:
-            # Ensure URL is present
             if not article.get('url'):
                 logger.warning(f"Skipping article without URL: {article.get('title', 'No title')}")
                 continue
-            
+            article['canonical_url'] = canonicalize_url(article['url'])
+            batch.setdefault(article['canonical_url'], article)
+        
+        if not batch:
+            return 0
+        
+        # Only URLs the filter has seen can already be stored
+        if self.url_filter is not None:
+            lookup = [url for url in batch if url in self.url_filter]
+        else:
+            lookup = list(batch)
+        
+        # Check which of them exist in one round trip
+        existing_urls = set()
+        if lookup:
+            for doc in self.articles_collection.find({'canonical_url': {'$in': lookup}}, {'canonical_url': 1, '_id': 0}):
+                existing_urls.add(doc['canonical_url'])
+        
+        if self.url_filter is not None:
+            confirmed = len(existing_urls.intersection(lookup))
+            with self._url_filter_stats_lock:
+                self.url_filter_stats['hits'] += len(lookup)
+                self.url_filter_stats['confirmed'] += confirmed
+                self.url_filter_stats['false_positives'] += len(lookup) - confirmed
+                self.url_filter_stats['lookups_skipped'] += len(batch) - len(lookup)
+            if len(lookup) > confirmed:
+                logger.info(f"Seen-URL filter: {len(lookup) - confirmed} of {len(lookup)} hits were false positives")
+        
+        new_articles = []
+        for url, article in batch.items():
+            if url not in existing_urls:
+                # Add 'analyzed' flag set to False for new articles
+                article['analyzed'] = False
+                new_articles.append(article)
+        
+        duplicate_count = len(articles) - len(new_articles)
+        new_count = 0
+        failed = set()
+        rejected = set()
+        
+        if new_articles and STORY_CLUSTERING_ENABLED:
             try:
-                # Check if article already exists (by URL)
-                existing = self.articles_collection.find_one({'url': article['url']})
-            
-                if not existing:
-                    # Add 'analyzed' flag set to False for new articles
-                    article['analyzed'] = False
+                self._assign_story_clusters(new_articles)
+            except Exception as e:
+                # Unclustered articles are still analyzed, just each on its own
+                logger.error(f"Error clustering articles: {str(e)}")
+        
+        if new_articles:
+            try:
+                result = self.articles_collection.insert_many(new_articles, ordered=False)
+                new_count = len(result.inserted_ids)
+            except BulkWriteError as e:
+                details = e.details or {}
+                new_count = details.get('nInserted', 0)
+                write_errors = details.get('writeErrors', [])
+                duplicate_errors = [err for err in write_errors if err.get('code') == 11000]
+                duplicate_count += len(duplicate_errors)
+                rejected = {err.get('index') for err in write_errors}
                 
-                    # Insert the article
-                    result = self.articles_collection.insert_one(article)
-                    logger.info(f"Inserted article with ID: {result.inserted_id}")
-                    new_count += 1
+                for err in write_errors:
+                    if err.get('code') != 11000:
+                        failed.add(err.get('index'))
+                        logger.error(f"Error storing article: {err.get('errmsg', 'unknown error')}")
+            except Exception:
+                # Nothing was stored, so no new article may represent a story
+                self._unindex_stories(new_articles)
+                raise
+        
+        # Articles that were not stored must not stay in the story index
+        self._unindex_stories(new_articles[index] for index in rejected if index is not None)
+        
+        # Remember every stored URL; articles that failed to store are retried next cycle
+        if self.url_filter is not None:
+            for url in existing_urls:
+                self.url_filter.add(url)
+            for index, article in enumerate(new_articles):
+                if index not in failed:
+                    self.url_filter.add(article['canonical_url'])
+        
+        logger.info(f"Bulk stored {new_count} new articles ({duplicate_count} duplicates or skipped)")
+        return new_count
+    
+    def _assign_story_clusters(self, articles):
+        """
+        Give new articles a MinHash signature, LSH band keys and a story cluster.
+        
+        Stored articles from the last STORY_CLUSTER_WINDOW_HOURS that share a
+        band key with any of the new ones are loaded into the LSH index in one
+        query; articles from other sources in the same cycle are already in
+        it. Each article then joins the cluster of its closest match, or
+        starts a new cluster as its primary article. The analyzer sends only
+        one article per cluster to Claude.
+        """
+        signed = []
+        for article in articles:
+            signature = self.minhasher.signature(self._article_text(article))
+            if signature is None:
+                continue
+            article['minhash'] = signature
+            article['lsh_bands'] = self.minhasher.band_keys(signature)
+            signed.append(article)
+        
+        if not signed:
+            return
+        
+        cutoff = (datetime.datetime.now() - datetime.timedelta(hours=STORY_CLUSTER_WINDOW_HOURS)).isoformat()
+        band_keys = sorted({band_key for article in signed for band_key in article['lsh_bands']})
+        stored_matches = self.articles_collection.find(
+            {'lsh_bands': {'$in': band_keys}, 'collected_at': {'$gte': cutoff}, 'cluster_id': {'$exists': True}},
+            {'url': 1, 'minhash': 1, 'lsh_bands': 1, 'cluster_id': 1, '_id': 0}
+        )
+        for match in stored_matches:
+            if match['url'] not in self.story_index:
+                self.story_index.add(match['url'], match['minhash'], match['lsh_bands'], match['cluster_id'])
+        
+        joined = 0
+        for article in signed:
+            new_cluster_id = hashlib.sha1(article['url'].encode('utf-8')).hexdigest()[:16]
+            cluster_id, primary, similarity = self.story_index.assign(
+                article['url'], article['minhash'], article['lsh_bands'], new_cluster_id
+            )
+            article['cluster_id'] = cluster_id
+            article['cluster_primary'] = primary
+            if not primary:
+                joined += 1
+                logger.debug(f"Article '{article.get('title', 'No title')}' joins story cluster {cluster_id} (similarity {similarity:.2f})")
+        
+        logger.info(f"Story clustering: {joined}/{len(signed)} new articles joined an existing story")
+    
+    def _unindex_stories(self, articles):
+        """Drop articles from the story index, e.g. after their insert failed"""
+        for article in articles:
+            if 'cluster_id' in article:
+                self.story_index.remove(article['url'])
+    
+    def _ensure_url_filter(self):
+        """Load the seen-URL filter, building it from the stored articles if it has never been built"""
+        try:
+            built = self.url_filter_collection.count_documents({'_id': URL_FILTER_ID}, limit=1) > 0
+        except Exception as e:
+            logger.warning(f"Could not check for a saved seen-URL filter: {str(e)}")
+            built = True
+        
+        if not built:
+            logger.info("Seen-URL filter has not been built yet. Building from stored articles...")
+            try:
+                self.rebuild_url_filter()
+                return
             except Exception as e:
-                logger.error(f"Error storing article {article.get('title', 'unknown')}: {str(e)}")
+                logger.error(f"Error building seen-URL filter: {str(e)}")
+        
+        self.url_filter = BloomFilter.load(self.url_filter_collection, URL_FILTER_ID, URL_FILTER_CAPACITY, URL_FILTER_ERROR_RATE)
     
-        return new_count
+    def rebuild_url_filter(self, capacity=None, error_rate=None):
+        """
+        Rebuild the seen-URL filter from the articles collection, replacing
+        the saved filter. Needed after changing URL_FILTER_CAPACITY or
+        URL_FILTER_ERROR_RATE, when the filter has grown past its capacity,
+        or after articles were deleted. Running collectors reload the new
+        filter at their next save instead of overwriting it.
+        
+        Articles stored before URLs were canonicalized get their
+        canonical_url on the way, so copies of them are recognized as
+        duplicates. The filter is first built by the first collector run after
+        an upgrade, so existing articles are backfilled then.
+        
+        Args:
+            capacity (int, optional): URLs the new filter holds at its error rate
+                (default: URL_FILTER_CAPACITY or twice the stored articles, whichever is larger)
+            error_rate (float, optional): Target false-positive rate (default: URL_FILTER_ERROR_RATE)
+        
+        Returns:
+            BloomFilter: The new filter
+        """
+        article_count = self.articles_collection.count_documents({})
+        capacity = capacity or max(URL_FILTER_CAPACITY, 2 * article_count)
+        url_filter = BloomFilter(capacity, error_rate or URL_FILTER_ERROR_RATE)
+        
+        backfill = []
+        backfilled = 0
+        for doc in self.articles_collection.find({}, {'url': 1, 'canonical_url': 1}):
+            url = doc.get('canonical_url')
+            if not url:
+                url = canonicalize_url(doc.get('url'))
+                if url:
+                    backfill.append(UpdateOne({'_id': doc['_id']}, {'$set': {'canonical_url': url}}))
+            if url:
+                url_filter.add(url)
+            if len(backfill) >= CANONICAL_URL_BACKFILL_BATCH:
+                backfilled += self._write_canonical_urls(backfill)
+                backfill = []
+        if backfill:
+            backfilled += self._write_canonical_urls(backfill)
+        if backfilled:
+            logger.info(f"Backfilled canonical_url on {backfilled} articles stored before URLs were canonicalized")
+        
+        url_filter.save(self.url_filter_collection, URL_FILTER_ID, merge=False)
+        self.url_filter = url_filter
+        logger.info(f"Rebuilt seen-URL filter (generation {url_filter.generation}) from {article_count} articles: {len(url_filter)} URLs, "
+                    f"{len(url_filter.bits)} bytes, capacity {url_filter.capacity}, error rate {url_filter.error_rate}")
+        return url_filter
+    
+    def _write_canonical_urls(self, updates):
+        """Write a batch of canonical_url backfill updates, returning how many articles were updated"""
+        try:
+            return self.articles_collection.bulk_write(updates, ordered=False).modified_count
+        except BulkWriteError as e:
+            # Older copies of one article share a canonical URL; only the first gets it
+            details = e.details or {}
+            duplicates = sum(1 for err in details.get('writeErrors', []) if err.get('code') == 11000)
+            if duplicates:
+                logger.info(f"Left {duplicates} older copies of stored articles without a canonical_url")
+            return details.get('nModified', 0)
     # Find this existing method in collector.py
 def _filter_political_content(self, articles):
     """Filter articles to only include political content relevant to the framework"""
@@ -0,0 +1,110 @@
+"""
+Context module - Markup stripping and keyword-window extraction for Claude prompts
+"""
+
+import re
+import html
+import logging
+
+logger = logging.getLogger('context')
+
+_SCRIPT_STYLE = re.compile(r'<(script|style)\b[^>]*>.*?</\1\s*>', re.IGNORECASE | re.DOTALL)
+_BLOCK_TAG = re.compile(r'<\s*/?\s*(br|p|div|li|ul|ol|tr|h[1-6]|blockquote|section|article)\b[^>]*>', re.IGNORECASE)
+_TAG = re.compile(r'<[^>]+>')
+_SPACES = re.compile(r'[^\S\n]+')
+
+# Marks text left out between two windows
+GAP_MARKER = ' [...] '
+
+def strip_markup(text):
+    """
+    Convert HTML article text (as found in RSS content) to plain text.
+
+    Scripts and styles are dropped, block-level tags become line breaks,
+    other tags are removed and entities are decoded.
+    """
+    if not text:
+        return ''
+    text = _SCRIPT_STYLE.sub(' ', text)
+    text = _BLOCK_TAG.sub('\n', text)
+    text = _TAG.sub(' ', text)
+    text = html.unescape(text)
+
+    lines = (_SPACES.sub(' ', line).strip() for line in text.split('\n'))
+    return '\n'.join(line for line in lines if line)
+
+def _snap(text, start, end):
+    """Widen a span to whole words"""
+    while start > 0 and not text[start - 1].isspace():
+        start -= 1
+    while end < len(text) and not text[end].isspace():
+        end += 1
+    return start, end
+
+def keyword_windows(text, spans, window_chars):
+    """
+    Cut text down to the windows around keyword spans.
+
+    Each (start, end) span is widened by `window_chars` on both sides and to
+    whole words; overlapping windows are merged and the gaps between them
+    are marked with GAP_MARKER.
+
+    Returns:
+        str: The windows, in text order
+    """
+    windows = []
+    for start, end in sorted(spans):
+        start, end = _snap(text, max(0, start - window_chars), min(len(text), end + window_chars))
+        if windows and start <= windows[-1][1]:
+            windows[-1][1] = max(windows[-1][1], end)
+        else:
+            windows.append([start, end])
+
+    parts = [text[start:end].strip() for start, end in windows]
+    context = GAP_MARKER.join(parts)
+    if windows and windows[0][0] > 0:
+        context = GAP_MARKER.lstrip() + context
+    if windows and windows[-1][1] < len(text):
+        context += GAP_MARKER.rstrip()
+    return context
+
+def extract_context(content, category_index, categories=None, window_chars=400, max_chars=10000):
+    """
+    Get the part of an article worth sending to Claude.
+
+    The markup is stripped, the category index is run over the plain text
+    and only the windows around hits for `categories` are kept. Without
+    hits (or with `window_chars` unset) the whole plain text is used.
+    Either way the result is cut to `max_chars`.
+
+    Args:
+        content (str): Article content, possibly HTML
+        category_index (CategoryIndex): Compiled framework index
+        categories (iterable, optional): Categories whose hits count (default: all)
+        window_chars (int): Characters kept on each side of a hit
+        max_chars (int): Longest context returned
+
+    Returns:
+        tuple: (context text, True if it was cut down to keyword windows)
+    """
+    text = strip_markup(content)
+    context = text
+    trimmed = False
+
+    if window_chars and text:
+        wanted = set(categories) if categories is not None else None
+        spans = [
+            (hit['position'], hit['position'] + len(hit['keyword']))
+            for hit in category_index.find_hits(text)
+            if wanted is None or hit['category'] in wanted
+        ]
+        if spans:
+            windows = keyword_windows(text, spans, window_chars)
+            if len(windows) < len(text):
+                context = windows
+                trimmed = True
+
+    if max_chars and len(context) > max_chars:
+        context = context[:max_chars] + "... (truncated)"
+
+    return context, trimmed
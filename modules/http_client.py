@@ -0,0 +1,163 @@
+"""
+HTTP client module - Shared keep-alive session with per-host connection pools
+"""
+
+import time
+import logging
+import threading
+from urllib.parse import urlparse
+
+import requests
+from requests.adapters import HTTPAdapter
+
+try:
+    from config import (
+        HTTP_POOL_SIZES,
+        HTTP_DEFAULT_POOL_SIZE,
+        HTTP_CONNECT_TIMEOUT_SECONDS,
+        HTTP_READ_TIMEOUT_SECONDS,
+        HTTP_USER_AGENT
+    )
+except ImportError:
+    HTTP_POOL_SIZES = {}
+    HTTP_DEFAULT_POOL_SIZE = 4
+    HTTP_CONNECT_TIMEOUT_SECONDS = 5
+    HTTP_READ_TIMEOUT_SECONDS = 30
+    HTTP_USER_AGENT = 'Political Risk Monitor/1.0'
+
+logger = logging.getLogger('http_client')
+
+class PooledHTTPClient:
+    """
+    A requests.Session shared by every part of the process that makes HTTP
+    calls, so connections (and their TLS sessions) are kept alive and reused
+    instead of being set up again for every request.
+
+    Each host listed in `pool_sizes` gets a connection pool of its own size;
+    other hosts share the default size. Responses are requested gzip
+    compressed and every request gets a (connect, read) timeout unless the
+    caller passes one.
+
+    Safe to share between threads: the session holds no per-request state
+    beyond its pools, which urllib3 locks.
+    """
+
+    def __init__(self, pool_sizes=None, default_pool_size=4, connect_timeout=5, read_timeout=30, user_agent=None):
+        """
+        Args:
+            pool_sizes (dict): Host -> connections kept open to that host
+            default_pool_size (int): Connections kept open to any other host
+            connect_timeout (float): Default seconds to wait for a connection
+            read_timeout (float): Default seconds to wait for response data
+            user_agent (str, optional): User-Agent header sent with every request
+        """
+        self.timeout = (connect_timeout, read_timeout)
+        self.pool_sizes = dict(pool_sizes or {})
+        self._lock = threading.Lock()
+
+        self.session = requests.Session()
+        self.session.headers['Accept-Encoding'] = 'gzip, deflate'
+        if user_agent:
+            self.session.headers['User-Agent'] = user_agent
+
+        self._adapters = {}
+        default_adapter = HTTPAdapter(pool_connections=16, pool_maxsize=default_pool_size)
+        self._mount('http://', default_adapter)
+        self._mount('https://', default_adapter)
+        for host, size in self.pool_sizes.items():
+            # The session uses the adapter with the longest matching prefix
+            adapter = HTTPAdapter(pool_connections=1, pool_maxsize=size)
+            self._mount(f'https://{host}', adapter)
+            self._mount(f'http://{host}', adapter)
+
+        # Counters for reporting, per host
+        self.host_requests = {}
+        self.host_seconds = {}
+        self.host_errors = {}
+
+    def _mount(self, prefix, adapter):
+        self.session.mount(prefix, adapter)
+        self._adapters[prefix] = adapter
+
+    def request(self, method, url, timeout=None, **kwargs):
+        """
+        Send a request through the shared session.
+
+        Takes the same arguments as requests.request; `timeout` defaults to
+        the client's (connect, read) timeout.
+        """
+        host = urlparse(url).hostname or url
+        start = time.monotonic()
+        try:
+            return self.session.request(method, url, timeout=timeout or self.timeout, **kwargs)
+        except requests.exceptions.RequestException:
+            with self._lock:
+                self.host_errors[host] = self.host_errors.get(host, 0) + 1
+            raise
+        finally:
+            with self._lock:
+                self.host_requests[host] = self.host_requests.get(host, 0) + 1
+                self.host_seconds[host] = self.host_seconds.get(host, 0.0) + time.monotonic() - start
+
+    def get(self, url, **kwargs):
+        """Send a GET request"""
+        return self.request('GET', url, **kwargs)
+
+    def post(self, url, **kwargs):
+        """Send a POST request"""
+        return self.request('POST', url, **kwargs)
+
+    def _pool_counts(self):
+        """Get (connections opened, requests sent) per host from the urllib3 pools"""
+        counts = {}
+        for adapter in set(self._adapters.values()):
+            pools = adapter.poolmanager.pools
+            for key in list(pools.keys()):
+                pool = pools.get(key)
+                if pool is None:
+                    continue
+                opened, sent = counts.get(pool.host, (0, 0))
+                counts[pool.host] = (opened + pool.num_connections, sent + pool.num_requests)
+        return counts
+
+    def stats(self):
+        """Get request, latency and connection reuse counters per host"""
+        try:
+            pool_counts = self._pool_counts()
+        except Exception as e:
+            # Pool internals belong to urllib3; reuse numbers are best effort
+            logger.debug(f"Could not read connection pool counters: {str(e)}")
+            pool_counts = {}
+
+        hosts = {}
+        with self._lock:
+            for host, count in self.host_requests.items():
+                opened, sent = pool_counts.get(host, (0, 0))
+                hosts[host] = {
+                    'requests': count,
+                    'errors': self.host_errors.get(host, 0),
+                    'avg_seconds': round(self.host_seconds[host] / count, 3),
+                    'connections_opened': opened,
+                    'connection_reuse_ratio': round(1 - opened / sent, 3) if sent else 0.0
+                }
+        return hosts
+
+
+# One client per process, shared by the collector and the Claude clients
+_shared_client = None
+_shared_client_lock = threading.Lock()
+
+def get_http_client():
+    """Get the process-wide HTTP client, creating it from config on first use"""
+    global _shared_client
+    with _shared_client_lock:
+        if _shared_client is None:
+            _shared_client = PooledHTTPClient(
+                pool_sizes=HTTP_POOL_SIZES,
+                default_pool_size=HTTP_DEFAULT_POOL_SIZE,
+                connect_timeout=HTTP_CONNECT_TIMEOUT_SECONDS,
+                read_timeout=HTTP_READ_TIMEOUT_SECONDS,
+                user_agent=HTTP_USER_AGENT
+            )
+            logger.info(f"Created shared HTTP client with pools for {len(HTTP_POOL_SIZES)} hosts")
+    return _shared_client
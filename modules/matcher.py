@@ -0,0 +1,201 @@
+"""
+Matcher module - Precompiled multi-pattern keyword matching
+"""
+
+import re
+import json
+import logging
+import threading
+
+logger = logging.getLogger('matcher')
+
+class KeywordMatcher:
+    """
+    Matches several labelled keyword lists against a text in a single scan.
+
+    All keywords are compiled into one case-insensitive alternation regex
+    wrapped in a lookahead, so every position of the text is tried once and
+    the longest keyword starting there is reported. Keywords contained in a
+    longer keyword are resolved from a precomputed table, which gives the
+    same answers as running `keyword in text.lower()` for every keyword of
+    every list.
+
+    The text is matched as given rather than lowercased, because lower()
+    can change the length of a string ('İ' becomes two characters) and hit
+    positions must be valid offsets into the original text.
+    """
+
+    def __init__(self, groups):
+        """
+        Args:
+            groups (dict): Mapping of label -> iterable of keywords
+        """
+        self.labels = list(groups.keys())
+
+        # keyword -> labels of the lists it belongs to
+        self.keyword_labels = {}
+        for label, keywords in groups.items():
+            for keyword in keywords:
+                if not keyword:
+                    continue
+                self.keyword_labels.setdefault(keyword.lower(), set()).add(label)
+
+        # Longest first so the alternation reports the longest keyword at each position
+        keywords = sorted(self.keyword_labels, key=len, reverse=True)
+
+        # For every keyword, the keywords (itself included) found inside it and their offsets
+        self.contained = {}
+        for keyword in keywords:
+            self.contained[keyword] = [
+                (other, offset)
+                for other in keywords if len(other) <= len(keyword)
+                for offset in self._offsets(keyword, other)
+            ]
+
+        # Labels implied by a match of each keyword
+        self.implied_labels = {
+            keyword: frozenset(label for other, _ in contained for label in self.keyword_labels[other])
+            for keyword, contained in self.contained.items()
+        }
+
+        # One group per keyword: the group that matched identifies the keyword
+        # whatever the case of the matched text
+        self.keywords = keywords
+        if keywords:
+            alternation = '|'.join(f"({re.escape(keyword)})" for keyword in keywords)
+            self.pattern = re.compile(f"(?=(?:{alternation}))", re.IGNORECASE)
+        else:
+            self.pattern = None
+
+        logger.debug(f"Compiled matcher with {len(keywords)} keywords across {len(self.labels)} lists")
+
+    @staticmethod
+    def _offsets(text, keyword):
+        """Get every offset of keyword within text"""
+        offsets = []
+        start = text.find(keyword)
+        while start != -1:
+            offsets.append(start)
+            start = text.find(keyword, start + 1)
+        return offsets
+
+    def matched_labels(self, text):
+        """
+        Get the labels of every keyword list with at least one match in text.
+
+        Stops scanning as soon as every list has matched.
+        """
+        matched = set()
+        if self.pattern is None or not text:
+            return matched
+
+        for match in self.pattern.finditer(text):
+            matched.update(self.implied_labels[self.keywords[match.lastindex - 1]])
+            if len(matched) == len(self.labels):
+                break
+
+        return matched
+
+    def find_hits(self, text):
+        """
+        Get every keyword occurrence in text.
+
+        Returns:
+            list: (label, keyword, position) tuples ordered by position, where
+                  position is the offset of the keyword in text
+        """
+        hits = set()
+        if self.pattern is None or not text:
+            return []
+
+        for match in self.pattern.finditer(text):
+            start = match.start()
+            for keyword, offset in self.contained[self.keywords[match.lastindex - 1]]:
+                for label in self.keyword_labels[keyword]:
+                    hits.add((label, keyword, start + offset))
+
+        return sorted(hits, key=lambda hit: (hit[2], hit[1]))
+
+
+# Category tiers checked by the keyword analysis, with the severity each one
+# raises a category to and the match count it contributes
+CATEGORY_TIERS = (
+    ('keywords', 'yellow', 1),
+    ('orange_indicators', 'orange', 2),
+    ('red_indicators', 'red', 3)
+)
+
+class CategoryIndex:
+    """
+    Compiled index of the whole category framework.
+
+    Every keyword and indicator of every category is matched in one scan of
+    the article text, and each hit is mapped back to its category, tier and
+    position.
+    """
+
+    def __init__(self, categories):
+        groups = {}
+        for category_id, category_data in categories.items():
+            if not isinstance(category_data, dict):
+                logger.warning(f"Skipping category '{category_id}': Invalid data format in CATEGORIES config.")
+                continue
+            for tier, _, _ in CATEGORY_TIERS:
+                groups[(category_id, tier)] = category_data.get(tier, []) or []
+
+        self.category_ids = list(categories.keys())
+        self.matcher = KeywordMatcher(groups)
+
+    def find_hits(self, text):
+        """
+        Get every framework keyword occurrence in text.
+
+        Returns:
+            list: Dicts with category, tier, keyword and position, ordered by position
+        """
+        return [
+            {'category': category_id, 'tier': tier, 'keyword': keyword, 'position': position}
+            for (category_id, tier), keyword, position in self.matcher.find_hits(text)
+        ]
+
+    def classify(self, hits):
+        """
+        Derive per-category severities from hits.
+
+        A category is yellow when a base keyword matched, orange when it is
+        yellow and an orange indicator matched, and red when it is orange and
+        a red indicator matched.
+
+        Returns:
+            tuple: (dict of category_id -> severity, total match count)
+        """
+        matched_tiers = {(hit['category'], hit['tier']) for hit in hits}
+        severities = {}
+        match_count = 0
+
+        for category_id in self.category_ids:
+            severity = 'green'
+            for tier, tier_severity, tier_count in CATEGORY_TIERS:
+                if (category_id, tier) not in matched_tiers:
+                    break
+                severity = tier_severity
+                match_count += tier_count
+            severities[category_id] = severity
+
+        return severities, match_count
+
+
+# Compiled indexes shared across analyzer instances, keyed by framework content
+_category_index_cache = {}
+_category_index_lock = threading.Lock()
+
+def get_category_index(categories):
+    """Get the compiled index for a category framework, compiling it on first use"""
+    fingerprint = json.dumps(categories, sort_keys=True, default=str)
+    with _category_index_lock:
+        index = _category_index_cache.get(fingerprint)
+        if index is None:
+            index = CategoryIndex(categories)
+            _category_index_cache[fingerprint] = index
+            logger.info(f"Compiled category index for {len(categories)} categories")
+    return index
@@ -0,0 +1,233 @@
+"""
+Preclassifier module - Local hashed TF-IDF and logistic regression gate for Claude analysis
+"""
+
+import re
+import json
+import zlib
+import logging
+import datetime
+
+import numpy as np
+
+try:
+    from modules.context import strip_markup
+except ImportError:
+    # Running a script from modules/ puts modules/ itself on the path
+    from context import strip_markup
+
+logger = logging.getLogger('preclassifier')
+
+_WORD = re.compile(r"[a-z0-9][a-z0-9'\-]*")
+
+def tokenize(text):
+    """Get the words and word bigrams of an article's plain text"""
+    words = _WORD.findall(strip_markup(text).lower())
+    return words + [f"{first} {second}" for first, second in zip(words, words[1:])]
+
+def _sigmoid(z):
+    return 1.0 / (1.0 + np.exp(-np.clip(z, -35, 35)))
+
+
+class PreClassifier:
+    """
+    Estimates how likely Claude is to rate an article anything but green,
+    so articles it would almost certainly clear can skip the API call.
+
+    Articles are turned into hashed TF-IDF vectors (words and bigrams
+    hashed into `n_features` buckets, sublinear term frequency, L2
+    normalized) and scored by a logistic regression. The skip threshold is
+    calibrated on held-out articles so that a target share of the articles
+    Claude rated orange or red still score above it.
+    """
+
+    def __init__(self, weights, bias, idf, threshold, metadata=None):
+        """
+        Args:
+            weights (numpy.ndarray): Weight per hashed feature
+            bias (float): Intercept
+            idf (numpy.ndarray): Inverse document frequency per hashed feature
+            threshold (float): Probability below which Claude can be skipped
+            metadata (dict, optional): Training details (sample counts, holdout metrics)
+        """
+        self.weights = weights
+        self.bias = float(bias)
+        self.idf = idf
+        self.threshold = float(threshold)
+        self.metadata = metadata or {}
+
+    @property
+    def n_features(self):
+        return self.weights.shape[0]
+
+    @staticmethod
+    def article_text(article):
+        return f"{article.get('title', '') or ''} {article.get('content', '') or ''}"
+
+    @staticmethod
+    def _term_counts(text, n_features):
+        """Get the hashed feature indices of a text and how often each occurs"""
+        hashed = np.fromiter(
+            (zlib.crc32(term.encode('utf-8')) % n_features for term in tokenize(text)),
+            dtype=np.int64
+        )
+        if not hashed.size:
+            return hashed, np.zeros(0)
+        indices, counts = np.unique(hashed, return_counts=True)
+        return indices, counts.astype(np.float64)
+
+    @staticmethod
+    def _tfidf(counts, indices, idf):
+        values = (1.0 + np.log(counts)) * idf[indices]
+        norm = np.linalg.norm(values)
+        return values / norm if norm else values
+
+    def predict_proba(self, article):
+        """Get the probability that Claude rates the article above green"""
+        indices, counts = self._term_counts(self.article_text(article), self.n_features)
+        if not indices.size:
+            return float(_sigmoid(self.bias))
+        values = self._tfidf(counts, indices, self.idf)
+        return float(_sigmoid(self.bias + values @ self.weights[indices]))
+
+    def should_skip(self, article):
+        """
+        Returns:
+            tuple: (True if Claude can be skipped, probability)
+        """
+        probability = self.predict_proba(article)
+        return probability < self.threshold, probability
+
+    def save(self, path):
+        """Save the model to a NumPy .npz file"""
+        np.savez_compressed(
+            path,
+            weights=self.weights,
+            bias=self.bias,
+            idf=self.idf,
+            threshold=self.threshold,
+            metadata=json.dumps(self.metadata)
+        )
+
+    @classmethod
+    def load(cls, path):
+        """Load a model saved with save()"""
+        with np.load(path) as data:
+            return cls(
+                data['weights'],
+                float(data['bias']),
+                data['idf'],
+                float(data['threshold']),
+                json.loads(str(data['metadata']))
+            )
+
+    @classmethod
+    def train(cls, articles, labels, strong, n_features=2 ** 18, target_recall=0.98,
+              holdout_fraction=0.2, iterations=400, learning_rate=2.0, l2=1e-5, seed=0):
+        """
+        Fit a model on articles Claude has already analyzed.
+
+        Args:
+            articles (list): Article dicts with title and content
+            labels (list): 1 where Claude rated a flagged category above green, else 0
+            strong (list): 1 where Claude rated a flagged category orange or red, else 0
+            n_features (int): Hash buckets
+            target_recall (float): Share of held-out orange/red articles that must stay above the threshold
+            holdout_fraction (float): Share of articles held out to calibrate the threshold
+            iterations (int): Gradient descent steps
+            learning_rate (float): Gradient descent step size
+            l2 (float): L2 regularization strength
+            seed (int): Seed for the holdout split
+
+        Returns:
+            PreClassifier: The trained model, with holdout metrics in metadata
+
+        Raises:
+            ValueError: If the articles do not include both classes
+        """
+        y = np.asarray(labels, dtype=np.float64)
+        strong = np.asarray(strong, dtype=bool)
+        if len(articles) != len(y) or len(y) != len(strong):
+            raise ValueError("articles, labels and strong must have the same length")
+        if y.min(initial=1) == y.max(initial=0):
+            raise ValueError("Training needs articles Claude rated green and articles it rated above green")
+
+        docs = [cls._term_counts(cls.article_text(article), n_features) for article in articles]
+
+        # Document frequencies and smoothed idf over every article
+        df = np.zeros(n_features)
+        for indices, _ in docs:
+            df[indices] += 1
+        idf = np.log((1.0 + len(docs)) / (1.0 + df)) + 1.0
+
+        # Sparse rows as flat (row, column, value) arrays
+        rows = np.concatenate([np.full(indices.size, row, dtype=np.int64) for row, (indices, _) in enumerate(docs)])
+        cols = np.concatenate([indices for indices, _ in docs])
+        vals = np.concatenate([cls._tfidf(counts, indices, idf) for indices, counts in docs])
+
+        rng = np.random.default_rng(seed)
+        order = rng.permutation(len(docs))
+        holdout_size = int(len(docs) * holdout_fraction)
+        is_holdout = np.zeros(len(docs), dtype=bool)
+        is_holdout[order[:holdout_size]] = True
+        if holdout_size and len(np.unique(y[~is_holdout])) < 2:
+            # Too few articles of one class to hold any out
+            is_holdout[:] = False
+
+        weights, bias = cls._fit(rows, cols, vals, y, ~is_holdout, n_features, iterations, learning_rate, l2)
+
+        # Calibrate on held-out articles (or the training set when there are too few)
+        calibration = is_holdout if is_holdout.any() else ~is_holdout
+        scores = _sigmoid(bias + np.bincount(rows, weights=vals * weights[cols], minlength=len(docs)))
+        threshold = cls._calibrate(scores[calibration], y[calibration], strong[calibration], target_recall)
+
+        cal_scores, cal_y, cal_strong = scores[calibration], y[calibration] > 0, strong[calibration]
+        kept = cal_scores >= threshold
+        metadata = {
+            'trained_at': datetime.datetime.now().isoformat(),
+            'samples': len(docs),
+            'positives': int(y.sum()),
+            'strong': int(strong.sum()),
+            'calibrated_on': 'holdout' if is_holdout.any() else 'training',
+            'target_recall': target_recall,
+            'threshold': threshold,
+            'skip_rate': round(float(1 - kept.mean()), 4) if kept.size else 0.0,
+            'recall': round(float(kept[cal_y].mean()), 4) if cal_y.any() else None,
+            'strong_recall': round(float(kept[cal_strong].mean()), 4) if cal_strong.any() else None
+        }
+        logger.info(f"Trained pre-classifier: {metadata}")
+        return cls(weights, bias, idf, threshold, metadata)
+
+    @staticmethod
+    def _fit(rows, cols, vals, y, train_mask, n_features, iterations, learning_rate, l2):
+        """Class-balanced L2 logistic regression by full-batch gradient descent"""
+        n_rows = y.shape[0]
+        positives = y[train_mask].sum()
+        negatives = train_mask.sum() - positives
+        sample_weight = np.where(y > 0, train_mask.sum() / (2 * positives), train_mask.sum() / (2 * negatives))
+        sample_weight = np.where(train_mask, sample_weight, 0.0)
+        total_weight = sample_weight.sum()
+
+        weights = np.zeros(n_features)
+        bias = 0.0
+        for _ in range(iterations):
+            z = bias + np.bincount(rows, weights=vals * weights[cols], minlength=n_rows)
+            residual = (_sigmoid(z) - y) * sample_weight
+            gradient = np.bincount(cols, weights=vals * residual[rows], minlength=n_features) / total_weight + l2 * weights
+            weights -= learning_rate * gradient
+            bias -= learning_rate * residual.sum() / total_weight
+        return weights, bias
+
+    @staticmethod
+    def _calibrate(scores, y, strong, target_recall):
+        """
+        Get the highest threshold that keeps `target_recall` of the orange/red
+        articles (of all positive articles if there are none) at or above it.
+        """
+        protected = scores[strong] if strong.any() else scores[y > 0]
+        if not protected.size:
+            logger.warning("No positive articles to calibrate on. The pre-classifier will never skip Claude.")
+            return 0.0
+        protected = np.sort(protected)
+        allowed_misses = int(np.floor((1 - target_recall) * protected.size))
+        return float(protected[allowed_misses])
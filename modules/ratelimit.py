@@ -0,0 +1,103 @@
+"""
+Rate limit module - Token-bucket limiters shared between worker threads
+"""
+
+import time
+import logging
+import threading
+
+logger = logging.getLogger('ratelimit')
+
+class TokenBucket:
+    """
+    A bucket holding up to `capacity` units that refills continuously at
+    `capacity` units per `period` seconds.
+    """
+
+    def __init__(self, capacity, period=60.0):
+        self.capacity = float(capacity)
+        self.refill_rate = self.capacity / period
+        self.available = self.capacity
+        self.updated = time.monotonic()
+
+    def _refill(self, now):
+        elapsed = now - self.updated
+        self.available = min(self.capacity, self.available + elapsed * self.refill_rate)
+        self.updated = now
+
+    def wait_time(self, amount, now):
+        """Get how long to wait before `amount` units are available (0 if available now)"""
+        self._refill(now)
+        # Requests larger than the bucket would never fit, so only wait for a full bucket
+        amount = min(amount, self.capacity)
+        if self.available >= amount:
+            return 0.0
+        return (amount - self.available) / self.refill_rate
+
+    def consume(self, amount):
+        self.available -= min(amount, self.capacity)
+
+
+class RateLimiter:
+    """
+    Limits requests per minute and tokens per minute across all threads
+    sharing the limiter. Either limit may be None to disable it.
+    """
+
+    def __init__(self, requests_per_minute=None, tokens_per_minute=None):
+        self.request_bucket = TokenBucket(requests_per_minute) if requests_per_minute else None
+        self.token_bucket = TokenBucket(tokens_per_minute) if tokens_per_minute else None
+        self._lock = threading.Lock()
+        self._paused_until = 0.0
+
+        # Counters for reporting
+        self.acquired = 0
+        self.waits = 0
+        self.wait_seconds = 0.0
+        self.pauses = 0
+
+    def acquire(self, tokens=0):
+        """Block until one request carrying `tokens` tokens fits within both limits"""
+        waited = False
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                delay = max(0.0, self._paused_until - now)
+                if self.request_bucket:
+                    delay = max(delay, self.request_bucket.wait_time(1, now))
+                if self.token_bucket:
+                    delay = max(delay, self.token_bucket.wait_time(tokens, now))
+
+                if delay <= 0:
+                    if self.request_bucket:
+                        self.request_bucket.consume(1)
+                    if self.token_bucket:
+                        self.token_bucket.consume(tokens)
+                    self.acquired += 1
+                    if waited:
+                        self.waits += 1
+                    return
+
+                self.wait_seconds += delay
+
+            waited = True
+            logger.debug(f"Rate limit reached, waiting {delay:.2f}s")
+            time.sleep(delay)
+
+    def pause(self, seconds):
+        """Hold back every thread's next request for `seconds` (e.g. after the API throttled one)"""
+        with self._lock:
+            until = time.monotonic() + seconds
+            if until > self._paused_until:
+                self._paused_until = until
+                self.pauses += 1
+        logger.info(f"Rate limiter paused for {seconds:.2f}s")
+
+    def stats(self):
+        """Get limiter counters"""
+        return {
+            'acquired': self.acquired,
+            'waits': self.waits,
+            'wait_seconds': round(self.wait_seconds, 2),
+            'pauses': self.pauses
+        }
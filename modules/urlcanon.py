@@ -0,0 +1,92 @@
+"""
+URL canonicalization module - Maps the many URLs of one article to a single canonical form
+"""
+
+import re
+import logging
+from urllib.parse import urlsplit, urlunsplit, parse_qsl, urlencode, unquote, quote
+
+logger = logging.getLogger('urlcanon')
+
+# Query parameters that only track the reader or the referrer
+TRACKING_PARAMS = {
+    'fbclid', 'gclid', 'dclid', 'msclkid', 'yclid', 'igshid', 'mc_cid', 'mc_eid',
+    'cmpid', 'ocid', 'smid', 'smtyp', 'taid', 'mbid', 'ref', 'ref_src', 'ito',
+    'ncid', 'sr_share', 'ftag', 'amp', 'outputtype'
+}
+TRACKING_PREFIXES = ('utm_', 'pk_', 'mtm_', '__twitter', 'at_', 'hsa_')
+
+# Host prefixes of mobile and AMP mirrors
+_HOST_PREFIXES = ('www.', 'm.', 'mobile.', 'amp.')
+
+# AMP versions of a page: /amp/..., .../amp, .../amp.html, ...amp
+_AMP_PATH = re.compile(r'(^/amp(?=/)|/amp/?$|\.amp(?=\.html?$)|\.amp$)', re.IGNORECASE)
+
+def _canonical_host(netloc):
+    host = netloc.rsplit('@', 1)[-1].lower()
+    if host.endswith(':80') or host.endswith(':443'):
+        host = host.rsplit(':', 1)[0]
+    host = host.rstrip('.')
+    for prefix in _HOST_PREFIXES:
+        if host.startswith(prefix) and host.count('.') > 1:
+            host = host[len(prefix):]
+            break
+    return host
+
+def _is_tracking(name):
+    name = name.lower()
+    return name in TRACKING_PARAMS or name.startswith(TRACKING_PREFIXES)
+
+def canonicalize_url(url):
+    """
+    Get the canonical form of an article URL.
+
+    The scheme is dropped in favour of https, host names are lowercased
+    and lose www./m./amp. prefixes and default ports, AMP paths and AMP
+    cache hosts map to the regular page, tracking parameters and fragments
+    are removed, the remaining query parameters are sorted and a trailing
+    slash is dropped. Two URLs with the same canonical form are taken to be
+    the same article.
+
+    Args:
+        url (str): URL as found in a feed or API response
+
+    Returns:
+        str: The canonical URL, or '' if there is none
+    """
+    url = (url or '').strip()
+    if not url:
+        return ''
+    if '://' not in url:
+        url = f"https://{url.lstrip('/')}"
+
+    try:
+        parts = urlsplit(url)
+    except ValueError:
+        logger.debug(f"Could not parse URL {url}")
+        return url
+
+    host = _canonical_host(parts.netloc)
+    path = parts.path
+
+    # Google AMP cache URLs carry the origin host and path after /c/ (or /c/s/ for https)
+    if host.endswith('.cdn.ampproject.org'):
+        cached = re.match(r'^/[cv]/(?:s/)?([^/]+)(/.*)?$', path)
+        if cached:
+            host = _canonical_host(cached.group(1))
+            path = cached.group(2) or '/'
+
+    # Unescape what needs no escaping so differently encoded copies compare equal
+    path = quote(unquote(path), safe="/:@!$&'()*+,;=-._~%")
+    path = re.sub(r'/{2,}', '/', path)
+    path = _AMP_PATH.sub('', path) or '/'
+    if len(path) > 1:
+        path = path.rstrip('/')
+        path = re.sub(r'/index\.(html?|php)$', '', path, flags=re.IGNORECASE) or '/'
+
+    query = sorted(
+        (name, value) for name, value in parse_qsl(parts.query, keep_blank_values=True)
+        if not _is_tracking(name)
+    )
+
+    return urlunsplit(('https', host, path if path != '/' else '', urlencode(query), ''))
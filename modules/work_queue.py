@@ -0,0 +1,264 @@
+"""
+Work queue module - Lease-based claiming of articles across analyzer workers
+"""
+
+import os
+import uuid
+import socket
+import logging
+import datetime
+import threading
+
+logger = logging.getLogger('work_queue')
+
+# Fields a lease adds to an article document
+LEASE_FIELDS = {'lease_owner': '', 'lease_token': '', 'lease_expires': ''}
+
+class ArticleWorkQueue:
+    """
+    Lets several analyzer processes share the articles collection as a work
+    queue without processing the same article twice.
+
+    A worker claims articles by stamping them with its id and a lease expiry.
+    Only articles without a lease, or whose lease has expired, can be
+    claimed, and each document is claimed by a single atomic update, so two
+    workers never hold the same article. While a worker holds articles a
+    heartbeat thread keeps extending their leases; if the worker dies the
+    leases expire and the articles become claimable again.
+
+    Lease expiries are ISO-8601 UTC strings, so hosts running workers need
+    reasonably synchronized clocks.
+    """
+
+    def __init__(self, collection, lease_seconds=600, heartbeat_seconds=120, worker_id=None):
+        """
+        Args:
+            collection: MongoDB articles collection
+            lease_seconds (int): How long a claim lasts without a heartbeat
+            heartbeat_seconds (int): How often held leases are extended
+            worker_id (str, optional): Identifier of this worker (default: host:pid:random)
+        """
+        self.collection = collection
+        self.lease = datetime.timedelta(seconds=lease_seconds)
+        self.heartbeat_seconds = heartbeat_seconds
+        self.worker_id = worker_id or f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+
+        self._held = set()
+        self._lock = threading.Lock()
+        self._heartbeat_thread = None
+        self._stop_heartbeat = threading.Event()
+
+        # Counters for reporting
+        self.claimed = 0
+        self.completed = 0
+        self.released = 0
+        self.heartbeats = 0
+        self.lost = 0
+
+        try:
+            self.collection.create_index([('analyzed', 1), ('collected_at', 1)])
+            self.collection.create_index('lease_token', sparse=True)
+        except Exception as e:
+            logger.warning(f"Could not create work queue indexes: {str(e)}")
+
+    @staticmethod
+    def _timestamp(dt):
+        # Fixed-width so lease expiries compare correctly as strings
+        return dt.isoformat(timespec='microseconds')
+
+    def _lease_free(self, now):
+        return {'$or': [{'lease_expires': None}, {'lease_expires': {'$lt': self._timestamp(now)}}]}
+
+    def claimable(self, query):
+        """Narrow query to the articles no worker holds a lease on right now"""
+        return {'$and': [query, self._lease_free(datetime.datetime.utcnow())]}
+
+    def claim(self, query, limit, sort=None, attempts=3):
+        """
+        Claim up to `limit` articles matching query.
+
+        Candidates are read first and then claimed with one update that
+        re-checks the query and their leases, so articles taken (or finished)
+        by another worker in between are skipped; further rounds fill the
+        shortfall.
+
+        Returns:
+            list: The claimed article documents, in `sort` order
+        """
+        claimed_docs = []
+        for _ in range(attempts):
+            wanted = limit - len(claimed_docs) if limit else 0
+            if limit and wanted <= 0:
+                break
+
+            now = datetime.datetime.utcnow()
+            candidates = self.collection.find({'$and': [query, self._lease_free(now)]}, {'_id': 1})
+            if sort:
+                candidates = candidates.sort(sort)
+            if wanted:
+                candidates = candidates.limit(wanted)
+            candidate_ids = [doc['_id'] for doc in candidates]
+            if not candidate_ids:
+                break
+
+            token = uuid.uuid4().hex
+            result = self.collection.update_many(
+                {'$and': [query, {'_id': {'$in': candidate_ids}}, self._lease_free(now)]},
+                {'$set': {
+                    'lease_owner': self.worker_id,
+                    'lease_token': token,
+                    'lease_expires': self._timestamp(now + self.lease)
+                }}
+            )
+            if not result.modified_count:
+                continue
+
+            cursor = self.collection.find({'lease_token': token})
+            if sort:
+                cursor = cursor.sort(sort)
+            docs = list(cursor)
+            claimed_docs.extend(docs)
+
+            if result.modified_count == len(candidate_ids):
+                break
+            logger.debug(f"Lost {len(candidate_ids) - result.modified_count} candidates to other workers, retrying")
+
+        if sort and len(claimed_docs) > 1:
+            field, direction = sort[0]
+            claimed_docs.sort(key=lambda doc: doc.get(field) or '', reverse=direction < 0)
+
+        with self._lock:
+            self._held.update(doc['_id'] for doc in claimed_docs)
+            self.claimed += len(claimed_docs)
+        if claimed_docs:
+            self._ensure_heartbeat()
+
+        logger.info(f"Worker {self.worker_id} claimed {len(claimed_docs)} articles")
+        return claimed_docs
+
+    def confirm(self, article):
+        """
+        Re-assert the claim on an article right before its results are written.
+
+        The lease is renewed only if it still carries the token of this
+        worker's claim and has not expired, so once this returns True no
+        other worker can claim the article until the renewed lease runs out.
+
+        Returns:
+            bool: True if this worker still holds the article
+        """
+        now = datetime.datetime.utcnow()
+        try:
+            result = self.collection.update_one(
+                {
+                    '_id': article['_id'],
+                    'lease_owner': self.worker_id,
+                    'lease_token': article.get('lease_token'),
+                    'lease_expires': {'$gte': self._timestamp(now)}
+                },
+                {'$set': {'lease_expires': self._timestamp(now + self.lease)}}
+            )
+        except Exception as e:
+            logger.error(f"Error confirming the lease on article {article['_id']}: {str(e)}")
+            return False
+
+        if result.matched_count:
+            return True
+        with self._lock:
+            self._held.discard(article['_id'])
+            self.lost += 1
+        logger.warning(f"Worker {self.worker_id} lost the lease on article {article['_id']}")
+        return False
+
+    def complete(self, article_ids):
+        """Drop the leases of articles that were processed"""
+        count = self._clear_leases(article_ids)
+        with self._lock:
+            self.completed += count
+
+    def release(self, article_ids):
+        """Give back articles that were not processed so any worker can claim them now"""
+        count = self._clear_leases(article_ids)
+        with self._lock:
+            self.released += count
+        if count:
+            logger.info(f"Worker {self.worker_id} released {count} unprocessed articles")
+
+    def _clear_leases(self, article_ids):
+        article_ids = list(article_ids)
+        if not article_ids:
+            return 0
+
+        with self._lock:
+            self._held.difference_update(article_ids)
+
+        try:
+            result = self.collection.update_many(
+                {'_id': {'$in': article_ids}, 'lease_owner': self.worker_id},
+                {'$unset': LEASE_FIELDS}
+            )
+            return result.modified_count
+        except Exception as e:
+            # The leases simply expire
+            logger.error(f"Error clearing leases: {str(e)}")
+            return 0
+
+    def heartbeat(self):
+        """Extend the leases of every held article"""
+        with self._lock:
+            held = list(self._held)
+        if not held:
+            return
+
+        expires = self._timestamp(datetime.datetime.utcnow() + self.lease)
+        try:
+            result = self.collection.update_many(
+                {'_id': {'$in': held}, 'lease_owner': self.worker_id},
+                {'$set': {'lease_expires': expires}}
+            )
+        except Exception as e:
+            logger.error(f"Lease heartbeat failed: {str(e)}")
+            return
+
+        with self._lock:
+            self.heartbeats += 1
+            if result.matched_count < len(held):
+                # Leases expired before the heartbeat (e.g. a long pause); another worker may own them now
+                lost = len(held) - result.matched_count
+                self.lost += lost
+                logger.warning(f"Worker {self.worker_id} lost the lease on {lost} articles")
+
+    def _ensure_heartbeat(self):
+        with self._lock:
+            if self._heartbeat_thread is not None and self._heartbeat_thread.is_alive():
+                return
+            self._stop_heartbeat.clear()
+            self._heartbeat_thread = threading.Thread(target=self._heartbeat_loop, name='lease-heartbeat', daemon=True)
+            self._heartbeat_thread.start()
+
+    def _heartbeat_loop(self):
+        while not self._stop_heartbeat.wait(self.heartbeat_seconds):
+            with self._lock:
+                if not self._held:
+                    self._heartbeat_thread = None
+                    return
+            self.heartbeat()
+
+    def close(self):
+        """Stop the heartbeat and release everything still held"""
+        self._stop_heartbeat.set()
+        with self._lock:
+            held = list(self._held)
+        self.release(held)
+
+    def stats(self):
+        """Get claim counters"""
+        return {
+            'worker_id': self.worker_id,
+            'held': len(self._held),
+            'claimed': self.claimed,
+            'completed': self.completed,
+            'released': self.released,
+            'heartbeats': self.heartbeats,
+            'lost': self.lost
+        }
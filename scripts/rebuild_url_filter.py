@@ -0,0 +1,48 @@
+#!/usr/bin/env python
+"""
+URL Filter Rebuilder - Rebuilds the collector's seen-URL Bloom filter from the stored articles
+Run after changing the filter settings or when the collector warns the filter is over capacity
+"""
+
+import argparse
+import logging
+import sys
+import os
+from dotenv import load_dotenv
+
+# Make sure we can import from our module
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Load environment variables
+load_dotenv()
+
+from modules.collector import NewsCollector
+
+# Set up logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger('rebuild_url_filter')
+
+def main():
+    """Rebuild the seen-URL filter"""
+    parser = argparse.ArgumentParser(description="Rebuild the seen-URL Bloom filter from the articles collection")
+    parser.add_argument('--capacity', type=int, default=None,
+                        help="URLs the filter holds at its error rate (default: URL_FILTER_CAPACITY or twice the stored articles)")
+    parser.add_argument('--error-rate', type=float, default=None,
+                        help="Target false-positive rate (default: URL_FILTER_ERROR_RATE)")
+    args = parser.parse_args()
+
+    try:
+        collector = NewsCollector()
+        url_filter = collector.rebuild_url_filter(capacity=args.capacity, error_rate=args.error_rate)
+        logger.info(f"Seen-URL filter rebuilt with {len(url_filter)} URLs")
+        return True
+    except Exception as e:
+        logger.error(f"Error rebuilding seen-URL filter: {str(e)}")
+        return False
+
+if __name__ == "__main__":
+    success = main()
+    sys.exit(0 if success else 1)
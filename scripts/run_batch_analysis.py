@@ -0,0 +1,64 @@
+#!/usr/bin/env python
+"""
+Batch Analysis Runner - Analyzes articles through the Message Batches API
+For backlogs and overnight re-analysis, at batch pricing; results can take hours to arrive
+"""
+
+import argparse
+import logging
+import sys
+import os
+from dotenv import load_dotenv
+
+# Make sure we can import from our module
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Load environment variables
+load_dotenv()
+
+from modules.analyzer import NewsAnalyzer
+
+# Set up logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger('run_batch_analysis')
+
+def main():
+    """Run a batch analysis"""
+    parser = argparse.ArgumentParser(description="Analyze articles through the Message Batches API")
+    parser.add_argument('--days', type=int, default=None,
+                        help="Only articles collected in the last N days (default: all)")
+    parser.add_argument('--limit', type=int, default=None,
+                        help="Maximum number of articles to process (default: no limit)")
+    parser.add_argument('--reanalyze', action='store_true',
+                        help="Also re-analyze articles that were already analyzed, replacing their events")
+    parser.add_argument('--poll-interval', type=int, default=None,
+                        help="Seconds between batch status polls (default: CLAUDE_BATCH_POLL_SECONDS)")
+    parser.add_argument('--timeout', type=int, default=None,
+                        help="Seconds to wait for each batch to end (default: CLAUDE_BATCH_TIMEOUT_SECONDS)")
+    args = parser.parse_args()
+
+    analyzer = None
+    try:
+        analyzer = NewsAnalyzer()
+        count = analyzer.analyze_pending_batch(
+            days=args.days,
+            limit=args.limit,
+            poll_interval=args.poll_interval,
+            timeout=args.timeout,
+            reanalyze=args.reanalyze
+        )
+        logger.info(f"Batch analysis complete. {count} articles analyzed.")
+        return True
+    except Exception as e:
+        logger.error(f"Error in batch analysis: {str(e)}")
+        return False
+    finally:
+        if analyzer is not None:
+            analyzer.close()
+
+if __name__ == "__main__":
+    success = main()
+    sys.exit(0 if success else 1)
@@ -34,13 +34,19 @@ def run_collection():
 
 def run_analysis():
     """Run the news analysis process"""
+    analyzer = None
     try:
         logger.info("Starting scheduled news analysis")
         analyzer = NewsAnalyzer()
-        count = analyzer.analyze_recent_articles()
-        logger.info(f"Scheduled analysis complete. {count} articles analyzed.")
+        # Drain mode works through every unanalyzed article, so a backlog left
+        # by an outage is caught up within the run's time budget
+        report = analyzer.drain_backlog()
+        logger.info(f"Scheduled analysis complete. {report['analyzed']} articles analyzed, {report['final_queue_depth']} still queued.")
     except Exception as e:
         logger.error(f"Error in scheduled analysis: {str(e)}")
+    finally:
+        if analyzer is not None:
+            analyzer.close()
 
 def run_threaded(job_func):
     """Run a function in a thread"""
@@ -0,0 +1,79 @@
+#!/usr/bin/env python
+"""
+Pre-classifier Trainer - Fits the local pre-classifier on articles Claude has already analyzed
+Run periodically (e.g. weekly) so the model follows the news mix
+"""
+
+import argparse
+import logging
+import sys
+import os
+from dotenv import load_dotenv
+
+# Make sure we can import from our module
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Load environment variables
+load_dotenv()
+
+from config import COLLECTION_ARTICLES, PRECLASSIFIER_MODEL_PATH, PRECLASSIFIER_TARGET_RECALL
+from modules.database import get_collection
+from modules.preclassifier import PreClassifier
+
+# Set up logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger('train_preclassifier')
+
+def load_training_data(limit=None):
+    """
+    Get (articles, labels, strong) for every article with Claude verdicts.
+
+    An article is positive when Claude rated any flagged category above
+    green, and strong when it rated any orange or red.
+    """
+    articles_collection = get_collection(COLLECTION_ARTICLES)
+    cursor = articles_collection.find(
+        # Verdicts reused from another article of the same story would count that story twice
+        {'analysis_results.claude_categories': {'$exists': True}, 'analysis_results.cluster_representative': {'$exists': False}},
+        {'title': 1, 'content': 1, 'analysis_results.claude_categories': 1}
+    ).sort('collected_at', -1)
+    if limit:
+        cursor = cursor.limit(limit)
+
+    articles, labels, strong = [], [], []
+    for article in cursor:
+        verdicts = article['analysis_results']['claude_categories'].values()
+        articles.append({'title': article.get('title'), 'content': article.get('content')})
+        labels.append(int(any(severity != 'green' for severity in verdicts)))
+        strong.append(int(any(severity in ('orange', 'red') for severity in verdicts)))
+    return articles, labels, strong
+
+def main():
+    """Train the pre-classifier and save it where the analyzer loads it from"""
+    parser = argparse.ArgumentParser(description="Train the local pre-classifier that gates Claude analysis")
+    parser.add_argument('--limit', type=int, default=None, help="Use only the N most recently collected articles")
+    parser.add_argument('--target-recall', type=float, default=PRECLASSIFIER_TARGET_RECALL,
+                        help="Share of held-out orange/red articles that must still reach Claude")
+    parser.add_argument('--output', default=PRECLASSIFIER_MODEL_PATH, help="Where to save the model")
+    args = parser.parse_args()
+
+    try:
+        articles, labels, strong = load_training_data(args.limit)
+        logger.info(f"Loaded {len(articles)} articles with Claude verdicts ({sum(labels)} above green, {sum(strong)} orange/red)")
+
+        model = PreClassifier.train(articles, labels, strong, target_recall=args.target_recall)
+
+        os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+        model.save(args.output)
+        logger.info(f"Saved pre-classifier to {args.output}: {model.metadata}")
+        return True
+    except Exception as e:
+        logger.error(f"Error training pre-classifier: {str(e)}")
+        return False
+
+if __name__ == "__main__":
+    success = main()
+    sys.exit(0 if success else 1)
@@ -0,0 +1,200 @@
+"""
+Shared pytest fixtures
+"""
+
+import os
+import re
+import sys
+import json
+import datetime
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+# Tests import the modules the same way the scripts do, from the repository root
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+class ClaudeStandIn:
+    """
+    Local stand-in for the Messages and Message Batches endpoints.
+
+    Every focus category of a single-article prompt is rated `severity`,
+    and every category of a packed prompt too. Status codes queued in
+    `failures` are answered to /v1/messages in turn (None lets a request
+    through), and batch requests whose custom_id is in `result_types` end
+    with that result type instead of succeeding.
+    """
+
+    def __init__(self):
+        self.severity = 'ORANGE'
+        self.confidence = 4
+        self.failures = []
+        self.result_types = {}
+        self.requests = []
+        self.batches = {}
+        self._lock = threading.Lock()
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), self._handler())
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}"
+
+    def message_requests(self):
+        """Get the bodies of the /v1/messages requests received so far"""
+        return [body for path, body in self.requests if path == '/v1/messages']
+
+    def answer(self, params):
+        """Get the response text for one Messages request"""
+        content = params['messages'][-1]['content']
+        text = content if isinstance(content, str) else content[0]['text']
+        packed = re.findall(r'START ARTICLE (\S+) ---\s*Focus categories: ([^\n]*)', text)
+        if packed:
+            return json.dumps({'articles': {
+                key: self._verdict(categories.split(', ')) for key, categories in packed
+            }})
+        focus = re.findall(r'Focus \*only\* on the following categories: ([^\n]*)\.', text)
+        return json.dumps(self._verdict(focus[0].split(', ') if focus else []))
+
+    def _verdict(self, categories):
+        return {
+            'is_us_based': True,
+            'categories': {
+                category: {'severity': self.severity, 'evidence': ['quoted'], 'confidence': self.confidence}
+                for category in categories
+            },
+            'summary': 'Stand-in summary',
+            'reasoning': 'Stand-in reasoning'
+        }
+
+    def _handler(self):
+        standin = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def _send(self, status, payload=None, raw=None):
+                body = raw if raw is not None else json.dumps(payload).encode('utf-8')
+                self.send_response(status)
+                self.send_header('content-type', 'application/json')
+                self.send_header('content-length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def do_POST(self):
+                body = json.loads(self.rfile.read(int(self.headers['content-length'])))
+                with standin._lock:
+                    standin.requests.append((self.path, body))
+                    failure = standin.failures.pop(0) if self.path == '/v1/messages' and standin.failures else None
+
+                if self.path == '/v1/messages/batches':
+                    batch_id = f"msgbatch_{len(standin.batches)}"
+                    standin.batches[batch_id] = body['requests']
+                    self._send(200, {'id': batch_id, 'processing_status': 'in_progress'})
+                elif failure is not None:
+                    self._send(failure, {'type': 'error', 'error': {'type': 'stand_in_error', 'message': 'Scripted failure'}})
+                else:
+                    self._send(200, {
+                        'content': [{'type': 'text', 'text': standin.answer(body)}],
+                        'usage': {'input_tokens': 100, 'output_tokens': 50, 'cache_read_input_tokens': 0}
+                    })
+
+            def do_GET(self):
+                parts = self.path.strip('/').split('/')
+                if parts[-1] == 'results':
+                    lines = []
+                    for request in standin.batches[parts[-2]]:
+                        result_type = standin.result_types.get(request['custom_id'], 'succeeded')
+                        if result_type == 'succeeded':
+                            result = {'type': 'succeeded', 'message': {
+                                'content': [{'type': 'text', 'text': standin.answer(request['params'])}],
+                                'usage': {'input_tokens': 100, 'output_tokens': 50}
+                            }}
+                        else:
+                            result = {'type': result_type, 'error': {'type': 'stand_in_error'}}
+                        lines.append(json.dumps({'custom_id': request['custom_id'], 'result': result}))
+                    self._send(200, raw='\n'.join(lines).encode('utf-8'))
+                else:
+                    batch_id = parts[-1]
+                    self._send(200, {
+                        'id': batch_id,
+                        'processing_status': 'ended',
+                        'request_counts': {'processing': 0},
+                        'results_url': f"{standin.url}/v1/messages/batches/{batch_id}/results"
+                    })
+
+        return Handler
+
+
+@pytest.fixture
+def claude_standin():
+    """A running ClaudeStandIn"""
+    standin = ClaudeStandIn()
+    thread = threading.Thread(target=standin.server.serve_forever, daemon=True)
+    thread.start()
+    yield standin
+    standin.server.shutdown()
+    standin.server.server_close()
+
+
+@pytest.fixture
+def analyzer_module(claude_standin, monkeypatch):
+    """The analyzer module on its in-memory mock collections, talking to the stand-in"""
+    from modules import analyzer
+
+    monkeypatch.setattr(analyzer, 'get_collection', analyzer.mock_get_collection)
+    monkeypatch.setattr(analyzer, 'IndicatorTracker', analyzer.MockIndicatorTracker)
+    monkeypatch.setattr(analyzer, 'is_mock_db', True)
+    monkeypatch.setattr(analyzer, 'ANTHROPIC_API_KEY', 'stand-in-key')
+    monkeypatch.setattr(analyzer, 'ANTHROPIC_API_URL', claude_standin.url)
+    monkeypatch.setattr(analyzer, 'PRECLASSIFIER_ENABLED', False)
+    monkeypatch.setattr(analyzer, 'CLAUDE_RETRY_BASE_SECONDS', 0)
+    analyzer._mock_collections_store.clear()
+    yield analyzer
+    analyzer._mock_collections_store.clear()
+
+
+@pytest.fixture
+def mongo_database():
+    """An in-memory MongoDB database (mongomock)"""
+    mongomock = pytest.importorskip('mongomock')
+    return mongomock.MongoClient().db
+
+
+@pytest.fixture
+def mongo_analyzer(analyzer_module, mongo_database, monkeypatch):
+    """A NewsAnalyzer on the in-memory MongoDB, claiming articles through the work queue"""
+    monkeypatch.setattr(analyzer_module, 'get_collection', lambda name: mongo_database[name])
+    monkeypatch.setattr(analyzer_module, 'is_mock_db', False)
+    return analyzer_module.NewsAnalyzer()
+
+
+@pytest.fixture
+def news_collector(mongo_database, monkeypatch):
+    """A NewsCollector on the in-memory MongoDB"""
+    from modules import collector
+    monkeypatch.setattr(collector, 'get_collection', lambda name: mongo_database[name])
+    return collector.NewsCollector()
+
+
+@pytest.fixture
+def news_analyzer(analyzer_module):
+    """A NewsAnalyzer with an empty article collection"""
+    news_analyzer = analyzer_module.NewsAnalyzer()
+    news_analyzer.articles_collection._data.clear()
+    return news_analyzer
+
+
+def add_article(collection, title, content, **fields):
+    """Insert an unanalyzed article and get its _id"""
+    now = datetime.datetime.now().isoformat()
+    article = {
+        'title': title,
+        'content': content,
+        'url': f"https://example.com/{title.replace(' ', '-').lower()}",
+        'source': 'Stand-in Source',
+        'collected_at': now,
+        'published_date': now,
+        'analyzed': False
+    }
+    article.update(fields)
+    return collection.insert_one(article).inserted_id
@@ -0,0 +1,52 @@
+"""
+Tests for summary counts built from the event aggregates
+"""
+
+import datetime
+
+
+def _event(category, severity, detected, **fields):
+    event = {
+        'category': category,
+        'severity': severity,
+        'detected_date': detected.isoformat(),
+        'cluster_duplicate': False
+    }
+    event.update(fields)
+    return event
+
+
+def test_summary_counts_a_rolling_lookback_window(news_analyzer):
+    category = next(iter(news_analyzer.categories))
+    cutoff = datetime.datetime.now() - datetime.timedelta(days=7)
+    events = news_analyzer.events_collection
+    events.insert_one(_event(category, 'red', cutoff - datetime.timedelta(minutes=1)))
+    events.insert_one(_event(category, 'orange', cutoff + datetime.timedelta(minutes=1)))
+    events.insert_one(_event(category, 'yellow', datetime.datetime.now()))
+    events.insert_one(_event(category, 'yellow', datetime.datetime.now(), cluster_duplicate=True))
+    news_analyzer.rebuild_event_aggregates()
+
+    summary = news_analyzer._generate_summary()
+
+    assert summary['total_events_in_period'] == 2
+    assert summary['categories'][category]['severity_counts_in_period'] == {'green': 0, 'yellow': 1, 'orange': 1, 'red': 0}
+
+
+def test_incremental_aggregates_match_a_rebuild(mongo_analyzer):
+    category = next(iter(mongo_analyzer.categories))
+    for n, severity in enumerate(['orange', 'orange', 'red']):
+        mongo_analyzer._create_events({'_id': f"article-{n}", 'cluster_id': f"story-{n}"}, {'categories': {category: severity}})
+    # A second source of the first story is not counted again
+    mongo_analyzer._create_events({'_id': 'article-copy', 'cluster_id': 'story-0'}, {'categories': {category: 'orange'}})
+    mongo_analyzer.bulk_writer.flush()
+
+    def aggregates():
+        return {
+            doc['_id']: (doc['total'], doc['severity_counts'], doc['latest_event_date'])
+            for doc in mongo_analyzer.event_aggregates_collection.find({'category': category})
+        }
+
+    incremental = aggregates()
+    assert mongo_analyzer.rebuild_event_aggregates() == 3
+    assert aggregates() == incremental
+    assert list(incremental.values())[0][:2] == (3, {'orange': 2, 'red': 1})
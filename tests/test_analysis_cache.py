@@ -0,0 +1,60 @@
+"""
+Tests for the Claude analysis cache
+"""
+
+import datetime
+
+from modules.analysis_cache import AnalysisCache
+from modules.context import strip_markup
+
+
+def test_normalize_text_strips_markup_like_the_prompt_text():
+    html_text = "<p>Troops &amp; police</p><script>var x = '<b>';</script><div>deployed</div>"
+
+    assert AnalysisCache.normalize_text(html_text) == ' '.join(strip_markup(html_text).lower().split())
+    assert AnalysisCache.normalize_text(html_text) == "troops & police deployed"
+
+
+def test_markup_and_spacing_variants_share_a_key():
+    plain = {'title': 'Court ruling', 'content': 'The court   blocked the order.'}
+    marked_up = {'title': 'Court ruling', 'content': '<p>The <b>court</b> blocked the order.</p>'}
+
+    key = AnalysisCache.make_key(plain, ['judicial_independence'], 'model', 1)
+
+    assert AnalysisCache.make_key(marked_up, ['judicial_independence'], 'model', 1) == key
+    assert AnalysisCache.make_key(plain, ['judicial_independence'], 'model', 2) != key
+    assert AnalysisCache.make_key(plain, ['civil_liberties'], 'model', 1) != key
+
+
+def test_memory_entries_are_evicted_least_recently_used_first():
+    cache = AnalysisCache(max_memory_entries=2)
+    cache.put('a', {'n': 1})
+    cache.put('b', {'n': 2})
+    cache.get('a')
+    cache.put('c', {'n': 3})
+
+    assert cache.get('b') is None
+    assert cache.get('a') == {'n': 1}
+    assert cache.stats()['evictions'] == 1
+
+
+def test_cached_results_are_copies():
+    cache = AnalysisCache()
+    cache.put('a', {'categories': {'x': 'red'}})
+
+    cache.get('a')['categories']['x'] = 'green'
+
+    assert cache.get('a') == {'categories': {'x': 'red'}}
+
+
+def test_persistent_entries_survive_a_restart_until_they_expire(mongo_database):
+    collection = mongo_database.claude_cache
+    AnalysisCache(collection, ttl_hours=1).put('a', {'n': 1})
+    AnalysisCache(collection, ttl_hours=1).put('old', {'n': 2})
+    collection.update_one({'_id': 'old'}, {'$set': {'created_at': datetime.datetime.utcnow() - datetime.timedelta(hours=2)}})
+
+    restarted = AnalysisCache(collection, ttl_hours=1)
+
+    assert restarted.get('a') == {'n': 1}
+    assert restarted.get('old') is None
+    assert restarted.stats()['hits'] == 1 and restarted.stats()['misses'] == 1
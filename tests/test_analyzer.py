@@ -0,0 +1,53 @@
+"""
+Tests for the NewsAnalyzer lifecycle and analysis runs
+"""
+
+import gc
+import weakref
+
+from conftest import add_article
+
+
+def test_close_writes_buffered_updates_before_releasing_leases(mongo_analyzer):
+    articles = mongo_analyzer.articles_collection
+    first_id = add_article(articles, "First story", "Nothing to see here.")
+    second_id = add_article(articles, "Second story", "Nothing to see here.")
+
+    claimed = mongo_analyzer._fetch_articles({'analyzed': False}, 2)
+    first = next(article for article in claimed if article['_id'] == first_id)
+    mongo_analyzer._store_article_analysis(first, mongo_analyzer._keyword_analysis(first), None)
+
+    mongo_analyzer.close()
+
+    first = articles.find_one({'_id': first_id})
+    second = articles.find_one({'_id': second_id})
+    assert first['analyzed'] is True
+    assert second['analyzed'] is False
+    assert first.get('lease_owner') is None and second.get('lease_owner') is None
+    assert mongo_analyzer.work_queue.stats()['held'] == 0
+
+
+def test_analyzers_are_not_kept_alive_after_use(analyzer_module):
+    analyzer = analyzer_module.NewsAnalyzer()
+    analyzer.close()
+    reference = weakref.ref(analyzer)
+
+    del analyzer
+    gc.collect()
+
+    assert reference() is None
+
+
+def test_concurrent_analysis_stores_every_article(news_analyzer, claude_standin):
+    articles = news_analyzer.articles_collection
+    indicators = ['election interference', 'political prisoner', 'paramilitary group', 'emergency powers']
+    ids = [add_article(articles, f"Story {n}", f"Reporters confirmed the {indicator}.") for n, indicator in enumerate(indicators)]
+
+    analyzed = news_analyzer.analyze_recent_articles(concurrency=4, pack=False)
+
+    assert analyzed == 4
+    assert len(claude_standin.message_requests()) == 4
+    for article_id in ids:
+        article = articles.find_one({'_id': article_id})
+        assert article['analyzed'] is True
+        assert 'claude' in article['analysis_results']['methods']
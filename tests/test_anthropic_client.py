@@ -0,0 +1,92 @@
+"""
+Tests for retries and backoff of Claude requests
+"""
+
+import pytest
+import requests
+
+from modules.anthropic_client import AnthropicClient, ClaudeUnavailable
+from modules.budget import TokenBudget
+
+PAYLOAD = {
+    'model': 'fast',
+    'max_tokens': 100,
+    'messages': [{'role': 'user', 'content': "Focus *only* on the following categories: civil_liberties."}]
+}
+
+
+class RecordingLimiter:
+    """Rate limiter that records acquires and pauses without waiting"""
+
+    def __init__(self):
+        self.acquired = 0
+        self.pauses = []
+
+    def acquire(self, tokens=0):
+        self.acquired += 1
+
+    def pause(self, seconds):
+        self.pauses.append(seconds)
+
+
+def _client(claude_standin, **options):
+    options.setdefault('backoff_base', 0)
+    return AnthropicClient('stand-in-key', base_url=claude_standin.url, **options)
+
+
+def test_transient_failures_are_retried_until_a_response_arrives(claude_standin):
+    claude_standin.failures = [429, 503]
+    limiter = RecordingLimiter()
+    client = _client(claude_standin, rate_limiter=limiter)
+
+    result = client.create_message(PAYLOAD)
+
+    assert 'civil_liberties' in AnthropicClient.response_text(result)
+    assert len(claude_standin.message_requests()) == 3
+    assert limiter.acquired == 3
+    # Only the throttled attempt holds back every thread
+    assert len(limiter.pauses) == 1
+    stats = client.stats()
+    assert (stats['retries'], stats['throttled'], stats['errors'], stats['gave_up']) == (2, 1, 2, 0)
+
+
+def test_requests_failing_after_every_retry_raise_unavailable_and_release_the_budget(claude_standin):
+    claude_standin.failures = [503] * 3
+    budget = TokenBudget({'fast': {'input': 1.0, 'output': 5.0}}, run_token_limit=10000)
+    client = _client(claude_standin, max_retries=2, budget=budget)
+
+    with pytest.raises(ClaudeUnavailable):
+        client.create_message(PAYLOAD)
+
+    assert len(claude_standin.message_requests()) == 3
+    assert client.stats()['gave_up'] == 1
+    assert budget._reserved_tokens == 0
+
+
+def test_client_errors_are_not_retried(claude_standin):
+    claude_standin.failures = [400]
+    client = _client(claude_standin)
+
+    with pytest.raises(requests.exceptions.HTTPError):
+        client.create_message(PAYLOAD)
+
+    assert len(claude_standin.message_requests()) == 1
+    assert client.stats()['retries'] == 0
+
+
+def test_retry_after_headers_set_the_delay():
+    assert AnthropicClient._parse_retry_after({'retry-after-ms': '1500', 'retry-after': '9'}) == 1.5
+    assert AnthropicClient._parse_retry_after({'retry-after': '2'}) == 2.0
+    assert AnthropicClient._parse_retry_after({'retry-after': 'Thu, 01 Jan 1970 00:00:00 GMT'}) == 0.0
+    assert AnthropicClient._parse_retry_after({}) is None
+
+
+def test_backoff_grows_with_each_attempt_up_to_the_ceiling():
+    client = AnthropicClient('key', backoff_base=1.0, backoff_max=4.0, http=object())
+    error = requests.exceptions.ConnectionError()
+
+    delays = [[client._retry_delay(error, attempt) for _ in range(50)] for attempt in range(4)]
+
+    assert max(delays[0]) <= 1.0
+    assert max(delays[1]) <= 2.0
+    assert max(delays[3]) <= 4.0 and max(delays[3]) > 2.0
@@ -0,0 +1,108 @@
+"""
+Tests for Message Batches analysis
+"""
+
+import pytest
+
+from conftest import add_article
+from modules.budget import estimate_request_tokens
+
+
+def test_only_succeeded_batch_results_are_stored(news_analyzer, claude_standin):
+    articles = news_analyzer.articles_collection
+    ids = [
+        add_article(articles, f"Story {n}", f"Reporters confirmed the {indicator} this week.")
+        for n, indicator in enumerate(['election interference', 'political prisoner', 'paramilitary group', 'emergency powers'])
+    ]
+    claude_standin.result_types = {str(ids[1]): 'errored', str(ids[2]): 'expired', str(ids[3]): 'canceled'}
+
+    analyzed = news_analyzer.analyze_pending_batch(poll_interval=0, timeout=5)
+
+    assert analyzed == 1
+    assert articles.find_one({'_id': ids[0]})['analyzed'] is True
+    for article_id in ids[1:]:
+        article = articles.find_one({'_id': article_id})
+        assert article['analyzed'] is False
+        assert 'analysis_results' not in article
+
+
+def test_flagged_articles_are_sent_in_batches_of_the_configured_size(news_analyzer, analyzer_module, claude_standin, monkeypatch):
+    monkeypatch.setattr(analyzer_module, 'CLAUDE_BATCH_MAX_REQUESTS', 2)
+    articles = news_analyzer.articles_collection
+    quiet_id = add_article(articles, "Quiet story", "Nothing to see here.")
+    for n in range(3):
+        add_article(articles, f"Story {n}", f"Monitors reported election interference in district {n}.")
+
+    analyzed = news_analyzer.analyze_pending_batch(poll_interval=0, timeout=5)
+
+    assert analyzed == 4
+    assert [len(requests) for requests in claude_standin.batches.values()] == [2, 1]
+    assert str(quiet_id) not in {request['custom_id'] for requests in claude_standin.batches.values() for request in requests}
+    assert claude_standin.message_requests() == []
+    flagged = [article for article in articles.find({}) if article['_id'] != quiet_id]
+    assert all('claude' in article['analysis_results']['methods'] for article in flagged)
+
+
+def test_batch_usage_is_recorded_at_batch_rates(news_analyzer, analyzer_module, claude_standin):
+    articles = news_analyzer.articles_collection
+    for n in range(2):
+        add_article(articles, f"Story {n}", f"Monitors reported election interference in district {n}.")
+
+    news_analyzer.analyze_pending_batch(poll_interval=0, timeout=5)
+
+    budget = news_analyzer.token_budget
+    full_price = budget.estimate_cost(analyzer_module.CLAUDE_MODEL, input_tokens=100, output_tokens=50)
+    assert budget.stats()['requests'] == 2
+    assert budget.stats()['run_tokens'] == 300
+    assert budget.run_cost == pytest.approx(2 * full_price * analyzer_module.CLAUDE_BATCH_PRICE_FACTOR)
+    assert budget._reserved_tokens == 0
+
+
+def test_batches_only_carry_the_requests_the_budget_allows(news_analyzer, claude_standin):
+    articles = news_analyzer.articles_collection
+    ids = [add_article(articles, f"Story {n}", f"Monitors reported election interference in district {n}.") for n in range(3)]
+    article = articles.find_one({'_id': ids[0]})
+    prompt = news_analyzer._construct_claude_prompt(article, news_analyzer._flagged_categories(news_analyzer._keyword_analysis(article)))
+    payload = news_analyzer._build_claude_request(prompt)
+    news_analyzer.token_budget.run_token_limit = int(sum(estimate_request_tokens(payload)) + payload['max_tokens']) * 3 // 2
+
+    analyzed = news_analyzer.analyze_pending_batch(poll_interval=0, timeout=5)
+
+    assert analyzed == 1
+    assert [len(requests) for requests in claude_standin.batches.values()] == [1]
+    assert news_analyzer.token_budget.stats()['refused'] == 1
+    assert sum(articles.find_one({'_id': article_id})['analyzed'] for article_id in ids) == 1
+
+
+def test_reanalysis_replaces_the_earlier_events_of_an_article(mongo_analyzer, claude_standin):
+    articles = mongo_analyzer.articles_collection
+    ids = [add_article(articles, f"Story {n}", f"Monitors reported election interference in district {n}.") for n in range(2)]
+    mongo_analyzer.analyze_pending_batch(poll_interval=0, timeout=5)
+    first_events = mongo_analyzer.events_collection.count_documents({})
+
+    # Without reanalyze the analyzed articles are left alone
+    assert mongo_analyzer.analyze_pending_batch(poll_interval=0, timeout=5) == 0
+    analyzed = mongo_analyzer.analyze_pending_batch(poll_interval=0, timeout=5, reanalyze=True)
+
+    assert analyzed == 2
+    # Verdicts cached for the current model and prompt version are reused
+    assert len(claude_standin.batches) == 1
+    assert first_events > 0
+    assert mongo_analyzer.events_collection.count_documents({}) == first_events
+    assert {event['article_id'] for event in mongo_analyzer.events_collection.find({})} == set(ids)
+    totals = sum(doc['total'] for doc in mongo_analyzer.event_aggregates_collection.find({'category': {'$exists': True}}))
+    assert totals == first_events
+
+
+def test_batch_requests_follow_keyword_priority_within_the_call_limit(news_analyzer, analyzer_module, claude_standin, monkeypatch):
+    monkeypatch.setattr(analyzer_module, 'CLAUDE_MAX_CALLS_PER_RUN', 1)
+    articles = news_analyzer.articles_collection
+    yellow_id = add_article(articles, "Maps", "Lawmakers debated gerrymandering and ballot access.")
+    orange_id = add_article(articles, "Election", "Monitors reported election interference in the county.")
+
+    analyzed = news_analyzer.analyze_pending_batch(poll_interval=0, timeout=5)
+
+    assert analyzed == 1
+    assert [request['custom_id'] for requests in claude_standin.batches.values() for request in requests] == [str(orange_id)]
+    assert news_analyzer.deferred_count == 1
+    assert articles.find_one({'_id': yellow_id})['analyzed'] is False
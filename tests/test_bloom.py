@@ -0,0 +1,73 @@
+"""
+Tests for the persisted Bloom filter
+"""
+
+from modules.bloom import BloomFilter
+
+FILTER_ID = 'seen'
+
+
+def test_added_keys_are_always_found():
+    bloom = BloomFilter(1000, 0.01)
+    keys = [f"https://example.com/{n}" for n in range(500)]
+    for key in keys:
+        bloom.add(key)
+
+    assert all(key in bloom for key in keys)
+    assert len(bloom) == 500
+
+
+def test_false_positives_stay_near_the_target_rate():
+    bloom = BloomFilter(2000, 0.01)
+    for n in range(2000):
+        bloom.add(f"https://example.com/seen/{n}")
+
+    false_positives = sum(f"https://example.com/unseen/{n}" in bloom for n in range(20000))
+
+    assert false_positives / 20000 < 0.02
+    assert bloom.estimated_error_rate() < 0.02
+
+
+def test_concurrent_saves_merge_their_keys(mongo_database):
+    collection = mongo_database.url_filter
+    BloomFilter(1000, 0.01).save(collection, FILTER_ID)
+    first = BloomFilter.load(collection, FILTER_ID, 1000, 0.01)
+    second = BloomFilter.load(collection, FILTER_ID, 1000, 0.01)
+    first.add('https://example.com/first')
+    second.add('https://example.com/second')
+
+    assert first.save(collection, FILTER_ID)
+    assert second.save(collection, FILTER_ID)
+
+    saved = BloomFilter.load(collection, FILTER_ID, 1000, 0.01)
+    assert 'https://example.com/first' in saved and 'https://example.com/second' in saved
+
+
+def test_a_stale_filter_does_not_overwrite_a_rebuild(mongo_database):
+    collection = mongo_database.url_filter
+    BloomFilter(1000, 0.01).save(collection, FILTER_ID)
+    running = BloomFilter.load(collection, FILTER_ID, 1000, 0.01)
+    running.add('https://example.com/deleted')
+
+    rebuilt = BloomFilter(1000, 0.01)
+    rebuilt.add('https://example.com/kept')
+    rebuilt.save(collection, FILTER_ID, merge=False)
+
+    assert not running.save(collection, FILTER_ID)
+    assert running.generation == rebuilt.generation
+    saved = BloomFilter.load(collection, FILTER_ID, 1000, 0.01)
+    assert 'https://example.com/deleted' not in saved
+    assert 'https://example.com/kept' in saved
+
+
+def test_a_resized_rebuild_is_reloaded_not_overwritten(mongo_database):
+    collection = mongo_database.url_filter
+    BloomFilter(1000, 0.01).save(collection, FILTER_ID)
+    running = BloomFilter.load(collection, FILTER_ID, 1000, 0.01)
+    running.add('https://example.com/new')
+
+    BloomFilter(5000, 0.001).save(collection, FILTER_ID, merge=False)
+
+    assert not running.save(collection, FILTER_ID)
+    assert (running.capacity, running.error_rate) == (5000, 0.001)
+    assert collection.find_one({'_id': FILTER_ID})['capacity'] == 5000
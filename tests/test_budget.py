@@ -0,0 +1,79 @@
+"""
+Tests for token estimates and the Claude token and cost budgets
+"""
+
+import pytest
+
+from modules.budget import BudgetExceeded, TokenBudget, estimate_request_tokens, estimate_tokens
+
+PRICING = {'fast': {'input': 1.0, 'output': 5.0, 'cache_write': 1.25, 'cache_read': 0.1}}
+
+
+def _payload(text, max_tokens=100, system=None):
+    payload = {'model': 'fast', 'max_tokens': max_tokens, 'messages': [{'role': 'user', 'content': text}]}
+    if system is not None:
+        payload['system'] = system
+    return payload
+
+
+def test_token_estimates_count_words_numbers_and_punctuation():
+    assert estimate_tokens('') == 0
+    assert estimate_tokens("Vote count: 1200 ballots.") == 8
+    assert estimate_tokens("internationalization") == 5
+
+
+def test_cache_marked_system_blocks_are_estimated_apart():
+    system = [{'type': 'text', 'text': "Framework text", 'cache_control': {'type': 'ephemeral'}}]
+
+    uncached, cached = estimate_request_tokens(_payload("Article text", system=system))
+
+    assert cached == estimate_tokens("Framework text") + 4
+    assert uncached == 10 + estimate_tokens("Article text") + 4
+
+
+def test_requests_over_the_run_token_limit_are_refused():
+    budget = TokenBudget(PRICING, run_token_limit=300)
+    reservation = budget.reserve(_payload("Short article", max_tokens=150))
+
+    with pytest.raises(BudgetExceeded):
+        budget.reserve(_payload("Short article", max_tokens=150))
+
+    budget.release(reservation)
+    budget.reserve(_payload("Short article", max_tokens=150))
+    assert budget.stats()['refused'] == 1
+
+
+def test_requests_sent_together_are_held_up_to_the_limit():
+    budget = TokenBudget(PRICING, run_token_limit=400)
+    payloads = [_payload("Short article", max_tokens=150) for _ in range(3)]
+
+    reservations = budget.reserve_many(payloads, price_factor=0.5)
+
+    assert len(reservations) == 2
+    assert budget.stats()['refused'] == 1
+    assert reservations[0][1] == pytest.approx(budget._estimate(payloads[0], 1.0)[1] * 0.5)
+
+
+def test_recorded_usage_replaces_the_reservation():
+    budget = TokenBudget(PRICING, run_cost_limit=1.0)
+    reservation = budget.reserve(_payload("Short article", max_tokens=1000))
+
+    budget.record(reservation, 'fast', {'input_tokens': 1000, 'output_tokens': 200, 'cache_read_input_tokens': 10000})
+
+    stats = budget.stats()
+    assert stats['run_tokens'] == 11200
+    assert stats['run_cost_usd'] == pytest.approx((1000 * 1.0 + 200 * 5.0 + 10000 * 0.1) / 1_000_000, abs=1e-4)
+    assert budget._reserved_tokens == 0
+
+
+def test_daily_usage_is_shared_through_the_collection(mongo_database):
+    usage = mongo_database.claude_usage
+    first = TokenBudget(PRICING, daily_token_limit=2000, usage_collection=usage)
+    first.record(first.reserve(_payload("Short article")), 'fast', {'input_tokens': 1500, 'output_tokens': 100})
+
+    second = TokenBudget(PRICING, daily_token_limit=2000, usage_collection=usage)
+
+    assert second.stats()['day_tokens'] == 1600
+    assert second.stats()['run_tokens'] == 0
+    with pytest.raises(BudgetExceeded):
+        second.reserve(_payload("Short article", max_tokens=500))
@@ -0,0 +1,74 @@
+"""
+Tests for the write-behind buffer of analyzer writes
+"""
+
+import time
+
+from modules.bulk_writer import BulkWriter
+
+
+class RecordingCollection:
+    """Collection that records the bulk writes it receives"""
+
+    def __init__(self, name, log):
+        self.name = name
+        self.log = log
+
+    def bulk_write(self, requests, ordered=True):
+        self.log.append((self.name, len(requests)))
+
+
+def test_writes_are_buffered_until_max_ops(mongo_database):
+    writer = BulkWriter(max_ops=3, max_age_seconds=60)
+    articles = mongo_database.articles
+
+    writer.insert_one(articles, {'_id': 1})
+    writer.insert_one(articles, {'_id': 2})
+    assert articles.count_documents({}) == 0
+    assert writer.stats()['pending'] == 2
+
+    writer.update_one(articles, {'_id': 1}, {'$set': {'analyzed': True}})
+
+    assert articles.find_one({'_id': 1}) == {'_id': 1, 'analyzed': True}
+    assert writer.stats()['pending'] == 0
+    assert writer.stats()['flushes'] == 1
+    assert writer.stats()['max_batch_size'] == 3
+
+
+def test_a_write_flushes_once_the_oldest_one_is_old_enough(mongo_database):
+    writer = BulkWriter(max_ops=100, max_age_seconds=0.05)
+    articles = mongo_database.articles
+
+    writer.insert_one(articles, {'_id': 1})
+    time.sleep(0.06)
+    writer.insert_one(articles, {'_id': 2})
+
+    assert articles.count_documents({}) == 2
+    assert writer.stats()['ops_written'] == 2
+
+
+def test_collections_are_flushed_in_first_write_order():
+    log = []
+    articles, events = RecordingCollection('articles', log), RecordingCollection('events', log)
+    writer = BulkWriter(max_ops=100)
+
+    writer.update_one(articles, {'_id': 1}, {'$set': {'analyzed': True}})
+    writer.insert_one(events, {'article_id': 1})
+    writer.update_one(articles, {'_id': 2}, {'$set': {'analyzed': True}})
+
+    assert writer.flush() == 3
+    assert log == [('articles', 2), ('events', 1)]
+    assert writer.flush() == 0
+
+
+def test_failed_ops_are_counted_and_the_rest_written(mongo_database):
+    writer = BulkWriter(max_ops=100)
+    events = mongo_database.events
+    events.insert_one({'_id': 1})
+
+    writer.insert_one(events, {'_id': 1})
+    writer.insert_one(events, {'_id': 2})
+
+    assert writer.flush() == 1
+    assert writer.stats()['errors'] == 1
+    assert events.count_documents({}) == 2
@@ -0,0 +1,104 @@
+"""
+Tests for concurrent multi-perspective analysis with ClaudeAPI
+"""
+
+import json
+import threading
+
+import pytest
+
+from modules import claude
+
+ARTICLE = {'title': "Emergency powers extended", 'content': "The governor extended emergency powers again."}
+
+
+class ScriptedPerspectives:
+    """Answers analyze_text with a fixed category score per perspective and confidence per model"""
+
+    def __init__(self, api, scores, barrier=None, confidences=None):
+        self.names = {data['name']: perspective_id for perspective_id, data in api.perspectives.items()}
+        self.scores = scores
+        self.barrier = barrier
+        self.confidences = confidences or {}
+        self.calls = []
+        self.models = []
+        self._lock = threading.Lock()
+
+    def __call__(self, text, system_prompt=None, max_tokens=1500, model=None):
+        perspective_id = next(p for name, p in self.names.items() if name in system_prompt[1]['text'])
+        with self._lock:
+            self.calls.append(perspective_id)
+            self.models.append(model)
+        if self.barrier is not None:
+            # Only returns once every perspective of the round has been requested
+            self.barrier.wait(timeout=5)
+        return json.dumps({
+            'categories': {'civil_liberties': {'severity': 'ORANGE', 'score': self.scores[perspective_id], 'confidence': self.confidences.get(model, 4)}},
+            'overall_assessment': f"{perspective_id} view"
+        })
+
+
+@pytest.fixture
+def claude_api():
+    return claude.ClaudeAPI(api_key='stand-in-key')
+
+
+def test_perspectives_are_requested_concurrently(claude_api, monkeypatch):
+    scripted = ScriptedPerspectives(claude_api, {'neutral': 60, 'conservative': 50, 'progressive': 70}, threading.Barrier(3))
+    monkeypatch.setattr(claude_api, 'analyze_text', scripted)
+
+    result = claude_api.analyze_news_article_multi_perspective(ARTICLE, ['civil_liberties'], adaptive=False)
+
+    assert sorted(scripted.calls) == ['conservative', 'neutral', 'progressive']
+    assert result['perspectives_run'] == ['neutral', 'conservative', 'progressive']
+    assert result['categories']['civil_liberties']['score'] == 60
+    assert result['categories']['civil_liberties']['severity'] == 'orange'
+
+
+def test_adaptive_mode_skips_the_neutral_perspective_when_the_others_agree(claude_api, monkeypatch):
+    scripted = ScriptedPerspectives(claude_api, {'neutral': 90, 'conservative': 55, 'progressive': 60})
+    monkeypatch.setattr(claude_api, 'analyze_text', scripted)
+
+    result = claude_api.analyze_news_article_multi_perspective(ARTICLE, ['civil_liberties'], adaptive=True)
+
+    assert sorted(scripted.calls) == ['conservative', 'progressive']
+    assert result['perspectives_run'] == ['conservative', 'progressive']
+    assert result['categories']['civil_liberties']['score'] == 57.5
+
+
+def test_adaptive_mode_asks_the_neutral_perspective_when_the_others_disagree(claude_api, monkeypatch):
+    scripted = ScriptedPerspectives(claude_api, {'neutral': 60, 'conservative': 30, 'progressive': 90})
+    monkeypatch.setattr(claude_api, 'analyze_text', scripted)
+
+    result = claude_api.analyze_news_article_multi_perspective(ARTICLE, ['civil_liberties'], adaptive=True)
+
+    assert scripted.calls[-1] == 'neutral'
+    assert result['perspectives_run'] == ['neutral', 'conservative', 'progressive']
+    assert set(result['perspectives']) == {'neutral', 'conservative', 'progressive'}
+
+
+
+def _analyze_neutral(claude_api):
+    framework_prompt = claude_api._create_framework_prompt()
+    return claude_api._analyze_perspective('neutral', framework_prompt, claude_api._create_analysis_prompt(ARTICLE, ['civil_liberties']))
+
+
+def test_low_confidence_answers_are_redone_with_the_strong_model(claude_api, monkeypatch):
+    scripted = ScriptedPerspectives(claude_api, {'neutral': 60}, confidences={None: 2, claude.CLAUDE_STRONG_MODEL: 5})
+    monkeypatch.setattr(claude_api, 'analyze_text', scripted)
+
+    result = _analyze_neutral(claude_api)
+
+    assert '"confidence": <integer_1_to_5>' in claude_api._create_framework_prompt()
+    assert scripted.models == [None, claude.CLAUDE_STRONG_MODEL]
+    assert result['categories']['civil_liberties']['confidence'] == 5
+
+
+def test_confident_answers_stay_with_the_fast_model(claude_api, monkeypatch):
+    scripted = ScriptedPerspectives(claude_api, {'neutral': 60}, confidences={None: 4})
+    monkeypatch.setattr(claude_api, 'analyze_text', scripted)
+
+    result = _analyze_neutral(claude_api)
+
+    assert scripted.models == [None]
+    assert result['categories']['civil_liberties']['confidence'] == 4
@@ -0,0 +1,107 @@
+"""
+Tests for story clustering
+"""
+
+import datetime
+
+import pytest
+
+from modules.clustering import MinHasher, LSHIndex, shingles
+
+STORY = (
+    "The state election board voted on Tuesday to remove thousands of names from the voter rolls, "
+    "a move civil rights groups said would disenfranchise eligible voters ahead of the November vote."
+)
+
+
+def _article(url, text):
+    return {
+        'url': url,
+        'title': 'Election board purges rolls',
+        'content': text,
+        'source': 'Wire',
+        'collected_at': datetime.datetime.now().isoformat()
+    }
+
+
+def test_shingles_ignore_markup_case_and_punctuation():
+    assert shingles("<p>The Board VOTED, today!</p>") == shingles("the board voted today")
+    assert shingles("Two words", size=3) == {'two words'}
+    assert shingles("") == set()
+
+
+def test_signatures_estimate_similarity():
+    hasher = MinHasher()
+    rewrite = STORY.replace("on Tuesday", "late Tuesday")
+    unrelated = "The county fair opened with a bake sale, a pie contest and a parade of tractors down Main Street."
+
+    assert MinHasher.similarity(hasher.signature(STORY), hasher.signature(STORY)) == 1.0
+    assert MinHasher.similarity(hasher.signature(STORY), hasher.signature(rewrite)) > 0.6
+    assert MinHasher.similarity(hasher.signature(STORY), hasher.signature(unrelated)) < 0.2
+    assert hasher.signature("...") is None
+
+
+def test_bands_must_divide_the_signature():
+    with pytest.raises(ValueError):
+        MinHasher(num_perm=64, bands=10)
+
+
+def test_near_duplicates_join_a_cluster_and_other_stories_start_their_own():
+    hasher = MinHasher()
+    index = LSHIndex(threshold=0.5)
+
+    def assign(key, text):
+        signature = hasher.signature(text)
+        return index.assign(key, signature, hasher.band_keys(signature), f"cluster-{key}")
+
+    assert assign('a', STORY)[:2] == ('cluster-a', True)
+    assert assign('b', STORY + " Officials did not comment.")[:2] == ('cluster-a', False)
+    assert assign('c', "The county fair opened with a bake sale and a pie contest.")[:2] == ('cluster-c', True)
+    assert assign('a', STORY)[:2] == ('cluster-a', False)
+    assert len(index) == 3
+
+
+def test_copies_join_stored_stories_across_collector_runs(news_collector):
+    from modules.collector import NewsCollector
+
+    news_collector._store_articles([_article('https://a.example/story', STORY)])
+    later_run = NewsCollector()
+    later_run._store_articles([_article('https://b.example/story', STORY + " Officials did not comment.")])
+
+    first = news_collector.articles_collection.find_one({'url': 'https://a.example/story'})
+    copy = news_collector.articles_collection.find_one({'url': 'https://b.example/story'})
+    assert first['cluster_primary'] and not copy['cluster_primary']
+    assert copy['cluster_id'] == first['cluster_id']
+
+
+def test_removed_articles_no_longer_anchor_a_cluster():
+    hasher = MinHasher()
+    index = LSHIndex(threshold=0.5)
+    signature = hasher.signature(STORY)
+    index.assign('https://a.example/story', signature, hasher.band_keys(signature), 'cluster-a')
+
+    index.remove('https://a.example/story')
+    cluster_id, primary, _ = index.assign('https://b.example/story', signature, hasher.band_keys(signature), 'cluster-b')
+
+    assert 'https://a.example/story' not in index
+    assert (cluster_id, primary) == ('cluster-b', True)
+
+
+def test_articles_that_fail_to_insert_are_dropped_from_the_story_index(news_collector, monkeypatch):
+    assign = news_collector._assign_story_clusters
+
+    def assign_then_race(articles):
+        assign(articles)
+        # Another collector stores the first article between the lookup and the insert
+        news_collector.articles_collection.insert_one({'url': articles[0]['url'], 'title': 'Stored elsewhere'})
+
+    monkeypatch.setattr(news_collector, '_assign_story_clusters', assign_then_race)
+
+    stored = news_collector._store_articles([
+        _article('https://a.example/story', STORY),
+        _article('https://b.example/story', STORY + " Officials did not comment.")
+    ])
+
+    assert stored == 1
+    assert 'https://a.example/story' not in news_collector.story_index
+    assert 'https://b.example/story' in news_collector.story_index
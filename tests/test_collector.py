@@ -0,0 +1,158 @@
+"""
+Tests for collecting and storing articles
+"""
+
+import time
+
+from modules.collector import HostRateLimiter
+from modules.urlcanon import canonicalize_url
+
+
+class FakeResponse:
+    def __init__(self, status_code, content=b'', headers=None):
+        self.status_code = status_code
+        self.content = content
+        self.headers = headers or {}
+
+
+class FakeHttp:
+    """Answers GETs from a list of responses, recording the headers sent"""
+
+    def __init__(self, *responses):
+        self.responses = list(responses)
+        self.sent_headers = []
+
+    def get(self, url, params=None, headers=None, timeout=None):
+        self.sent_headers.append(headers or {})
+        return self.responses.pop(0)
+
+
+def _article(url, title):
+    return {'url': url, 'title': title, 'content': f"{title}. Nothing else happened.", 'source': 'Wire'}
+
+
+def test_seen_url_filter_hits_are_confirmed_before_dropping(news_collector):
+    news_collector._store_articles([_article('https://example.com/known', 'Known story')])
+    # A false positive: the filter reports a URL that was never stored
+    news_collector.url_filter.add(canonicalize_url('https://example.com/unlucky'))
+    news_collector.url_filter_stats = dict.fromkeys(news_collector.url_filter_stats, 0)
+
+    stored = news_collector._store_articles([
+        _article('https://www.example.com/known?utm_source=feed', 'Known story'),
+        _article('https://example.com/unlucky', 'Unlucky story'),
+        _article('https://example.com/fresh', 'Fresh story')
+    ])
+
+    assert stored == 2
+    assert news_collector.articles_collection.count_documents({}) == 3
+    assert news_collector.url_filter_stats == {'hits': 2, 'confirmed': 1, 'false_positives': 1, 'lookups_skipped': 1}
+    assert canonicalize_url('https://example.com/fresh') in news_collector.url_filter
+
+
+def test_relevance_filter_keeps_us_political_articles_only(news_collector):
+    both = {'title': "Senate hearing", 'content': "The White House defended the executive order."}
+    us_only = {'title': "Box scores", 'content': "American teams played late in Washington."}
+    political_only = {'title': "Abroad", 'content': "The opposition leader called for a new election."}
+    neither = {'title': "Recipes", 'content': "Bake the bread for an hour."}
+    articles = [both, us_only, political_only, neither]
+
+    assert news_collector._filter_relevant_content(articles) == [both]
+    assert news_collector._filter_us_content(articles) == [both, us_only]
+    assert news_collector._filter_political_content(articles) == [both, political_only]
+
+
+def test_host_rate_limiter_spaces_requests_to_the_same_host():
+    limiter = HostRateLimiter(0.2)
+
+    start = time.monotonic()
+    limiter.wait('a.example')
+    limiter.wait('b.example')
+    other_host = time.monotonic() - start
+    limiter.wait('a.example')
+    same_host = time.monotonic() - start
+
+    assert other_host < 0.1
+    assert same_host >= 0.19
+
+
+def test_collect_all_fetches_sources_concurrently(news_collector):
+    def slow_source():
+        time.sleep(0.3)
+        return []
+
+    news_collector.slow_source = slow_source
+    news_collector.sources = {f"source_{n}": {'type': 'custom', 'processor': 'slow_source'} for n in range(4)}
+
+    start = time.monotonic()
+    news_collector.collect_all(max_workers=4)
+    elapsed = time.monotonic() - start
+
+    assert elapsed < 1.0
+    assert set(news_collector.source_timings) == set(news_collector.sources)
+
+
+def test_conditional_get_sends_saved_validators_and_skips_unchanged_sources(news_collector):
+    feed = b'<rss><channel><title>Feed</title></channel></rss>'
+    news_collector.http = FakeHttp(
+        FakeResponse(200, feed, {'ETag': '"v1"', 'Last-Modified': 'Mon, 12 Oct 2026 10:00:00 GMT'}),
+        FakeResponse(304),
+        FakeResponse(200, feed)
+    )
+
+    assert news_collector._conditional_get('feed', 'https://example.com/rss') is not None
+    news_collector._commit_feed_cache('feed')
+    assert news_collector._conditional_get('feed', 'https://example.com/rss') is None
+    assert news_collector._conditional_get('feed', 'https://example.com/rss') is None
+
+    assert news_collector.http.sent_headers[1] == {
+        'If-None-Match': '"v1"',
+        'If-Modified-Since': 'Mon, 12 Oct 2026 10:00:00 GMT'
+    }
+    assert news_collector.feed_cache_collection.find_one({'_id': 'feed'})['etag'] == '"v1"'
+
+
+def test_feed_validators_are_not_saved_until_articles_are_stored(news_collector):
+    news_collector.http = FakeHttp(FakeResponse(200, b'first'), FakeResponse(200, b'first'))
+
+    news_collector._conditional_get('feed', 'https://example.com/rss')
+    # Storing failed, so the same body must be processed again next cycle
+    assert news_collector._conditional_get('feed', 'https://example.com/rss') is not None
+
+
+def test_store_articles_skips_repeats_and_stored_articles_in_one_write(news_collector, monkeypatch):
+    news_collector.url_filter = None
+    articles = news_collector.articles_collection
+    articles.insert_one({'url': 'https://example.com/legacy', 'canonical_url': 'https://example.com/legacy', 'title': 'Legacy story'})
+    inserts = []
+    insert_many = articles.insert_many
+    monkeypatch.setattr(articles, 'insert_many', lambda docs, **kwargs: inserts.append(len(docs)) or insert_many(docs, **kwargs))
+
+    stored = news_collector._store_articles([
+        _article('https://example.com/legacy', 'Legacy story'),
+        _article('https://example.com/new', 'New story'),
+        _article('http://www.example.com/new/?utm_campaign=x', 'New story'),
+        _article('https://example.com/other', 'Other story'),
+        {'title': 'No link'}
+    ])
+
+    assert stored == 2
+    assert inserts == [2]
+    assert articles.count_documents({}) == 3
+    assert articles.find_one({'canonical_url': 'https://example.com/new'})['analyzed'] is False
+
+
+def test_rebuilding_the_url_filter_backfills_canonical_urls(news_collector):
+    articles = news_collector.articles_collection
+    # Stored before URLs were canonicalized
+    legacy_id = articles.insert_one({'url': 'https://amp.example.com/legacy/', 'title': 'Legacy story'}).inserted_id
+    articles.insert_one({'url': 'https://example.com/legacy?utm_source=rss', 'title': 'Legacy story'})
+
+    news_collector.rebuild_url_filter()
+    stored = news_collector._store_articles([_article('https://www.example.com/legacy?fbclid=abc', 'Legacy story')])
+
+    assert stored == 0
+    assert articles.find_one({'_id': legacy_id})['canonical_url'] == 'https://example.com/legacy'
+    # The older copy of the same article keeps no canonical_url rather than breaking the unique index
+    assert articles.count_documents({'canonical_url': 'https://example.com/legacy'}) == 1
+    assert articles.count_documents({}) == 2
+    assert 'https://example.com/legacy' in news_collector.url_filter
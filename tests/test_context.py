@@ -0,0 +1,54 @@
+"""
+Tests for markup stripping and keyword-window context extraction
+"""
+
+from modules.context import GAP_MARKER, extract_context, keyword_windows, strip_markup
+from modules.matcher import CategoryIndex
+
+CATEGORIES = {
+    'elections': {'keywords': ['election'], 'orange_indicators': [], 'red_indicators': []},
+    'press': {'keywords': ['journalist'], 'orange_indicators': [], 'red_indicators': []}
+}
+
+
+def test_strip_markup_keeps_only_the_readable_text():
+    content = "<p>First&nbsp;line</p><script>var x = 1;</script><div>Second <b>bold</b> line &amp; more</div>"
+
+    assert strip_markup(content) == "First line\nSecond bold line & more"
+    assert strip_markup(None) == ''
+
+
+def test_windows_are_widened_to_whole_words_and_merged():
+    text = "alpha beta gamma delta epsilon zeta eta theta"
+    gamma, delta = text.index('gamma'), text.index('delta')
+
+    context = keyword_windows(text, [(gamma, gamma + 5), (delta, delta + 5)], 2)
+
+    assert context == f"{GAP_MARKER.lstrip()}beta gamma delta epsilon{GAP_MARKER.rstrip()}"
+
+
+def test_separate_windows_are_joined_with_gap_markers():
+    text = "election " + "filler " * 100 + "journalist"
+
+    context = keyword_windows(text, [(0, 8), (len(text) - 10, len(text))], 10)
+
+    assert context == f"election filler filler{GAP_MARKER}filler filler journalist"
+
+
+def test_only_hits_for_the_flagged_categories_are_kept():
+    index = CategoryIndex(CATEGORIES)
+    content = "<p>The journalist wrote.</p>" + "<p>Unrelated filler text.</p>" * 50 + "<p>The election was held.</p>"
+
+    context, trimmed = extract_context(content, index, categories=['elections'], window_chars=20)
+
+    assert trimmed
+    assert 'election' in context and 'journalist' not in context
+
+
+def test_articles_without_hits_are_sent_whole_up_to_the_limit():
+    index = CategoryIndex(CATEGORIES)
+
+    context, trimmed = extract_context("Nothing relevant here. " * 10, index, window_chars=20, max_chars=50)
+
+    assert not trimmed
+    assert context == ("Nothing relevant here. " * 10)[:50] + "... (truncated)"
@@ -0,0 +1,86 @@
+"""
+Tests for backlog draining
+"""
+
+import datetime
+
+from conftest import add_article
+
+
+def test_drain_analyzes_the_whole_backlog_regardless_of_age(mongo_analyzer):
+    articles = mongo_analyzer.articles_collection
+    old = (datetime.datetime.now() - datetime.timedelta(days=90)).isoformat()
+    for n in range(5):
+        add_article(articles, f"Quiet story {n}", "Nothing to see here.", collected_at=old)
+
+    report = mongo_analyzer.drain_backlog(time_budget=30, batch_size=2, concurrency=1, pack=False)
+
+    assert report['initial_queue_depth'] == 5
+    assert report['final_queue_depth'] == 0
+    assert report['analyzed'] == 5
+    assert articles.count_documents({'analyzed': True}) == 5
+
+
+def test_later_batches_adapt_to_the_drain_rate(news_analyzer, analyzer_module, monkeypatch):
+    articles = news_analyzer.articles_collection
+    for n in range(7):
+        add_article(articles, f"Quiet story {n}", "Nothing to see here.")
+    monkeypatch.setattr(analyzer_module, 'DRAIN_MIN_BATCH_SIZE', 1)
+    monkeypatch.setattr(analyzer_module, 'DRAIN_MAX_BATCH_SIZE', 3)
+
+    batch_sizes = []
+    analyze_articles = news_analyzer._analyze_articles
+
+    def recording_analyze_articles(batch, concurrency, pack):
+        batch_sizes.append(len(batch))
+        return analyze_articles(batch, concurrency, pack)
+
+    monkeypatch.setattr(news_analyzer, '_analyze_articles', recording_analyze_articles)
+
+    report = news_analyzer.drain_backlog(time_budget=30, batch_size=2, concurrency=1, pack=False)
+
+    # The first batch has the given size; quiet articles drain fast, so the rest are as large as allowed
+    assert batch_sizes == [2, 3, 2]
+    assert report['batches'] == 3
+    assert report['final_queue_depth'] == 0
+
+
+def test_drain_stops_when_claude_is_unavailable(news_analyzer, claude_standin):
+    articles = news_analyzer.articles_collection
+    for n in range(6):
+        add_article(articles, f"Story {n}", f"Monitors reported election interference in district {n}.")
+    claude_standin.failures = [503] * 100
+    news_analyzer.claude_client.max_retries = 0
+
+    report = news_analyzer.drain_backlog(time_budget=30, batch_size=2, concurrency=1, pack=False)
+
+    assert report['batches'] == 1
+    assert report['claude_unavailable'] == 2
+    assert report['final_queue_depth'] == 6
+    assert len(claude_standin.message_requests()) == 2
+
+
+def test_drain_does_not_reclaim_articles_it_left_unanalyzed(mongo_analyzer, monkeypatch):
+    articles = mongo_analyzer.articles_collection
+    broken_id = add_article(articles, "Broken story", "Nothing to see here.")
+    for n in range(3):
+        add_article(articles, f"Quiet story {n}", "Nothing to see here.")
+
+    attempts = []
+    keyword_analysis = mongo_analyzer._keyword_analysis
+
+    def failing_keyword_analysis(article):
+        if article['_id'] == broken_id:
+            attempts.append(article['_id'])
+            raise ValueError("Unparseable article")
+        return keyword_analysis(article)
+
+    monkeypatch.setattr(mongo_analyzer, '_keyword_analysis', failing_keyword_analysis)
+
+    report = mongo_analyzer.drain_backlog(time_budget=30, batch_size=2, concurrency=1, pack=False)
+
+    assert attempts == [broken_id]
+    assert report['analyzed'] == 3
+    assert report['final_queue_depth'] == 1
+    assert not report['budget_exhausted']
+    assert articles.find_one({'_id': broken_id}).get('lease_owner') is None
@@ -0,0 +1,71 @@
+"""
+Tests for the shared keep-alive HTTP client
+"""
+
+import socket
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+import requests
+
+from modules.http_client import PooledHTTPClient, get_http_client
+
+
+class KeepAliveHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        body = self.headers.get('Accept-Encoding', '').encode('utf-8')
+        self.send_response(200)
+        self.send_header('content-length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+@pytest.fixture
+def keep_alive_url():
+    server = ThreadingHTTPServer(('127.0.0.1', 0), KeepAliveHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_address[1]}"
+    server.shutdown()
+    server.server_close()
+
+
+def test_requests_to_one_host_reuse_a_connection(keep_alive_url):
+    client = PooledHTTPClient()
+
+    bodies = [client.get(f"{keep_alive_url}/feed/{n}").text for n in range(5)]
+
+    assert bodies == ['gzip, deflate'] * 5
+    stats = client.stats()['127.0.0.1']
+    assert stats['requests'] == 5
+    assert stats['connections_opened'] == 1
+    assert stats['connection_reuse_ratio'] == 0.8
+
+
+def test_configured_hosts_get_their_own_pool_size():
+    client = PooledHTTPClient(pool_sizes={'api.anthropic.com': 12}, default_pool_size=3)
+
+    assert client.session.get_adapter('https://api.anthropic.com/v1/messages')._pool_maxsize == 12
+    assert client.session.get_adapter('https://feeds.example.com/rss')._pool_maxsize == 3
+
+
+def test_failed_requests_are_counted_per_host():
+    with socket.socket() as probe:
+        probe.bind(('127.0.0.1', 0))
+        port = probe.getsockname()[1]
+    client = PooledHTTPClient(connect_timeout=1, read_timeout=1)
+
+    with pytest.raises(requests.exceptions.ConnectionError):
+        client.get(f"http://127.0.0.1:{port}/")
+
+    assert client.stats()['127.0.0.1']['errors'] == 1
+
+
+def test_the_process_shares_one_client():
+    assert get_http_client() is get_http_client()
@@ -0,0 +1,75 @@
+from modules.matcher import KeywordMatcher, CategoryIndex, get_category_index
+
+CATEGORIES = {
+    'elections': {
+        'keywords': ['election'],
+        'orange_indicators': ['voter purge'],
+        'red_indicators': ['cancel election']
+    },
+    'press': {
+        'keywords': ['journalist'],
+        'orange_indicators': ['journalist arrested'],
+        'red_indicators': ['press banned']
+    }
+}
+
+
+def test_matched_labels_finds_every_list_case_insensitively():
+    matcher = KeywordMatcher({'us': ['congress', 'senate'], 'political': ['election']})
+
+    assert matcher.matched_labels("The SENATE delayed the Election") == {'us', 'political'}
+    assert matcher.matched_labels("Nothing to see") == set()
+    assert matcher.matched_labels("") == set()
+
+
+def test_contained_keywords_match_like_substring_search():
+    matcher = KeywordMatcher({'long': ['martial law'], 'short': ['law']})
+
+    hits = matcher.find_hits("Martial law declared")
+
+    assert ('long', 'martial law', 0) in hits
+    assert ('short', 'law', 8) in hits
+
+
+def test_hit_positions_are_offsets_into_the_original_text():
+    # 'İ'.lower() is two characters, which shifted offsets into the lowercased text
+    text = "İİ Martial LAW in İzmir"
+    matcher = KeywordMatcher({'a': ['martial law']})
+
+    hits = matcher.find_hits(text)
+
+    assert hits == [('a', 'martial law', 3)]
+    label, keyword, position = hits[0]
+    assert text[position:position + len(keyword)] == "Martial LAW"
+
+
+def test_empty_matcher_matches_nothing():
+    matcher = KeywordMatcher({'a': []})
+
+    assert matcher.find_hits("anything") == []
+    assert matcher.matched_labels("anything") == set()
+
+
+def test_category_tiers_only_count_on_top_of_the_tier_below():
+    index = CategoryIndex(CATEGORIES)
+
+    severities, match_count = index.classify(index.find_hits(
+        "A voter purge before the election; officials may cancel election day. Press banned."
+    ))
+
+    assert severities == {'elections': 'red', 'press': 'green'}
+    assert match_count == 6
+
+
+def test_category_hits_carry_category_tier_and_position():
+    index = CategoryIndex(CATEGORIES)
+
+    hits = index.find_hits("Journalist arrested")
+
+    assert {'category': 'press', 'tier': 'keywords', 'keyword': 'journalist', 'position': 0} in hits
+    assert {'category': 'press', 'tier': 'orange_indicators', 'keyword': 'journalist arrested', 'position': 0} in hits
+    assert index.classify(hits) == ({'elections': 'green', 'press': 'orange'}, 3)
+
+
+def test_category_index_is_compiled_once_per_framework():
+    assert get_category_index(CATEGORIES) is get_category_index(dict(CATEGORIES))
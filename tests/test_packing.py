@@ -0,0 +1,55 @@
+"""
+Tests for packing several articles into one Claude request
+"""
+
+import json
+
+from conftest import add_article
+
+
+def _items(news_analyzer, contents):
+    articles = news_analyzer.articles_collection
+    items = []
+    for n, content in enumerate(contents):
+        article = articles.find_one({'_id': add_article(articles, f"Story {n}", content)})
+        items.append((article, news_analyzer._keyword_analysis(article)))
+    return items
+
+
+def test_short_articles_share_jobs_and_long_ones_go_alone(news_analyzer, analyzer_module):
+    short = "Monitors reported election interference in the county."
+    long = (short + " The count went on.") * 200
+    items = _items(news_analyzer, [short] * 3 + [long] + [short] * 4)
+
+    jobs = news_analyzer._pack_claude_items(items)
+
+    assert [len(job) for job in jobs] == [1, analyzer_module.CLAUDE_PACK_MAX_ARTICLES, 2]
+    assert jobs[0] == [items[3]]
+
+
+def test_articles_missing_from_a_packed_response_get_the_error_result(news_analyzer):
+    response = json.dumps({'articles': {'article_1': {
+        'is_us_based': True,
+        'categories': {'electoral_integrity': {'severity': 'ORANGE', 'evidence': ['quote'], 'confidence': 4}},
+        'summary': 's',
+        'reasoning': 'r'
+    }}})
+
+    parsed = news_analyzer._parse_packed_claude_response(
+        response, {'article_1': ['electoral_integrity'], 'article_2': ['electoral_integrity']}
+    )
+
+    assert parsed['article_1']['categories'] == {'electoral_integrity': 'orange'}
+    assert 'missing' in parsed['article_2']['explanation']
+
+
+def test_packed_run_analyzes_every_article_with_one_request(news_analyzer, claude_standin):
+    articles = news_analyzer.articles_collection
+    ids = [add_article(articles, f"Story {n}", f"Monitors reported election interference in district {n}.") for n in range(3)]
+
+    assert news_analyzer.analyze_recent_articles(concurrency=1, pack=True) == 3
+
+    requests = claude_standin.message_requests()
+    assert len(requests) == 1
+    assert 'START ARTICLE article_3' in requests[0]['messages'][0]['content']
+    assert all('claude' in articles.find_one({'_id': article_id})['analysis_results']['methods'] for article_id in ids)
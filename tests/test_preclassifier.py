@@ -0,0 +1,81 @@
+"""
+Tests for the local pre-classifier that lets cleared articles skip Claude
+"""
+
+import numpy as np
+import pytest
+
+from modules.preclassifier import PreClassifier, tokenize
+
+FLAGGED = [
+    {'title': f"Crackdown {n}", 'content': f"Troops detained protesters and journalists in city {n} under emergency orders."}
+    for n in range(20)
+]
+CLEARED = [
+    {'title': f"Fair {n}", 'content': f"The county fair opened with a bake sale and pie contest in town {n}."}
+    for n in range(20)
+]
+
+
+def _trained(**options):
+    articles = FLAGGED + CLEARED
+    labels = [1] * len(FLAGGED) + [0] * len(CLEARED)
+    strong = [1] * 5 + [0] * (len(articles) - 5)
+    return PreClassifier.train(articles, labels, strong, n_features=2 ** 12, **options)
+
+
+def test_tokenize_adds_bigrams_to_the_plain_text_words():
+    assert tokenize("<p>Troops <b>deployed</b></p>") == ['troops', 'deployed', 'troops deployed']
+
+
+def test_training_separates_flagged_from_cleared_articles():
+    model = _trained()
+
+    flagged = model.predict_proba({'title': "Crackdown", 'content': "Troops detained protesters under emergency orders."})
+    cleared = model.predict_proba({'title': "Fair", 'content': "A bake sale and pie contest at the county fair."})
+
+    assert flagged > 0.5 > cleared
+    assert model.should_skip({'title': "Fair", 'content': "A bake sale and pie contest at the county fair."})[0]
+    assert model.metadata['samples'] == 40
+
+
+def test_the_threshold_keeps_the_target_share_of_strong_articles():
+    model = _trained(holdout_fraction=0, target_recall=1.0)
+
+    assert model.metadata['calibrated_on'] == 'training'
+    assert model.metadata['strong_recall'] == 1.0
+    assert all(not model.should_skip(article)[0] for article in FLAGGED[:5])
+
+
+def test_training_needs_both_classes():
+    with pytest.raises(ValueError):
+        PreClassifier.train(FLAGGED, [1] * len(FLAGGED), [0] * len(FLAGGED))
+
+
+def test_saved_models_load_with_the_same_predictions(tmp_path):
+    model = _trained()
+    path = tmp_path / 'preclassifier.npz'
+
+    model.save(path)
+    loaded = PreClassifier.load(path)
+
+    assert loaded.threshold == model.threshold
+    assert loaded.metadata == model.metadata
+    assert loaded.predict_proba(FLAGGED[0]) == pytest.approx(model.predict_proba(FLAGGED[0]))
+
+
+def test_only_yellow_articles_the_model_clears_skip_claude(news_analyzer, analyzer_module, monkeypatch):
+    monkeypatch.setattr(analyzer_module, 'PRECLASSIFIER_EXPLORE_RATE', 0)
+    features = 2 ** 10
+    # Scores every article near zero, so everything it may skip is skipped
+    news_analyzer.preclassifier = PreClassifier(np.zeros(features), -10.0, np.ones(features), 0.5)
+    yellow = {'_id': 'yellow', 'title': "Maps", 'content': "Lawmakers debated gerrymandering and ballot access."}
+    orange = {'_id': 'orange', 'title': "Election", 'content': "Monitors reported election interference in the county."}
+
+    yellow_results = news_analyzer._keyword_analysis(yellow)
+    orange_results = news_analyzer._keyword_analysis(orange)
+
+    assert yellow_results['categories']['electoral_integrity'] == 'yellow'
+    assert news_analyzer._preclassifier_skips(yellow, yellow_results)
+    assert not news_analyzer._preclassifier_skips(orange, orange_results)
+    assert news_analyzer.preclassifier_skipped == 1
@@ -0,0 +1,88 @@
+"""
+Tests for the per-run Claude call limit and the order articles are analyzed in
+"""
+
+import datetime
+
+import pytest
+
+from conftest import add_article
+
+
+@pytest.fixture
+def call_limit(analyzer_module, monkeypatch):
+    def set_limit(calls):
+        monkeypatch.setattr(analyzer_module, 'CLAUDE_MAX_CALLS_PER_RUN', calls)
+    return set_limit
+
+
+def test_articles_over_the_call_limit_are_deferred_by_priority(news_analyzer, claude_standin, call_limit):
+    articles = news_analyzer.articles_collection
+    orange_id = add_article(articles, "Orange story", "Monitors reported election interference in the county.")
+    red_id = add_article(articles, "Red story", "Monitors reported election interference and a plan to cancel election.")
+    call_limit(1)
+
+    news_analyzer.analyze_recent_articles(concurrency=1, pack=False)
+
+    assert len(claude_standin.message_requests()) == 1
+    assert articles.find_one({'_id': red_id})['analyzed'] is True
+    assert articles.find_one({'_id': orange_id})['analyzed'] is False
+    assert news_analyzer.deferred_count == 1
+
+
+def test_cache_hits_do_not_use_up_calls(news_analyzer, claude_standin, call_limit):
+    articles = news_analyzer.articles_collection
+    ids = [add_article(articles, "Wire story", "Monitors reported election interference in the county.", url=f"https://example.com/{n}") for n in range(3)]
+    call_limit(1)
+
+    news_analyzer.analyze_recent_articles(concurrency=1, pack=False)
+
+    assert len(claude_standin.message_requests()) == 1
+    assert all(articles.find_one({'_id': article_id})['analyzed'] for article_id in ids)
+    assert news_analyzer._claude_calls_remaining == 0
+
+
+def test_a_packed_request_uses_one_call(news_analyzer, claude_standin, call_limit):
+    articles = news_analyzer.articles_collection
+    indicators = ['election interference', 'political prisoner', 'paramilitary group', 'emergency powers']
+    ids = [add_article(articles, f"Story {n}", f"Reporters confirmed the {indicator}.") for n, indicator in enumerate(indicators)]
+    call_limit(2)
+
+    news_analyzer.analyze_recent_articles(concurrency=1, pack=True)
+
+    assert len(claude_standin.message_requests()) == 1
+    assert all(articles.find_one({'_id': article_id})['analyzed'] for article_id in ids)
+    assert news_analyzer._claude_calls_remaining == 1
+
+
+def _collected(minutes_ago):
+    return (datetime.datetime.now() - datetime.timedelta(minutes=minutes_ago)).isoformat()
+
+
+def test_the_limit_takes_the_strongest_articles_of_the_whole_window(news_analyzer, claude_standin):
+    articles = news_analyzer.articles_collection
+    routine_ids = [
+        add_article(articles, f"Routine {n}", "Monitors reported election interference in the county.", collected_at=_collected(30 - n))
+        for n in range(3)
+    ]
+    red_id = add_article(articles, "Red story", "Monitors reported election interference and a plan to cancel election.", collected_at=_collected(1))
+
+    assert news_analyzer.analyze_recent_articles(limit=1, concurrency=1, pack=False) == 1
+
+    assert articles.find_one({'_id': red_id})['analyzed'] is True
+    assert not any(articles.find_one({'_id': article_id})['analyzed'] for article_id in routine_ids)
+
+
+def test_articles_held_by_another_worker_are_not_selected(mongo_analyzer, claude_standin):
+    articles = mongo_analyzer.articles_collection
+    held_until = (datetime.datetime.utcnow() + datetime.timedelta(minutes=10)).isoformat(timespec='microseconds')
+    held_id = add_article(articles, "Held story", "Monitors reported election interference and a plan to cancel election.",
+                          collected_at=_collected(5), lease_owner='other-worker', lease_token='other', lease_expires=held_until)
+    orange_id = add_article(articles, "Orange story", "Monitors reported election interference in the county.", collected_at=_collected(10))
+    red_id = add_article(articles, "Red story", "Monitors reported election interference and a plan to cancel election.", collected_at=_collected(1))
+
+    assert mongo_analyzer.analyze_recent_articles(limit=1, concurrency=1, pack=False) == 1
+
+    assert articles.find_one({'_id': red_id})['analyzed'] is True
+    assert articles.find_one({'_id': held_id})['analyzed'] is False
+    assert articles.find_one({'_id': orange_id})['analyzed'] is False
@@ -0,0 +1,42 @@
+"""
+Tests for the cached system prompt prefix of Claude requests
+"""
+
+from conftest import add_article
+from modules.anthropic_client import AnthropicClient
+
+
+def test_single_and_packed_requests_share_the_cached_framework_block(news_analyzer):
+    single = news_analyzer._build_claude_request("prompt")['system']
+    packed = news_analyzer._build_claude_request("prompt", packed=True)['system']
+
+    assert single[0] == packed[0]
+    assert single[0]['text'] == news_analyzer.framework_prompt
+    assert single[1]['text'] != packed[1]['text']
+    assert all(block['cache_control'] == {'type': 'ephemeral'} for block in single + packed)
+
+
+def test_only_the_article_varies_between_requests(news_analyzer, claude_standin):
+    articles = news_analyzer.articles_collection
+    for n in range(2):
+        add_article(articles, f"Story {n}", f"Monitors reported election interference in district {n}.")
+
+    assert news_analyzer.analyze_recent_articles(concurrency=1, pack=False) == 2
+
+    first, second = claude_standin.message_requests()
+    assert first['system'] == second['system']
+    assert first['messages'] != second['messages']
+    assert news_analyzer.framework_prompt not in first['messages'][0]['content']
+
+
+def test_cache_read_ratio_counts_cached_prompt_tokens():
+    client = AnthropicClient('key', http=object())
+    client._record_usage({'input_tokens': 100, 'output_tokens': 20, 'cache_creation_input_tokens': 300})
+    client._record_usage({'input_tokens': 100, 'output_tokens': 20, 'cache_read_input_tokens': 300})
+
+    stats = client.stats()
+
+    assert stats['requests'] == 2
+    assert stats['cache_creation_input_tokens'] == 300
+    assert stats['cache_read_input_tokens'] == 300
+    assert stats['cache_read_ratio'] == 0.375
@@ -0,0 +1,39 @@
+"""
+Tests for the token-bucket rate limiters
+"""
+
+import time
+
+from modules.ratelimit import TokenBucket, RateLimiter
+
+
+def test_token_bucket_refills_at_its_rate():
+    bucket = TokenBucket(60, period=60.0)
+    now = bucket.updated
+
+    assert bucket.wait_time(60, now) == 0.0
+    bucket.consume(60)
+    assert bucket.wait_time(1, now) == 1.0
+    assert bucket.wait_time(1, now + 0.5) == 0.5
+    assert bucket.wait_time(1, now + 2) == 0.0
+
+
+def test_oversized_requests_only_wait_for_a_full_bucket():
+    bucket = TokenBucket(10, period=60.0)
+    now = bucket.updated
+
+    assert bucket.wait_time(1000, now) == 0.0
+    bucket.consume(1000)
+    assert bucket.available == 0.0
+
+
+def test_rate_limiter_blocks_until_tokens_refill():
+    limiter = RateLimiter(requests_per_minute=None, tokens_per_minute=600)
+
+    limiter.acquire(600)
+    start = time.monotonic()
+    limiter.acquire(3)
+
+    assert time.monotonic() - start >= 0.25
+    assert limiter.stats()['acquired'] == 2
+    assert limiter.stats()['waits'] == 1
@@ -0,0 +1,53 @@
+"""
+Tests for routing Claude analysis through the fast model with escalation
+"""
+
+import pytest
+
+from conftest import add_article
+
+
+@pytest.fixture
+def flagged_article(news_analyzer):
+    articles = news_analyzer.articles_collection
+    return add_article(articles, "County count", "Monitors reported election interference in the county.")
+
+
+def _models(claude_standin):
+    return [request['model'] for request in claude_standin.message_requests()]
+
+
+def test_confident_results_stay_on_the_fast_model(news_analyzer, analyzer_module, claude_standin, flagged_article):
+    news_analyzer.analyze_recent_articles(concurrency=1, pack=False)
+
+    article = news_analyzer.articles_collection.find_one({'_id': flagged_article})
+    assert _models(claude_standin) == [analyzer_module.CLAUDE_MODEL]
+    assert article['analysis_results']['claude_model'] == analyzer_module.CLAUDE_MODEL
+    assert news_analyzer.routing_stats['escalated'] == 0
+
+
+@pytest.mark.parametrize('severity, confidence', [('ORANGE', 2), ('RED', 4)])
+def test_low_confidence_or_red_results_are_redone_with_the_strong_model(
+        news_analyzer, analyzer_module, claude_standin, flagged_article, severity, confidence):
+    claude_standin.severity = severity
+    claude_standin.confidence = confidence
+
+    news_analyzer.analyze_recent_articles(concurrency=1, pack=False)
+
+    article = news_analyzer.articles_collection.find_one({'_id': flagged_article})
+    assert _models(claude_standin) == [analyzer_module.CLAUDE_MODEL, analyzer_module.CLAUDE_STRONG_MODEL]
+    assert article['analysis_results']['claude_model'] == analyzer_module.CLAUDE_STRONG_MODEL
+    assert news_analyzer._routing_summary()['strong']['requests'] == 1
+
+
+def test_a_failed_escalation_keeps_the_fast_result(news_analyzer, analyzer_module, claude_standin, flagged_article):
+    claude_standin.confidence = 2
+    claude_standin.failures = [None, 503]
+    news_analyzer.claude_client.max_retries = 0
+
+    news_analyzer.analyze_recent_articles(concurrency=1, pack=False)
+
+    article = news_analyzer.articles_collection.find_one({'_id': flagged_article})
+    assert article['analyzed'] is True
+    assert article['analysis_results']['claude_model'] == analyzer_module.CLAUDE_MODEL
+    assert news_analyzer.routing_stats['escalation_failed'] == 1
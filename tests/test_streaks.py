@@ -0,0 +1,65 @@
+"""
+Tests for the in-memory category severity streaks
+"""
+
+import datetime
+
+
+def _events(analyzer, category, severity, runs=1):
+    """Create one event per run for a category and get the events, oldest first"""
+    for n in range(runs):
+        analyzer._create_events({'_id': f"article-{n}", 'title': f"Story {n}"}, {'categories': {category: severity}})
+    analyzer.bulk_writer.flush()
+    return list(analyzer.events_collection.find({'category': category}, sort=[('detected_date', 1)]))
+
+
+def test_events_of_one_run_continue_the_same_streak(mongo_analyzer):
+    category = next(iter(mongo_analyzer.categories))
+
+    first, second = _events(mongo_analyzer, category, 'orange', runs=2)
+
+    assert first['previous_severity'] is None
+    assert second['previous_severity'] == 'orange'
+    assert second['start_date'] == first['start_date'] == first['detected_date']
+    assert second['severity_change_date'] is None
+
+
+def test_streaks_are_bootstrapped_from_the_latest_event(mongo_analyzer):
+    category = next(iter(mongo_analyzer.categories))
+    started = (datetime.datetime.now() - datetime.timedelta(days=3)).isoformat()
+    mongo_analyzer.events_collection.insert_one({
+        'category': category,
+        'severity': 'yellow',
+        'start_date': started,
+        'detected_date': (datetime.datetime.now() - datetime.timedelta(days=1)).isoformat()
+    })
+
+    event = _events(mongo_analyzer, category, 'yellow')[-1]
+
+    assert event['start_date'] == started
+    assert event['previous_severity'] == 'yellow'
+
+
+def test_a_severity_change_starts_a_new_streak(mongo_analyzer):
+    category = next(iter(mongo_analyzer.categories))
+    _events(mongo_analyzer, category, 'yellow')
+
+    event = _events(mongo_analyzer, category, 'red')[-1]
+
+    assert event['previous_severity'] == 'yellow'
+    assert event['severity_change_date'] == event['start_date'] == event['detected_date']
+
+
+def test_saved_streaks_carry_over_to_the_next_run(mongo_analyzer):
+    category = next(iter(mongo_analyzer.categories))
+    first = _events(mongo_analyzer, category, 'orange')[-1]
+
+    mongo_analyzer._save_category_streaks()
+    mongo_analyzer.events_collection.delete_many({})
+    event = _events(mongo_analyzer, category, 'orange')[-1]
+
+    saved = mongo_analyzer.category_streaks_collection.find_one({'_id': category})
+    assert saved['current_severity'] == 'orange'
+    assert saved['start_date'] == first['start_date']
+    assert event['start_date'] == first['start_date']
+    assert mongo_analyzer.category_streaks_collection.count_documents({}) == len(mongo_analyzer.categories)
@@ -0,0 +1,43 @@
+"""
+Tests for article URL canonicalization
+"""
+
+import pytest
+
+from modules.urlcanon import canonicalize_url
+
+CANONICAL = 'https://example.com/politics/story'
+
+
+@pytest.mark.parametrize('url', [
+    'https://example.com/politics/story',
+    'http://www.example.com/politics/story/',
+    'HTTPS://M.Example.COM:443/politics/story',
+    'https://amp.example.com/politics/story',
+    'https://example.com/amp/politics/story',
+    'https://example.com/politics/story/amp',
+    'https://example.com/politics/story?utm_source=rss&utm_medium=feed&fbclid=abc#comments',
+    'https://example.com//politics/story/index.html',
+    'https://example-com.cdn.ampproject.org/c/s/example.com/politics/story',
+    'example.com/politics/story',
+])
+def test_copies_of_one_article_share_a_canonical_url(url):
+    assert canonicalize_url(url) == CANONICAL
+
+
+def test_meaningful_query_parameters_are_kept_in_sorted_order():
+    assert canonicalize_url('https://example.com/article?page=2&id=7&utm_campaign=x') == 'https://example.com/article?id=7&page=2'
+
+
+def test_encoding_differences_do_not_matter():
+    assert canonicalize_url('https://example.com/caf%C3%A9%2Dnews') == canonicalize_url('https://example.com/café-news')
+
+
+def test_distinct_articles_keep_distinct_urls():
+    assert canonicalize_url('https://example.com/story-1') != canonicalize_url('https://example.com/story-2')
+    assert canonicalize_url('https://news.example.com/story') != canonicalize_url('https://example.com/story')
+
+
+def test_empty_urls_have_no_canonical_form():
+    assert canonicalize_url(None) == ''
+    assert canonicalize_url('   ') == ''
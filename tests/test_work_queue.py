@@ -0,0 +1,113 @@
+"""
+Tests for lease-based article claiming
+"""
+
+import datetime
+
+from conftest import add_article
+from modules.work_queue import ArticleWorkQueue
+
+
+def _queue(collection, worker_id, lease_seconds=600):
+    return ArticleWorkQueue(collection, lease_seconds=lease_seconds, heartbeat_seconds=3600, worker_id=worker_id)
+
+
+def _backlog(collection, size):
+    return [add_article(collection, f"Story {n}", "Nothing to see here.") for n in range(size)]
+
+
+def test_two_workers_never_claim_the_same_article(mongo_database):
+    articles = mongo_database.articles
+    _backlog(articles, 5)
+    first, second = _queue(articles, 'first'), _queue(articles, 'second')
+
+    first_ids = {doc['_id'] for doc in first.claim({'analyzed': False}, 3)}
+    second_ids = {doc['_id'] for doc in second.claim({'analyzed': False}, 3)}
+
+    assert len(first_ids) == 3 and len(second_ids) == 2
+    assert not first_ids & second_ids
+    assert articles.count_documents({'lease_owner': 'first'}) == 3
+    first.close()
+    second.close()
+
+
+def test_released_articles_can_be_claimed_at_once(mongo_database):
+    articles = mongo_database.articles
+    _backlog(articles, 2)
+    first, second = _queue(articles, 'first'), _queue(articles, 'second')
+
+    claimed = [doc['_id'] for doc in first.claim({'analyzed': False}, 2)]
+    first.release(claimed[:1])
+    first.complete(claimed[1:])
+
+    assert [doc['_id'] for doc in second.claim({'analyzed': False}, 2)] == claimed
+    assert first.stats()['released'] == 1 and first.stats()['completed'] == 1
+    assert first.stats()['held'] == 0
+    second.close()
+
+
+def test_expired_leases_are_claimable_by_another_worker(mongo_database):
+    articles = mongo_database.articles
+    article_id = _backlog(articles, 1)[0]
+    crashed = _queue(articles, 'crashed', lease_seconds=600)
+    crashed.claim({'analyzed': False}, 1)
+    other = _queue(articles, 'other')
+
+    assert other.claim({'analyzed': False}, 1) == []
+
+    expired = datetime.datetime.utcnow() - datetime.timedelta(seconds=1)
+    articles.update_one({'_id': article_id}, {'$set': {'lease_expires': expired.isoformat(timespec='microseconds')}})
+
+    assert [doc['_id'] for doc in other.claim({'analyzed': False}, 1)] == [article_id]
+    other.close()
+
+
+def test_heartbeat_extends_held_leases_and_counts_lost_ones(mongo_database):
+    articles = mongo_database.articles
+    kept_id, lost_id = _backlog(articles, 2)
+    queue = _queue(articles, 'worker', lease_seconds=60)
+    queue.claim({'analyzed': False}, 2)
+    before = articles.find_one({'_id': kept_id})['lease_expires']
+    articles.update_one({'_id': lost_id}, {'$set': {'lease_owner': 'other-worker'}})
+
+    queue.lease = datetime.timedelta(seconds=600)
+    queue.heartbeat()
+
+    assert articles.find_one({'_id': kept_id})['lease_expires'] > before
+    assert queue.stats()['lost'] == 1
+    queue.close()
+
+
+def test_analysis_is_not_written_over_a_lost_lease(mongo_analyzer):
+    articles = mongo_analyzer.articles_collection
+    article_id = add_article(articles, "Quiet story", "Nothing to see here.")
+
+    article = mongo_analyzer._fetch_articles({'analyzed': False}, 1)[0]
+    mongo_analyzer._store_article_analysis(article, mongo_analyzer._keyword_analysis(article), None)
+    # The lease expired and another worker claimed the article before the buffered update was written
+    articles.update_one({'_id': article_id}, {'$set': {'lease_owner': 'other-worker', 'lease_token': 'other-token'}})
+
+    mongo_analyzer.close()
+
+    article = articles.find_one({'_id': article_id})
+    assert article['analyzed'] is False
+    assert article['lease_owner'] == 'other-worker'
+
+
+def test_no_events_are_written_for_an_article_whose_lease_was_lost(mongo_analyzer):
+    articles = mongo_analyzer.articles_collection
+    article_id = add_article(articles, "County count", "Monitors reported election interference in the county.")
+
+    article = mongo_analyzer._fetch_articles({'analyzed': False}, 1)[0]
+    keyword_results = mongo_analyzer._keyword_analysis(article)
+    assert keyword_results['categorized']
+    # The lease expired and another worker claimed the article while this one was analyzing it
+    articles.update_one({'_id': article_id}, {'$set': {'lease_owner': 'other-worker', 'lease_token': 'other-token'}})
+
+    assert not mongo_analyzer._store_article_analysis(article, keyword_results, None)
+    mongo_analyzer.close()
+
+    assert mongo_analyzer.events_collection.count_documents({}) == 0
+    assert mongo_analyzer.event_aggregates_collection.count_documents({'category': {'$exists': True}}) == 0
+    assert articles.find_one({'_id': article_id})['analyzed'] is False
+    assert mongo_analyzer.work_queue.stats()['lost'] == 1